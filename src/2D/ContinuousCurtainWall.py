@@ -1,9 +1,17 @@
 import rhinoscriptsyntax as rs
+import os
+import sys
 import Rhino
 import scriptcontext
-import math
 import random
 
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
+
+from facade import FacadeLayout, PANEL
+from facade.bake import fit_facade_plane, clip_layout, bake_outlines, PlaneMapper
+
 def get_surfaces_info(srf_ids):
     srfs_info = []
     centroids = []
@@ -32,21 +40,9 @@ def get_surfaces_info(srf_ids):
         for c in crvs: rs.DeleteObject(c)
         if poly: rs.DeleteObject(poly)
         
-        plane = rs.PlaneFitFromPoints(pts)
+        plane = fit_facade_plane(pts)
         if not plane: continue
         
-        world_z = Rhino.Geometry.Vector3d(0,0,1)
-        normal = plane.ZAxis
-        if abs(normal.Z) < 0.99: 
-            horiz_x = Rhino.Geometry.Vector3d.CrossProduct(normal, world_z)
-            horiz_x.Unitize()
-            horiz_y = Rhino.Geometry.Vector3d.CrossProduct(normal, horiz_x)
-            horiz_y.Unitize()
-            if horiz_y.Z < 0:
-                horiz_y = -horiz_y
-                horiz_x = -horiz_x
-            plane = Rhino.Geometry.Plane(plane.Origin, horiz_x, horiz_y)
-        
         # Orient XAxis along the sequence to form a ribbon
         if len(srf_ids) > 1:
             if i < len(srf_ids) - 1:
@@ -91,18 +87,21 @@ def get_surfaces_info(srf_ids):
         
     return srfs_info
 
-def generate_preview(srfs_info, params):
+def compute_layouts(widths, max_H, params, rng=random):
+    """Lay out one continuous grid across a ribbon of surfaces.
+
+    Pure Python. The global grid spans sum(widths) x max_H; panels are
+    randomly merged right or up, then each surface gets its own
+    FacadeLayout holding the panels that fall inside its slice, inset by
+    half a mullion width, in coordinates local to that surface. Mullions
+    are the gaps between panels; they are not baked.
+    """
     target_width = params["panel_width"]
     target_height = params["panel_height"]
     mullion = params["mullion_width"]
     break_up_chance = params["break_up"]
-    seed = params.get("seed", 42)
-    
-    random.seed(seed)
-    
-    total_L = sum([info["width"] for info in srfs_info])
-    max_H = max([info["height"] for info in srfs_info]) if srfs_info else 0
     
+    total_L = sum(widths)
     if total_L <= 0 or max_H <= 0: return []
     
     nv = max(1, int(round(total_L / target_width)))
@@ -132,43 +131,28 @@ def generate_preview(srfs_info, params):
     if break_up_chance > 0:
         for p in panels:
             if not p['active']: continue
-            if random.random() < break_up_chance:
+            if rng.random() < break_up_chance:
                 # 50% chance to merge right, 50% to merge up
-                if random.choice([True, False]):
-                    neighbors = [n for n in panels if n['active'] and n['col'] == p['col']+1 and n['row'] == p['row'] and abs(n['y1'] - p['y1']) < 0.001 and abs(n['y2'] - p['y2']) < 0.001]
-                    if neighbors:
-                        n = neighbors[0]
+                if rng.choice([True, False]):
+                    n = panels[(p['col']+1) * nh + p['row']] if p['col'] + 1 < nv else None
+                    if n and n['active'] and abs(n['y1'] - p['y1']) < 0.001 and abs(n['y2'] - p['y2']) < 0.001:
                         p['x2'] = n['x2']
                         n['active'] = False
                 else:
-                    neighbors = [n for n in panels if n['active'] and n['row'] == p['row']+1 and n['col'] == p['col'] and abs(n['x1'] - p['x1']) < 0.001 and abs(n['x2'] - p['x2']) < 0.001]
-                    if neighbors:
-                        n = neighbors[0]
+                    n = panels[p['col'] * nh + p['row'] + 1] if p['row'] + 1 < nh else None
+                    if n and n['active'] and abs(n['x1'] - p['x1']) < 0.001 and abs(n['x2'] - p['x2']) < 0.001:
                         p['y2'] = n['y2']
                         n['active'] = False
 
-    created_objs = []
-    tol = scriptcontext.doc.ModelAbsoluteTolerance
-    
+    half = mullion / 2.0
+
+    layouts = []
     current_x = 0.0
     
-    for info in srfs_info:
-        plane = info["plane"]
-        width = info["width"]
-        border_geom = info["border_geom"]
-        
+    for width in widths:
         start_u = current_x
         end_u = current_x + width
-        
-        # Transform 3D border to local 2D space for clean intersection
-        xform_to_2d = Rhino.Geometry.Transform.ChangeBasis(Rhino.Geometry.Plane.WorldXY, plane)
-        xform_to_3d = Rhino.Geometry.Transform.ChangeBasis(plane, Rhino.Geometry.Plane.WorldXY)
-        
-        border_2d = border_geom.Duplicate()
-        border_2d.Transform(xform_to_2d)
-        
-        # Collect panel curves in 2D
-        local_panels_2d = []
+        layout = FacadeLayout()
         
         for p in panels:
             if not p['active']: continue
@@ -181,39 +165,34 @@ def generate_preview(srfs_info, params):
             
             if cx1 < cx2 and cy1 < cy2:
                 # Apply local mullion offsets
-                px_min = cx1 + mullion / 2.0
-                px_max = cx2 - mullion / 2.0
-                py_min = cy1 + mullion / 2.0
-                py_max = cy2 - mullion / 2.0
-                
-                if px_min < px_max and py_min < py_max:
-                    rect = rs.AddPolyline([
-                        [px_min, py_min, 0],
-                        [px_max, py_min, 0],
-                        [px_max, py_max, 0],
-                        [px_min, py_max, 0],
-                        [px_min, py_min, 0]
-                    ])
-                    if rect:
-                        rect_geom = rs.coercecurve(rect)
-                        local_panels_2d.append(rect_geom)
-                        rs.DeleteObject(rect)
-                        
-        # Intersect all panels collectively (or individually) with surface boundary
-        if local_panels_2d and border_2d:
-            for p_geom in local_panels_2d:
-                try:
-                    intersections = Rhino.Geometry.Curve.CreateBooleanIntersection(p_geom, border_2d, tol)
-                    if intersections:
-                        for inter in intersections:
-                            inter.Transform(xform_to_3d) # Map back to 3D
-                            obj_id = scriptcontext.doc.Objects.AddCurve(inter)
-                            if obj_id: created_objs.append(obj_id)
-                except Exception as e:
-                    pass
+                layout.add_rect(PANEL, cx1 + half, cy1 + half, cx2 - half, cy2 - half)
         
+        layouts.append(layout)
         current_x += width
 
+    return layouts
+
+def generate_preview(srfs_info, params):
+    random.seed(params.get("seed", 42))
+    
+    max_H = max([info["height"] for info in srfs_info]) if srfs_info else 0
+    layouts = compute_layouts([info["width"] for info in srfs_info], max_H, params)
+    
+    created_objs = []
+    tol = scriptcontext.doc.ModelAbsoluteTolerance
+    
+    for info, layout in zip(srfs_info, layouts):
+        plane = info["plane"]
+        
+        # Transform 3D border to local 2D space for clean intersection
+        xform_to_2d = Rhino.Geometry.Transform.ChangeBasis(Rhino.Geometry.Plane.WorldXY, plane)
+        border_2d = info["border_geom"].Duplicate()
+        border_2d.Transform(xform_to_2d)
+        
+        # Clip to the surface boundary; only panels crossing it need a boolean
+        layout = clip_layout(layout, [border_2d], tol)
+        created_objs.extend(bake_outlines(layout, PlaneMapper(plane)))
+
     return created_objs
 
 def create_continuous_curtain_wall():
@@ -6,33 +6,74 @@ Parameters: top/bottom sill, left/right jambs, H/V mullion spacing,
 mullion profile, glass panel inset, and optional rotation.
 """
 import rhinoscriptsyntax as rs
-import Rhino
-import Rhino.Geometry as rg
+import os
+import sys
 import scriptcontext as sc
-import math
 
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
+
+from facade import FacadeLayout, PANEL, MULLION, JAMB, SILL, even_positions, add_grid, add_frame_members
+from facade.bake import (measure_surface, face_trim_curves, clip_layout, bake_outlines,
+                         bake_solids, SurfaceMapper)
+
+
+def compute_layout(domain_u, domain_v, u_length, v_length, params, layers):
+    """Lay out jambs, sills, mullions and panels in the surface's UV space.
+
+    Pure Python: widths given in model units are converted to UV spans
+    using the measured surface size. Returns a FacadeLayout whose records
+    are tagged with the frame / mullion / panel layer names in layers.
+    """
+    frame_layer, mullion_layer, panel_layer = layers
+    wrap = params["wrap"]
+    left_jamb = params["left_jamb"]
+    right_jamb = params["right_jamb"]
+    top_sill = params["top_sill"]
+    bottom_sill = params["bottom_sill"]
+    mullion_width = params["mullion_width"]
+
+    # UV fractions
+    u_range = domain_u[1] - domain_u[0]
+    v_range = domain_v[1] - domain_v[0]
+
+    u_frac_left = left_jamb / u_length if u_length > 0 else 0
+    u_frac_right = right_jamb / u_length if u_length > 0 else 0
+    v_frac_bottom = bottom_sill / v_length if v_length > 0 else 0
+    v_frac_top = top_sill / v_length if v_length > 0 else 0
+
+    u_start = domain_u[0] + u_frac_left * u_range
+    u_end = domain_u[1] - u_frac_right * u_range
+    v_start = domain_v[0] + v_frac_bottom * v_range
+    v_end = domain_v[1] - v_frac_top * v_range
+
+    # Mullion positions
+    if wrap:
+        # For closed curves: evenly spaced around full perimeter, wrapping to start
+        u_positions = even_positions(domain_u[0], domain_u[1], params["num_v_mullions"] - 1)
+    else:
+        u_positions = even_positions(u_start, u_end, params["num_v_mullions"])
+    v_positions = even_positions(v_start, v_end, params["num_h_mullions"])
+
+    mu_u = (mullion_width / u_length) * u_range if u_length > 0 else 0
+    mu_v = (mullion_width / v_length) * v_range if v_length > 0 else 0
 
-def measure_surface(srf_id, domain_u, domain_v, n_measure=50):
-    """Measure physical size of a surface by sampling."""
-    mid_v = (domain_v[0] + domain_v[1]) / 2.0
-    u_length = 0.0
-    prev = rs.EvaluateSurface(srf_id, domain_u[0], mid_v)
-    for i in range(1, n_measure + 1):
-        u = domain_u[0] + (domain_u[1] - domain_u[0]) * i / float(n_measure)
-        pt = rs.EvaluateSurface(srf_id, u, mid_v)
-        u_length += rs.Distance(prev, pt)
-        prev = pt
+    layout = FacadeLayout()
 
-    mid_u = (domain_u[0] + domain_u[1]) / 2.0
-    v_length = 0.0
-    prev = rs.EvaluateSurface(srf_id, mid_u, domain_v[0])
-    for i in range(1, n_measure + 1):
-        v = domain_v[0] + (domain_v[1] - domain_v[0]) * i / float(n_measure)
-        pt = rs.EvaluateSurface(srf_id, mid_u, v)
-        v_length += rs.Distance(prev, pt)
-        prev = pt
+    # --- Frame perimeter: jambs full height, sills between the jambs ---
+    add_frame_members(layout, (domain_u[0], domain_v[0], domain_u[1], domain_v[1]),
+                      (u_start, v_start, u_end, v_end), JAMB, SILL, frame_layer)
 
-    return u_length, v_length
+    # --- Seam mullion where a wrapped wall closes on itself ---
+    if wrap:
+        u = u_positions[0]
+        layout.add_rect(MULLION, u - mu_u/2.0, v_start, u + mu_u/2.0, v_end, mullion_layer)
+
+    # --- Internal mullions and glass panels ---
+    add_grid(layout, u_positions, v_positions, mu_u, mu_v, PANEL, MULLION,
+             panel_layer, mullion_layer)
+    return layout
 
 
 def create_curtain_wall():
@@ -101,10 +142,19 @@ def create_curtain_wall():
     rotation_deg = rs.GetReal("Rotation angle (degrees, 0=none)", 0.0, -360.0, 360.0)
     if rotation_deg is None: return
 
+    solid_depth = rs.GetReal("Mullion profile depth (0 = outlines only)", 0.0, 0.0)
+    if solid_depth is None: return
+
+    glass_thickness = 0.0
+    if solid_depth > 0:
+        glass_thickness = rs.GetReal("Glass panel thickness", min(1.0, solid_depth), 0.0, solid_depth)
+        if glass_thickness is None: return
+
     # --- 3. Analyze surface ---
     domain_u = rs.SurfaceDomain(srf_id, 0)
     domain_v = rs.SurfaceDomain(srf_id, 1)
-    u_length, v_length = measure_surface(srf_id, domain_u, domain_v)
+    surface = rs.coercesurface(srf_id)
+    u_length, v_length = measure_surface(surface, domain_u, domain_v)
 
     print("Surface size: {:.1f} x {:.1f}".format(u_length, v_length))
 
@@ -151,43 +201,31 @@ def create_curtain_wall():
     created_objs = []
     group_name = rs.AddGroup("CurtainWall")
     panel_count = 0
+    layout = None
 
     try:
-        # UV fractions
-        u_range = domain_u[1] - domain_u[0]
-        v_range = domain_v[1] - domain_v[0]
-
-        u_frac_left = left_jamb / u_length if u_length > 0 else 0
-        u_frac_right = right_jamb / u_length if u_length > 0 else 0
-        v_frac_bottom = bottom_sill / v_length if v_length > 0 else 0
-        v_frac_top = top_sill / v_length if v_length > 0 else 0
-
-        u_start = domain_u[0] + u_frac_left * u_range
-        u_end = domain_u[1] - u_frac_right * u_range
-        v_start = domain_v[0] + v_frac_bottom * v_range
-        v_end = domain_v[1] - v_frac_top * v_range
-
-        # Mullion positions
-        if is_closed_curve:
-            # For closed curves: evenly spaced around full perimeter
-            u_positions = []
-            for i in range(n_v_mullions_internal):
-                u_positions.append(domain_u[0] + u_range * i / float(n_v_mullions_internal))
-            u_positions.append(domain_u[1])  # wraps to start
-        else:
-            u_positions = [u_start]
-            if n_v_mullions_internal > 0:
-                u_step = (u_end - u_start) / (n_v_mullions_internal + 1)
-                for i in range(1, n_v_mullions_internal + 1):
-                    u_positions.append(u_start + i * u_step)
-            u_positions.append(u_end)
-
-        v_positions = [v_start]
-        if n_h_mullions_internal > 0:
-            v_step = (v_end - v_start) / (n_h_mullions_internal + 1)
-            for i in range(1, n_h_mullions_internal + 1):
-                v_positions.append(v_start + i * v_step)
-        v_positions.append(v_end)
+        params = {
+            "wrap": is_closed_curve,
+            "num_v_mullions": n_v_mullions_internal,
+            "num_h_mullions": n_h_mullions_internal,
+            "left_jamb": left_jamb, "right_jamb": right_jamb,
+            "top_sill": top_sill, "bottom_sill": bottom_sill,
+            "mullion_width": mullion_width,
+        }
+        layout = compute_layout(domain_u, domain_v, u_length, v_length, params,
+                                (frame_layer_name, mullion_layer_name, panel_layer_name))
+
+        # Clip to the face's trim loops in UV; only cells crossing a trim
+        # edge pay for a curve boolean, the rest are kept or dropped outright.
+        brep = rs.coercebrep(srf_id) if not is_closed_curve else None
+        face = brep.Faces[0] if brep and brep.Faces.Count > 0 else None
+        if face:
+            u_range = domain_u[1] - domain_u[0]
+            v_range = domain_v[1] - domain_v[0]
+            uv_tol = sc.doc.ModelAbsoluteTolerance * max(
+                u_range / u_length if u_length > 0 else 0,
+                v_range / v_length if v_length > 0 else 0)
+            layout = clip_layout(layout, face_trim_curves(face), uv_tol)
 
         # Rotation transform
         rot_xform = None
@@ -198,131 +236,15 @@ def create_curtain_wall():
                                                        (domain_v[0] + domain_v[1]) / 2.0])
             rot_xform = rs.XformRotation2(rotation_deg, center_normal, center_pt)
 
-        # --- Helper: create UV rectangle ---
-        brep = rs.coercebrep(srf_id) if not is_closed_curve else None
-        face = brep.Faces[0] if brep and brep.Faces.Count > 0 else None
+        mapper = SurfaceMapper(surface, domain_u, domain_v, edge_samples=5)
+        if solid_depth > 0:
+            # One mesh per layer: frame, mullions and glass slabs
+            created_objs = bake_solids(layout, mapper, solid_depth, glass_thickness, xform=rot_xform)
+        else:
+            created_objs = bake_outlines(layout, mapper, xform=rot_xform,
+                                         progress_label="Building curtain wall")
+        panel_count = layout.count(PANEL)
 
-        border_crvs = rs.DuplicateSurfaceBorder(srf_id) if not is_closed_curve else []
-        border_geom = [rs.coercecurve(c) for c in border_crvs] if border_crvs else []
-
-        def is_point_on_face(u, v):
-            if not face: return True
-            try:
-                rel = face.IsPointOnFace(u, v)
-                return rel != rg.PointFaceRelation.Exterior
-            except:
-                return True
-
-        def make_uv_rect(u0, u1, v0, v1, layer_name):
-            if u1 <= u0 or v1 <= v0:
-                return False
-            mid_u = (u0 + u1) / 2.0
-            mid_v = (v0 + v1) / 2.0
-            if not is_point_on_face(mid_u, mid_v):
-                return False
-            
-            n = 5
-            pts = []
-            for k in range(n):
-                pts.append(rs.EvaluateSurface(srf_id, u0 + (u1-u0)*k/float(n), v0))
-            for k in range(n):
-                pts.append(rs.EvaluateSurface(srf_id, u1, v0 + (v1-v0)*k/float(n)))
-            for k in range(n):
-                pts.append(rs.EvaluateSurface(srf_id, u1 - (u1-u0)*k/float(n), v1))
-            for k in range(n):
-                pts.append(rs.EvaluateSurface(srf_id, u0, v1 - (v1-v0)*k/float(n)))
-            pts.append(pts[0])
-            
-            if any(p is None for p in pts):
-                return False
-                
-            crv_id = rs.AddPolyline(pts)
-            if not crv_id: return False
-            
-            crv_geom = rs.coercecurve(crv_id)
-            if border_geom:
-                tol = sc.doc.ModelAbsoluteTolerance
-                try:
-                    intersections = rg.Curve.CreateBooleanIntersection(crv_geom, border_geom, tol)
-                    if intersections and len(intersections) > 0:
-                        rs.DeleteObject(crv_id)
-                        added = False
-                        for ig in intersections:
-                            new_crv = sc.doc.Objects.AddCurve(ig)
-                            if new_crv:
-                                rs.ObjectLayer(new_crv, layer_name)
-                                if rot_xform: rs.TransformObject(new_crv, rot_xform)
-                                created_objs.append(new_crv)
-                                added = True
-                        return added
-                except:
-                    pass
-            
-            rs.ObjectLayer(crv_id, layer_name)
-            if rot_xform: rs.TransformObject(crv_id, rot_xform)
-            created_objs.append(crv_id)
-            return True
-
-        total_work = 4 + len(u_positions) + len(v_positions) + \
-                     (len(u_positions) - 1) * (len(v_positions) - 1)
-        rs.StatusBarProgressMeterShow("Building curtain wall", 0, max(total_work, 1), True, True)
-        prog = 0
-
-        mu_u = (mullion_width / u_length) * u_range if u_length > 0 else 0
-        mu_v = (mullion_width / v_length) * v_range if v_length > 0 else 0
-
-        # --- Frame perimeter ---
-        if not is_closed_curve:
-            # Left jamb (full height)
-            make_uv_rect(domain_u[0], u_start, domain_v[0], domain_v[1], frame_layer_name)
-            prog += 1; rs.StatusBarProgressMeterUpdate(prog, True)
-
-            # Right jamb (full height)
-            make_uv_rect(u_end, domain_u[1], domain_v[0], domain_v[1], frame_layer_name)
-            prog += 1; rs.StatusBarProgressMeterUpdate(prog, True)
-
-        # Bottom sill (full width)
-        make_uv_rect(u_start, u_end, domain_v[0], v_start, frame_layer_name)
-        prog += 1; rs.StatusBarProgressMeterUpdate(prog, True)
-
-        # Top sill (full width)
-        make_uv_rect(u_start, u_end, v_end, domain_v[1], frame_layer_name)
-        prog += 1; rs.StatusBarProgressMeterUpdate(prog, True)
-
-        # --- Internal vertical mullions ---
-        vm_u_list = u_positions[:-1] if is_closed_curve else u_positions[1:-1]
-        for u in vm_u_list:
-            make_uv_rect(u - mu_u/2.0, u + mu_u/2.0, v_start, v_end, mullion_layer_name)
-            prog += 1; rs.StatusBarProgressMeterUpdate(prog, True)
-
-        # --- Internal horizontal mullions ---
-        for j in range(1, len(v_positions) - 1):
-            v_pos = v_positions[j]
-            for i in range(len(u_positions) - 1):
-                bay_u0 = u_positions[i] + (mu_u/2.0 if i > 0 else 0)
-                bay_u1 = u_positions[i+1] - (mu_u/2.0 if i < len(u_positions) - 2 else 0)
-                make_uv_rect(bay_u0, bay_u1, v_pos - mu_v/2.0, v_pos + mu_v/2.0, mullion_layer_name)
-            prog += 1; rs.StatusBarProgressMeterUpdate(prog, True)
-
-        # --- Glass panels ---
-        # For closed curves, wrap the u_positions list
-        u_panel_positions = list(u_positions)
-
-        for i in range(len(u_panel_positions) - 1):
-            for j in range(len(v_positions) - 1):
-                bay_u0 = u_panel_positions[i] + (mu_u/2.0 if i > 0 else 0)
-                bay_u1 = u_panel_positions[i+1] - (mu_u/2.0 if i < len(u_panel_positions) - 2 else 0)
-                bay_v0 = v_positions[j] + (mu_v/2.0 if j > 0 else 0)
-                bay_v1 = v_positions[j+1] - (mu_v/2.0 if j < len(v_positions) - 2 else 0)
-
-                if make_uv_rect(bay_u0, bay_u1, bay_v0, bay_v1, panel_layer_name):
-                    panel_count += 1
-
-                prog += 1; rs.StatusBarProgressMeterUpdate(prog, True)
-
-        if border_crvs:
-            rs.DeleteObjects(border_crvs)
-            
         # Group everything
         if created_objs:
             rs.AddObjectsToGroup(created_objs, group_name)
@@ -337,10 +259,14 @@ def create_curtain_wall():
         traceback.print_exc()
 
     finally:
-        rs.StatusBarProgressMeterHide()
         rs.EnableRedraw(True)
         sc.doc.Views.Redraw()
 
+    if solid_depth > 0:
+        print("Curtain wall complete: {} members baked as {} solid objects".format(
+            len(layout) if layout else 0, len(created_objs)))
+        return
+
     mullion_count = len(created_objs) - panel_count
     print("Curtain wall complete: {} mullions + {} panels = {} objects".format(
         mullion_count, panel_count, len(created_objs)))
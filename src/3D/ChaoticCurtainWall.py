@@ -1,5 +1,88 @@
 import rhinoscriptsyntax as rs
 import random
+import colorsys
+import os
+import sys
+
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
+
+from facade import FacadeLayout, PANEL, MULLION
+from facade.bake import (measure_surface, bake_panel_surfaces, bake_panel_mesh, bake_pipes,
+                         bake_tubes, SurfaceMapper)
+
+def compute_layout(domain_u, domain_v, len_u, len_v, u_divs, v_divs, grid_chaos,
+                   missing_prob, panel_depth_var, rng=random):
+    """Lay out the chaotic lattice in the surface's UV space.
+
+    Pure Python. Internal lattice points are jittered by up to grid_chaos
+    model units (converted to UV with the measured surface size). Returns
+    a FacadeLayout with one open MULLION record per lattice edge and one
+    PANEL quad per surviving cell, carrying its random depth offset.
+    """
+    u_step = (domain_u[1] - domain_u[0]) / u_divs
+    v_step = (domain_v[1] - domain_v[0]) / v_divs
+    u_scale = (domain_u[1] - domain_u[0]) / len_u if len_u > 0 else 0
+    v_scale = (domain_v[1] - domain_v[0]) / len_v if len_v > 0 else 0
+
+    # UV lattice as flat arrays, node (i, j) at i * rows + j
+    rows = v_divs + 1
+    us = [domain_u[0] + i * u_step for i in range(u_divs + 1) for j in range(rows)]
+    vs = [domain_v[0] + j * v_step for i in range(u_divs + 1) for j in range(rows)]
+
+    # Apply grid chaos to internal points only, in one sweep
+    if grid_chaos > 0:
+        for i in range(1, u_divs):
+            for k in range(i * rows + 1, i * rows + v_divs):
+                us[k] += rng.uniform(-grid_chaos, grid_chaos) * u_scale
+                vs[k] += rng.uniform(-grid_chaos, grid_chaos) * v_scale
+    grid = list(zip(us, vs))
+
+    layout = FacadeLayout()
+
+    # Mullion edges, each shared lattice edge recorded once
+    for i in range(u_divs):
+        for j in range(rows):
+            k = i * rows + j
+            layout.add(MULLION, (grid[k], grid[k + rows]), closed=False)
+    for i in range(u_divs + 1):
+        for j in range(v_divs):
+            k = i * rows + j
+            layout.add(MULLION, (grid[k], grid[k + 1]), closed=False)
+
+    # Panels, skipping missing ones
+    for i in range(u_divs):
+        for j in range(v_divs):
+            if rng.random() >= missing_prob:
+                # Panel variation
+                depth_offset = rng.uniform(-panel_depth_var, panel_depth_var)
+                k = i * rows + j
+                layout.add(PANEL, (grid[k], grid[k + rows], grid[k + rows + 1], grid[k + 1]),
+                           depth=depth_offset)
+    return layout
+
+def panel_colors(layout, mode, panel_depth_var, rng=random):
+    """Per-panel ARGB colours for mesh output.
+
+    "Depth" runs a blue to orange ramp over the depth offset range,
+    "Random" picks a random hue per panel. Returns None for any other mode.
+    """
+    if mode not in ("Depth", "Random"):
+        return None
+    colors = {}
+    for rid in layout.ids((PANEL,)):
+        if mode == "Depth":
+            t = 0.5
+            if panel_depth_var > 0:
+                t = (layout.depths[rid] + panel_depth_var) / (2.0 * panel_depth_var)
+            r, g, b = colorsys.hsv_to_rgb(0.6 - 0.52 * t, 0.7, 1.0)
+        else:
+            r, g, b = colorsys.hsv_to_rgb(rng.random(), 0.5, 1.0)
+        argb = (255 << 24) | (int(r * 255) << 16) | (int(g * 255) << 8) | int(b * 255)
+        # Keep it a signed 32-bit value, as Color.FromArgb expects
+        colors[rid] = argb - (1 << 32) if argb >= (1 << 31) else argb
+    return colors
 
 def create_chaotic_curtain_wall():
     """
@@ -7,141 +90,72 @@ def create_chaotic_curtain_wall():
     """
     srf_id = rs.GetObject("Select a Base Surface for the Curtain Wall", rs.filter.surface)
     if not srf_id: return
-    
+
     u_divs = rs.GetInteger("Number of U Divisions (Columns)", 10, 1)
     if u_divs is None: return
-    
+
     v_divs = rs.GetInteger("Number of V Divisions (Rows)", 10, 1)
     if v_divs is None: return
-    
+
     mullion_radius = rs.GetReal("Mullion Radius (Thickness)", 1.0, 0.01)
     if mullion_radius is None: return
-    
+
     grid_chaos = rs.GetReal("Grid Chaos (Distortion distance of mullion intersections)", 2.0, 0.0)
     if grid_chaos is None: return
-    
+
     missing_prob = rs.GetReal("Missing Panel Probability (0.0 to 1.0)", 0.1, 0.0, 1.0)
     if missing_prob is None: return
-    
+
     panel_depth_var = rs.GetReal("Panel Depth Variation (Random offset along normal)", 5.0, 0.0)
     if panel_depth_var is None: return
 
+    # One panel mesh scales to large lattices; corner surfaces are kept for editing
+    panel_mode = rs.GetString("Panel output", "Mesh", ["Mesh", "Surfaces"])
+    if panel_mode is None: return
+
+    color_mode = "None"
+    if panel_mode != "Surfaces":
+        color_mode = rs.GetString("Panel colours", "None", ["None", "Depth", "Random"])
+        if color_mode is None: return
+
+    # Welded mesh tubes scale to large lattices; NURBS pipes are kept for small counts
+    mullion_mode = rs.GetString("Mullion output", "Mesh", ["Mesh", "Pipes"])
+    if mullion_mode is None: return
+
+    tube_sides = 6
+    if mullion_mode != "Pipes":
+        tube_sides = rs.GetInteger("Mullion mesh sides", 6, 3, 32)
+        if tube_sides is None: return
+
     rs.EnableRedraw(False)
 
     group_name = rs.AddGroup("ChaoticCurtainWall")
     created_objs = []
-    
+
     # Analyze surface domain
     domain_u = rs.SurfaceDomain(srf_id, 0)
     domain_v = rs.SurfaceDomain(srf_id, 1)
-    
-    u_step = (domain_u[1] - domain_u[0]) / u_divs
-    v_step = (domain_v[1] - domain_v[0]) / v_divs
-    
-    # Generate points grid
-    grid_pts = []
-    grid_normals = []
-    
-    for i in range(u_divs + 1):
-        u_val = domain_u[0] + i * u_step
-        col_pts = []
-        col_norms = []
-        for j in range(v_divs + 1):
-            v_val = domain_v[0] + j * v_step
-            # base point and normal
-            pt = rs.EvaluateSurface(srf_id, u_val, v_val)
-            norm = rs.SurfaceNormal(srf_id, [u_val, v_val])
-            
-            # Apply grid chaos (only internal points)
-            if grid_chaos > 0 and 0 < i < u_divs and 0 < j < v_divs:
-                # tangent plane to perturb
-                plane = rs.PlaneFromNormal(pt, norm)
-                x_offset = random.uniform(-grid_chaos, grid_chaos)
-                y_offset = random.uniform(-grid_chaos, grid_chaos)
-                pt = rs.PointAdd(pt, rs.VectorScale(plane.XAxis, x_offset))
-                pt = rs.PointAdd(pt, rs.VectorScale(plane.YAxis, y_offset))
-                
-            col_pts.append(pt)
-            col_norms.append(norm)
-        grid_pts.append(col_pts)
-        grid_normals.append(col_norms)
-        
-    unique_edges = set()
-    
-    # Create Panels and Mullion edges
-    for i in range(u_divs):
-        for j in range(v_divs):
-            p1 = grid_pts[i][j]
-            p2 = grid_pts[i+1][j]
-            p3 = grid_pts[i+1][j+1]
-            p4 = grid_pts[i][j+1]
-            
-            n1 = grid_normals[i][j]
-            n2 = grid_normals[i+1][j]
-            n3 = grid_normals[i+1][j+1]
-            n4 = grid_normals[i][j+1]
-            
-            avg_n = rs.VectorAdd(rs.VectorAdd(n1, n2), rs.VectorAdd(n3, n4))
-            avg_n = rs.VectorUnitize(avg_n)
-            
-            # Add segments to mullions
-            unique_edges.add(frozenset(((i, j), (i+1, j))))
-            unique_edges.add(frozenset(((i+1, j), (i+1, j+1))))
-            unique_edges.add(frozenset(((i+1, j+1), (i, j+1))))
-            unique_edges.add(frozenset(((i, j+1), (i, j))))
-            
-            # Check for missing panel
-            if random.random() >= missing_prob:
-                # Panel variation
-                depth_offset = random.uniform(-panel_depth_var, panel_depth_var)
-                
-                op1 = rs.PointAdd(p1, rs.VectorScale(avg_n, depth_offset))
-                op2 = rs.PointAdd(p2, rs.VectorScale(avg_n, depth_offset))
-                op3 = rs.PointAdd(p3, rs.VectorScale(avg_n, depth_offset))
-                op4 = rs.PointAdd(p4, rs.VectorScale(avg_n, depth_offset))
-                
-                # Shrink panel to fit inside mullions
-                centroid = [(op1[0]+op2[0]+op3[0]+op4[0])/4, 
-                            (op1[1]+op2[1]+op3[1]+op4[1])/4, 
-                            (op1[2]+op2[2]+op3[2]+op4[2])/4]
-                            
-                diag1 = rs.Distance(op1, op3)
-                diag2 = rs.Distance(op2, op4)
-                avg_diag = (diag1 + diag2)/2.0
-                
-                # Ensure the panel size is larger than the mullion gap
-                mullion_gap = mullion_radius * 2.5
-                if avg_diag > mullion_gap:
-                    scale_factor = (avg_diag - mullion_gap) / avg_diag
-                    
-                    sp1 = [centroid[k] + (op1[k]-centroid[k])*scale_factor for k in range(3)]
-                    sp2 = [centroid[k] + (op2[k]-centroid[k])*scale_factor for k in range(3)]
-                    sp3 = [centroid[k] + (op3[k]-centroid[k])*scale_factor for k in range(3)]
-                    sp4 = [centroid[k] + (op4[k]-centroid[k])*scale_factor for k in range(3)]
-                    
-                    panel_srf = rs.AddSrfPt([sp1, sp2, sp3, sp4])
-                    if panel_srf:
-                        created_objs.append(panel_srf)
-
-    culled_lines = []
-    for edge in unique_edges:
-        edge_list = list(edge)
-        if len(edge_list) == 2:
-            p_idx1, p_idx2 = edge_list
-            p_a = grid_pts[p_idx1[0]][p_idx1[1]]
-            p_b = grid_pts[p_idx2[0]][p_idx2[1]]
-            line = rs.AddLine(p_a, p_b)
-            if line:
-                culled_lines.append(line)
-
-    # Create pipes
-    for line in culled_lines:
-        if line:
-            pipe = rs.AddPipe(line, 0, mullion_radius, cap=1)
-            if pipe:
-                created_objs.extend(pipe)
-            rs.DeleteObject(line)
-            
+    surface = rs.coercesurface(srf_id)
+    len_u, len_v = measure_surface(surface, domain_u, domain_v)
+
+    layout = compute_layout(domain_u, domain_v, len_u, len_v, u_divs, v_divs, grid_chaos,
+                            missing_prob, panel_depth_var)
+
+    # Lattice points are evaluated exactly (no edge densification)
+    mapper = SurfaceMapper(surface, domain_u, domain_v)
+
+    # Shrink panels to fit inside mullions
+    gap = mullion_radius * 2.5
+    if panel_mode == "Surfaces":
+        created_objs.extend(bake_panel_surfaces(layout, mapper, gap=gap))
+    else:
+        colors = panel_colors(layout, color_mode, panel_depth_var)
+        created_objs.extend(bake_panel_mesh(layout, mapper, gap=gap, colors=colors))
+    if mullion_mode == "Pipes":
+        created_objs.extend(bake_pipes(layout, mapper, mullion_radius))
+    else:
+        created_objs.extend(bake_tubes(layout, mapper, mullion_radius, tube_sides))
+
     if created_objs:
         rs.AddObjectsToGroup(created_objs, group_name)
 
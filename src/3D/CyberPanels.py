@@ -1,71 +1,223 @@
 import rhinoscriptsyntax as rs
+import Rhino.Geometry as rg
+import scriptcontext as sc
+import System
 import random
+import itertools
+from array import array
+import os
+import sys
 
-def create_cyber_panels():
-    """
-    Applies a recursive subdivision (quadtree-like) to a selected surface,
-    creating irregular panels with varying extrusion heights for a 'Cyberpunk' / Greeble effect.
-    """
-    # 1. Select Target Surface
-    srf = rs.GetObject("Select a surface to panelize", rs.filter.surface)
-    if not srf: return
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
 
-    # 2. Parameters
-    generations = rs.GetInteger("Recursion Depth (Complexity)", 4, 1, 8)
-    if generations is None: return
+from facade.mesh import MeshBuffer
+from facade.bake import mesh_from_buffer
 
-    max_height = rs.GetReal("Max Panel Extrusion Height", 1.0, 0.0)
-    if max_height is None: return
+# Cap triangulation of a panel quad (counter-clockwise in UV)
+QUAD_TRIS = [(0, 1, 2), (0, 2, 3)]
 
-    gap_percent = rs.GetReal("Panel Gap % (0.0 - 0.5)", 0.05, 0.0, 0.5)
-    if gap_percent is None: return
+# Panels built between progress updates / Escape checks
+PANEL_CHUNK = 256
+
+def split_panels(u0, u1, v0, v1, generations, rng=random):
+    """Yield (u_min, u_max, v_min, v_max) panels as soon as they are final.
+
+    Iterative, stack-based version of the recursive split: a cell stops at
+    depth 0 or, below the top two levels, at random (15%); otherwise it is
+    cut across its longer side (random when close) at 0.3-0.7 to avoid
+    slivers. Cells come out depth-first, so memory stays at one stack of
+    pending cells and callers can start building geometry immediately.
+    """
+    stack = [(u0, u1, v0, v1, generations)]
+    while stack:
+        u0, u1, v0, v1, depth = stack.pop()
 
-    # 3. Recursive Logic
-    # Returns list of tuples: (u_min, u_max, v_min, v_max)
-    def recursive_split(u0, u1, v0, v1, depth):
         # Stop condition: Max depth reached OR Random early stop (for variation)
-        # We start stopping early only after depth 2 to ensure some density
-        if depth <= 0:
-            return [(u0, u1, v0, v1)]
-        
-        if depth < generations - 1 and random.random() < 0.15:
-             return [(u0, u1, v0, v1)]
+        if depth <= 0 or (depth < generations - 1 and rng.random() < 0.15):
+            yield (u0, u1, v0, v1)
+            continue
 
-        # Split Logic
-        # Determine 0=Split U, 1=Split V
         # If one dimension is much larger, favor splitting that one to keep panels roughly square
         du = u1 - u0
         dv = v1 - v0
-        
-        # Simple heuristic: Split the longest side, or random if close
         if du > dv * 1.5:  split_dir = 0
         elif dv > du * 1.5: split_dir = 1
-        else: split_dir = random.choice([0, 1])
+        else: split_dir = rng.choice([0, 1])
 
         # Split parameter t (0.3 to 0.7 to avoid slivers)
-        t = random.uniform(0.3, 0.7)
+        t = rng.uniform(0.3, 0.7)
 
+        # Push the second half first so the first half is emitted first
         if split_dir == 0: # U split
-            u_split = u0 + (u1 - u0) * t
-            return recursive_split(u0, u_split, v0, v1, depth-1) + \
-                   recursive_split(u_split, u1, v0, v1, depth-1)
+            u_split = u0 + du * t
+            stack.append((u_split, u1, v0, v1, depth - 1))
+            stack.append((u0, u_split, v0, v1, depth - 1))
         else: # V split
-            v_split = v0 + (v1 - v0) * t
-            return recursive_split(u0, u1, v0, v_split, depth-1) + \
-                   recursive_split(u0, u1, v_split, v1, depth-1)
+            v_split = v0 + dv * t
+            stack.append((u0, u1, v_split, v1, depth - 1))
+            stack.append((u0, u1, v0, v_split, depth - 1))
 
-    # 4. Execution
-    rs.EnableRedraw(False)
-    
-    # Get surface domain boundaries
-    u_domain = rs.SurfaceDomain(srf, 0)
-    v_domain = rs.SurfaceDomain(srf, 1)
-    
-    # Generate the UV rectangles
-    panels_uv = recursive_split(u_domain[0], u_domain[1], v_domain[0], v_domain[1], generations)
+def panel_height(max_height):
+    """Random extrusion height: 10-100% of max, or 5% for 30% of the panels (flush plates)."""
+    # Varied height for texture
+    h = random.uniform(max_height * 0.1, max_height)
     
-    generated_objs = []
+    # 30% chance to be "flush" (very thin) vs "protruding"
+    if random.random() < 0.3:
+        h = max_height * 0.05
+    return h
+
+def ring_indices(res):
+    """Grid indices (i * (res + 1) + j) around a res x res patch, counter-clockwise."""
+    n = res + 1
+    ring = [i * n for i in range(res)]                   # v = v0, u rising
+    ring += [res * n + j for j in range(res)]            # u = u1, v rising
+    ring += [i * n + res for i in range(res, 0, -1)]     # v = v1, u falling
+    ring += [j for j in range(res, 0, -1)]               # u = u0, v falling
+    return ring
+
+class GreebleBuffer(object):
+    """Vertex / face arrays for greeble patches of one resolution.
+
+    Every patch has the same topology: a (res + 1)^2 top grid, a base ring
+    on the surface and a shoulder ring at the start of the bevel. Faces are
+    written from one index template, so adding a patch is a slice copy.
+    Room is reserved per chunk of panels (doubling), so memory follows the
+    panels actually produced rather than the 2^generations upper bound.
+    """
+
+    def __init__(self, res):
+        self.res = res
+        grid = (res + 1) * (res + 1)
+        ring = ring_indices(res)
+        r = len(ring)
+        self.patch_vertices = grid + 2 * r
+
+        # Template: top grid quads, base -> shoulder walls, shoulder -> top bevel
+        n = res + 1
+        template = []
+        for i in range(res):
+            for j in range(res):
+                template += [i * n + j, (i + 1) * n + j, (i + 1) * n + j + 1, i * n + j + 1]
+        base, shoulder = grid, grid + r
+        for k in range(r):
+            k1 = (k + 1) % r
+            template += [base + k, base + k1, shoulder + k1, shoulder + k]
+            template += [shoulder + k, shoulder + k1, ring[k1], ring[k]]
+        self.template = template
+        self.patch_faces = len(template) // 4
+        self.ring_uv = ring
+
+        self.coords = array('d')
+        self.faces = array('i')
+        self.vertex_count = 0
+        self.face_count = 0
+        self.capacity = 0
+
+    def reserve(self, panels):
+        """Make room for at least `panels` more patches."""
+        need = self.vertex_count // self.patch_vertices + panels
+        if need <= self.capacity:
+            return
+        grow = max(need, 2 * self.capacity) - self.capacity
+        self.coords.frombytes(bytes(8 * 3 * self.patch_vertices * grow))
+        self.faces.frombytes(bytes(4 * 4 * self.patch_faces * grow))
+        self.capacity += grow
+
+    def add_patch(self, top, base, shoulder):
+        """Write one patch from (x, y, z) lists: top grid, base ring, shoulder ring."""
+        v = 3 * self.vertex_count
+        for x, y, z in itertools.chain(top, base, shoulder):
+            self.coords[v] = x
+            self.coords[v + 1] = y
+            self.coords[v + 2] = z
+            v += 3
+        f = 4 * self.face_count
+        offset = self.vertex_count
+        self.faces[f:f + len(self.template)] = array('i', [i + offset for i in self.template])
+        self.vertex_count += self.patch_vertices
+        self.face_count += self.patch_faces
 
+    def to_mesh_buffer(self):
+        buf = MeshBuffer()
+        buf.coords = self.coords[:3 * self.vertex_count]
+        buf.faces = self.faces[:4 * self.face_count]
+        return buf
+
+def build_greebles(surface, panels_uv, max_height, gap_percent, bevel, gbuf):
+    """Write one beveled patch per UV panel into gbuf. Returns the number added.
+
+    The top of each patch is a res x res grid sampled on the surface and
+    lifted along bilinearly interpolated corner normals, so dense panels
+    follow curved surfaces. Its walls rise straight from the panel outline
+    to (1 - bevel) of the height, then chamfer in by bevel of the panel
+    size per side up to the top.
+    """
+    res = gbuf.res
+    steps = [k / float(res) for k in range(res + 1)]
+    added = 0
+    gbuf.reserve(len(panels_uv))
+    for u0, u1, v0, v1 in panels_uv:
+        # Skip random panels to create "missing" hull plating (damage/variety)
+        if random.random() < 0.05:
+            continue
+
+        # Apply Gap (Shrink UV)
+        u_gap = (u1 - u0) * gap_percent
+        v_gap = (v1 - v0) * gap_percent
+        nu0, nu1 = u0 + u_gap, u1 - u_gap
+        nv0, nv1 = v0 + v_gap, v1 - v_gap
+
+        h = panel_height(max_height)
+        if h <= 0:
+            continue
+        h_shoulder = h * (1.0 - bevel)
+
+        corner_normals = []
+        for u, v in ((nu0, nv0), (nu1, nv0), (nu0, nv1), (nu1, nv1)):
+            n = surface.NormalAt(u, v)
+            corner_normals.append((n.X, n.Y, n.Z))
+        n00, n10, n01, n11 = corner_normals
+
+        def frame(s, t):
+            # Surface point and bilinear unit normal at panel fractions (s, t)
+            p = surface.PointAt(nu0 + (nu1 - nu0) * s, nv0 + (nv1 - nv0) * t)
+            w = ((1 - s) * (1 - t), s * (1 - t), (1 - s) * t, s * t)
+            nx = w[0] * n00[0] + w[1] * n10[0] + w[2] * n01[0] + w[3] * n11[0]
+            ny = w[0] * n00[1] + w[1] * n10[1] + w[2] * n01[1] + w[3] * n11[1]
+            nz = w[0] * n00[2] + w[1] * n10[2] + w[2] * n01[2] + w[3] * n11[2]
+            length = (nx * nx + ny * ny + nz * nz) ** 0.5 or 1.0
+            return p.X, p.Y, p.Z, nx / length, ny / length, nz / length
+
+        # Top grid over the bevelled rectangle, i along u, j along v
+        top_steps = [bevel + (1.0 - 2.0 * bevel) * a for a in steps]
+        top = []
+        for s in top_steps:
+            for t in top_steps:
+                x, y, z, nx, ny, nz = frame(s, t)
+                top.append((x + nx * h, y + ny * h, z + nz * h))
+
+        # Base and shoulder rings around the full (gap-inset) panel
+        base = []
+        shoulder = []
+        for g in gbuf.ring_uv:
+            i, j = divmod(g, res + 1)
+            x, y, z, nx, ny, nz = frame(steps[i], steps[j])
+            base.append((x, y, z))
+            shoulder.append((x + nx * h_shoulder, y + ny * h_shoulder, z + nz * h_shoulder))
+
+        gbuf.add_patch(top, base, shoulder)
+        added += 1
+    return added
+
+def build_panels(surface, panels_uv, max_height, gap_percent, output, breps, buf):
+    """Turn UV panels into boxes, appending Breps to breps or prisms to buf.
+
+    Returns the number of prisms added to buf.
+    """
+    added = 0
     for p_uv in panels_uv:
         u0, u1, v0, v1 = p_uv
 
@@ -82,56 +234,119 @@ def create_cyber_panels():
         nu0, nu1 = u0 + u_gap, u1 - u_gap
         nv0, nv1 = v0 + v_gap, v1 - v_gap
         
-        # Evaluate 4 corners
-        # (Using EvaluateSurface handles curved surfaces, though strictly planar panels 
-        # on curved surfaces might clip. This is 'good enough' for greebles).
-        corners_uv = [(nu0, nv0), (nu1, nv0), (nu1, nv1), (nu0, nv1)]
-        corners_3d = [rs.EvaluateSurface(srf, uv[0], uv[1]) for uv in corners_uv]
-        
-        # Create base panel
-        # Adding a 5th point (first point) to close the polyline
-        corners_3d.append(corners_3d[0])
+        # Evaluate 4 corners (counter-clockwise in UV)
+        corners = [surface.PointAt(u, v) for u, v in ((nu0, nv0), (nu1, nv0), (nu1, nv1), (nu0, nv1))]
         
-        # Create the planar curve for the panel
-        # Note: If surface is non-planar, these 4 points might not be planar.
-        # rs.AddSrfPt is robust for 3-4 points.
-        panel_srf = rs.AddSrfPt(corners_3d[:-1]) # Remove duplicate for AddSrfPt
+        # Extrusion direction from the panel centre
+        normal = surface.NormalAt((nu0 + nu1) / 2, (nv0 + nv1) / 2)
+        normal.Unitize()
         
-        if panel_srf:
-            # Calculate Normal for extrusion
-            center_u = (nu0 + nu1) / 2
-            center_v = (nv0 + nv1) / 2
-            normal = rs.SurfaceNormal(srf, [center_u, center_v])
-            normal = rs.VectorUnitize(normal)
-            
-            # Determine Extrusion Height
-            # Varied height for texture
-            h = random.uniform(max_height * 0.1, max_height)
-            
-            # 50% chance to be "flush" (very thin) vs "protruding"
-            if random.random() < 0.3:
-                h = max_height * 0.05
-                
-            vec = rs.VectorScale(normal, h)
-            
-            # Create Extrusion Path
-            # We can't use ExtrudeSurface simply without a curve, 
-            # and automating "ExtrudeSurface" via rs.ExtrudeSurface(srf, curve) works best.
-            # We need a line curve representing the vector.
-            start_pt = corners_3d[0]
-            end_pt = rs.PointAdd(start_pt, vec)
-            path_crv = rs.AddLine(start_pt, end_pt)
-            
-            if path_crv:
-                extrusion = rs.ExtrudeSurface(panel_srf, path_crv)
-                rs.DeleteObject(path_crv)
-                
-                if extrusion:
-                    rs.CapPlanarHoles(extrusion)
-                    generated_objs.append(extrusion)
+        h = panel_height(max_height)
+        if h <= 0:
+            continue
             
-            # Clean up the base surface
-            rs.DeleteObject(panel_srf)
+        vec = normal * h
+        top = [pt + vec for pt in corners]
+        
+        if output == "Mesh":
+            buf.add_prism([(p.X, p.Y, p.Z) for p in corners],
+                          [(p.X, p.Y, p.Z) for p in top], QUAD_TRIS)
+            added += 1
+        else:
+            box = rg.Brep.CreateFromBox(corners + top)
+            if box:
+                breps.append(box)
+    return added
+
+def create_cyber_panels():
+    """
+    Applies a recursive subdivision (quadtree-like) to a selected surface,
+    creating irregular panels with varying extrusion heights for a 'Cyberpunk' / Greeble effect.
+    """
+    # 1. Select Target Surface
+    srf = rs.GetObject("Select a surface to panelize", rs.filter.surface)
+    if not srf: return
+
+    # 2. Parameters
+    generations = rs.GetInteger("Recursion Depth (Complexity)", 4, 1, 14)
+    if generations is None: return
+
+    max_height = rs.GetReal("Max Panel Extrusion Height", 1.0, 0.0)
+    if max_height is None: return
+
+    gap_percent = rs.GetReal("Panel Gap % (0.0 - 0.5)", 0.05, 0.0, 0.5)
+    if gap_percent is None: return
+
+    # Breps keep one solid per panel; Mesh bakes every panel as one object;
+    # Greeble bakes one mesh of bevelled patches that follow the surface
+    output = rs.GetString("Output", "Breps", ["Breps", "Mesh", "Greeble"])
+    if output is None: return
+    output = output.capitalize()
+
+    greeble_res, bevel = 1, 0.0
+    if output == "Greeble":
+        greeble_res = rs.GetInteger("Greeble grid resolution (per panel side)", 4, 1, 16)
+        if greeble_res is None: return
+        bevel = rs.GetReal("Greeble bevel (fraction of panel per side)", 0.15, 0.0, 0.45)
+        if bevel is None: return
+
+    # 3. Execution
+    rs.EnableRedraw(False)
+    
+    # Get surface domain boundaries
+    u_domain = rs.SurfaceDomain(srf, 0)
+    v_domain = rs.SurfaceDomain(srf, 1)
+    surface = rs.coercesurface(srf)
+    
+    # UV rectangles are generated lazily and consumed in chunks
+    panels_uv = split_panels(u_domain[0], u_domain[1], v_domain[0], v_domain[1], generations)
+    
+    # Build every box in memory first; nothing touches the document until the end
+    breps = []
+    buf = MeshBuffer()
+    gbuf = GreebleBuffer(greeble_res) if output == "Greeble" else None
+    mesh_panels = 0
+    processed = 0
+    cancelled = False
+
+    # At most 2^generations panels; early stops finish below that
+    rs.StatusBarProgressMeterShow("Building panels", 0, 2 ** generations, True, True)
+    try:
+        while True:
+            chunk = list(itertools.islice(panels_uv, PANEL_CHUNK))
+            if not chunk:
+                break
+            if gbuf:
+                mesh_panels += build_greebles(surface, chunk, max_height, gap_percent, bevel, gbuf)
+            else:
+                mesh_panels += build_panels(surface, chunk, max_height, gap_percent, output, breps, buf)
+            processed += len(chunk)
+            rs.StatusBarProgressMeterUpdate(processed, True)
+            if sc.escape_test(False):
+                cancelled = True
+                break
+    finally:
+        rs.StatusBarProgressMeterHide()
+
+    if cancelled:
+        rs.EnableRedraw(True)
+        print("CyberPanels cancelled after {} panels; nothing was added.".format(processed))
+        return
+
+    # Bake once
+    generated_objs = []
+    if gbuf:
+        buf = gbuf.to_mesh_buffer()
+    if output != "Breps":
+        if buf.face_count:
+            obj_id = sc.doc.Objects.AddMesh(mesh_from_buffer(buf))
+            if obj_id != System.Guid.Empty:
+                generated_objs.append(obj_id)
+    else:
+        for box in breps:
+            obj_id = sc.doc.Objects.AddBrep(box)
+            if obj_id != System.Guid.Empty:
+                generated_objs.append(obj_id)
 
     # Group
     if generated_objs:
@@ -139,7 +354,10 @@ def create_cyber_panels():
         rs.AddObjectsToGroup(generated_objs, grp)
         
     rs.EnableRedraw(True)
-    print("Generated {} cyber panels.".format(len(generated_objs)))
+    if output != "Breps":
+        print("Generated {} cyber panels as one mesh.".format(mesh_panels))
+    else:
+        print("Generated {} cyber panels.".format(len(generated_objs)))
 
 if __name__ == "__main__":
     create_cyber_panels()
@@ -1,6 +1,45 @@
+
 import rhinoscriptsyntax as rs
+import Rhino.Geometry as rg
+import scriptcontext as sc
+import System
 import random
 import math
+import os
+import sys
+
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
+
+from pile import BRICK
+from pile.assets import body_asset, get_brick_dims
+
+# Bricks placed between progress updates / Escape checks
+BRICK_CHUNK = 100
+
+def brick_transform(rng, center, spread, h_peak, sigma):
+    """Compose one brick's placement (spin Z, tilt X, tilt Y, then move) into a single Transform."""
+    # Use gaussian for natural "pile" falloff
+    x_off = rng.gauss(0, spread)
+    y_off = rng.gauss(0, spread)
+
+    # Gaussian heap: H(r) = H_max * exp(-r^2 / 2 sigma^2), randomized below that surface
+    dist = math.sqrt(x_off**2 + y_off**2)
+    pile_z = h_peak * math.exp(-(dist**2)/(2*sigma**2))
+    z_off = rng.uniform(0, pile_z)
+
+    # Random Rotation
+    rot_x = math.radians(rng.uniform(0, 360))
+    rot_y = math.radians(rng.uniform(0, 360))
+    rot_z = math.radians(rng.uniform(0, 360))
+
+    origin = rg.Point3d.Origin
+    xform = rg.Transform.Translation(center.X + x_off, center.Y + y_off, center.Z + z_off)
+    xform *= rg.Transform.Rotation(rot_y, rg.Vector3d.YAxis, origin)
+    xform *= rg.Transform.Rotation(rot_x, rg.Vector3d.XAxis, origin)
+    xform *= rg.Transform.Rotation(rot_z, rg.Vector3d.ZAxis, origin)
+    return xform
 
 def create_random_pile():
     """
@@ -10,113 +49,70 @@ def create_random_pile():
     num_bricks = rs.GetInteger("Number of bricks", 100, 1, 5000)
     if num_bricks is None: return
 
-    # Default brick size (approx standard proportions 8:4:2.5)
-    l = 20.0
-    w = 10.0
-    h = 5.0
+    # Brick size from the catalogue, in document units
+    dims = get_brick_dims()
+    if dims is None: return
+    l, w, h = dims
+    asset = body_asset(BRICK, dims)
 
     # Get center point for the pile
     center = rs.GetPoint("Select center point for the pile")
     if not center: return
 
-    rs.EnableRedraw(False)
-    rs.StatusBarProgressMeterShow("Building Pile", 0, num_bricks, True, True)
+    output = rs.GetString("Output", "Blocks", ["Blocks", "Mesh"])
+    if output is None: return
+    as_mesh = output.capitalize() == "Mesh"
+
+    seed = rs.GetInteger("Random seed (0 = new random seed)", 0, 0)
+    if seed is None: return
+    if seed == 0:
+        seed = random.randint(1, 2**31 - 1)
+    rng = random.Random(seed)
 
+    # Pile shape: gaussian clump, peak height scales with the brick count
+    spread = l * 3.0
+    h_peak = num_bricks * h * 0.05
+    sigma = spread * 1.5
+
+    # 2. Place every brick in memory: one Transform each
+    xforms = []
+    rs.StatusBarProgressMeterShow("Building Pile", 0, num_bricks, True, True)
     try:
-        # 2. Generate bricks
         for i in range(num_bricks):
-            rs.StatusBarProgressMeterUpdate(i, True)
-            
-            # Allow cancellation checking (Rhino logic usually handles escape in loops efficiently but check periodically)
-            if i % 10 == 0:
-                rs.Prompt("Building brick {} of {}...".format(i+1, num_bricks))
-            
-            # Algorithm:
-            # We want a somewhat conical pile.
-            # Bricks higher up should be more centered.
-            # Bricks lower down can be more spread out.
-            
-            # Progress 0.0 to 1.0
-            t = float(i) / float(num_bricks)
-            
-            # Radius decreases as we go up, but with randomness
-            # A simple approximation: 
-            # Height increases with i
-            # Spread depends on how many bricks are below.
-            
-            # Let's try a specific volume approach:
-            # Random gaussian distribution tends to look like a clump.
-            
-            # Random position in X, Y
-            # Use gaussian for natural "pile" falloff
-            spread = l * 3.0 # Base spread factor
-            
-            # Variation 1: Gaussian clump
-            x_off = random.gauss(0, spread)
-            y_off = random.gauss(0, spread)
-            
-            # Z position: 
-            # In a real pile, height depends on x/y (higher in middle).
-            # Bell curve for Z based on distance from center.
-            dist = math.sqrt(x_off**2 + y_off**2)
-            
-            # Approximate height of pile at this distance
-            # Max height in center proportional to total bricks?
-            # Let's just stack them randomly in Z but constrained by a cone.
-            # Cone defined by: H = MaxH - Slope * Dist
-            
-            # Alternatively, simpler approach for visual effect:
-            # Just scatter them in a bounding cylinder, but bias Z to be higher if X,Y is central.
-            
-            # Simplest workable "Pile":
-            # 1. Pick random pt in circle.
-            # 2. Z is random but generally higher for later bricks? No, physics doesn't verify order.
-            
-            # Let's just place them explicitly.
-            # X, Y = uniform random in disk.
-            # Z = a function of distance from center + randomness.
-            # H(r) = H_max * exp(-r^2 / sigma^2)  (Gaussian heap)
-            
-            # Peak height approx
-            h_peak = num_bricks * h * 0.05 # rough guess
-            sigma = spread * 1.5
-            
-            pile_z = h_peak * math.exp(-(dist**2)/(2*sigma**2))
-            
-            # Randomize z slightly around that theoretical surface
-            z_off = random.uniform(0, pile_z)
-            
-            # Absolute pos
-            pos = [center.X + x_off, center.Y + y_off, center.Z + z_off]
-            
-            # Create the brick at origin first for easy rotation
-            # Box corners
-            # 0,0,0 is corner. 
-            # Let's center the box on 0,0,0
-            corners = [
-                [-l/2, -w/2, -h/2], [l/2, -w/2, -h/2], [l/2, w/2, -h/2], [-l/2, w/2, -h/2],
-                [-l/2, -w/2, h/2],  [l/2, -w/2, h/2],  [l/2, w/2, h/2],  [-l/2, w/2, h/2]
-            ]
-            
-            box_id = rs.AddBox(corners)
-            
-            # Random Rotation
-            # Rotate around X, Y, Z axes
-            rot_x = random.uniform(0, 360)
-            rot_y = random.uniform(0, 360) 
-            rot_z = random.uniform(0, 360)
-            
-            rs.RotateObject(box_id, [0,0,0], rot_z, [0,0,1])
-            rs.RotateObject(box_id, [0,0,0], rot_x, [1,0,0])
-            rs.RotateObject(box_id, [0,0,0], rot_y, [0,1,0])
-            
-            # Move to position
-            rs.MoveObject(box_id, pos)
-            
+            xforms.append(brick_transform(rng, center, spread, h_peak, sigma))
+            if (i + 1) % BRICK_CHUNK == 0:
+                rs.StatusBarProgressMeterUpdate(i + 1, True)
+                if sc.escape_test(False):
+                    print("Cancelled.")
+                    return
     finally:
         rs.StatusBarProgressMeterHide()
+
+    # 3. Bake: one definition plus references, or one merged mesh
+    rs.EnableRedraw(False)
+    created = []
+    try:
+        if as_mesh:
+            pile = rg.Mesh()
+            pile.Append([asset.placed_mesh(xform) for xform in xforms])
+            pile.Normals.ComputeNormals()
+            obj_id = sc.doc.Objects.AddMesh(pile)
+            if obj_id != System.Guid.Empty:
+                created.append(obj_id)
+        else:
+            idef_index = asset.block_index()
+            if idef_index < 0:
+                print("Could not create the brick block definition.")
+                return
+            for xform in xforms:
+                obj_id = sc.doc.Objects.AddInstanceObject(idef_index, xform)
+                if obj_id != System.Guid.Empty:
+                    created.append(obj_id)
+            if created:
+                rs.AddObjectsToGroup(created, rs.AddGroup())
+    finally:
         rs.EnableRedraw(True)
-        print("Done creating pile.")
+        print("Done creating pile: {} bricks (seed {}).".format(len(xforms), seed))
 
 if __name__ == "__main__":
     create_random_pile()
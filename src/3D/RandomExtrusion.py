@@ -1,21 +1,344 @@
-
+# r: numpy
 import rhinoscriptsyntax as rs
-import Rhino
+import Rhino.Geometry as rg
 import scriptcontext as sc
-import random
+import System
+import os
+import sys
+
+import numpy as np
+
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
+
+from fields.raster import load_grayscale
+from massing import (random_heights, attractor_heights, area_heights, raster_heights,
+                     load_csv_grid, prepare_footprints, prism_buffers)
+from meshing.bake import mesh_from_arrays
+
+# Source kinds
+CURVE, BREP, SUBD = "curve", "brep", "subd"
+
+# Objects built between progress updates / Escape checks
+BUILD_CHUNK = 256
+
+def collect_sources(ids):
+    """Read the selected objects once into (obj_id, kind, geometry) tuples.
+
+    Anything that is not a curve, surface, polysurface or SubD is skipped.
+    Extrusion objects (lightweight surfaces) are converted to breps.
+    """
+    sources = []
+    for obj_id in ids:
+        rh_obj = sc.doc.Objects.FindId(obj_id)
+        if rh_obj is None:
+            continue
+        geo = rh_obj.Geometry
+        if isinstance(geo, rg.Curve):
+            sources.append((obj_id, CURVE, geo))
+        elif isinstance(geo, rg.Brep):
+            sources.append((obj_id, BREP, geo))
+        elif isinstance(geo, rg.Extrusion):
+            brep = geo.ToBrep(True)
+            if brep:
+                sources.append((obj_id, BREP, brep))
+        elif isinstance(geo, rg.Surface):
+            sources.append((obj_id, BREP, geo.ToBrep()))
+        elif isinstance(geo, rg.SubD):
+            sources.append((obj_id, SUBD, geo))
+    return sources
+
+def footprint_metrics(sources):
+    """Centroid (n, 3) and area (n,) of every source, for the height modes.
+
+    Closed planar curves and surfaces use their area centroid; open curves
+    and SubDs fall back to the bounding box centre and plan area.
+    """
+    n = len(sources)
+    centroids = np.empty((n, 3))
+    areas = np.empty(n)
+    for i, (_, kind, geo) in enumerate(sources):
+        amp = None
+        if kind == BREP:
+            amp = rg.AreaMassProperties.Compute(geo, True, True, False, False)
+        elif kind == CURVE and geo.IsClosed and geo.IsPlanar():
+            amp = rg.AreaMassProperties.Compute(geo)
+        if amp:
+            c = amp.Centroid
+            centroids[i] = (c.X, c.Y, c.Z)
+            areas[i] = amp.Area
+        else:
+            bb = geo.GetBoundingBox(True)
+            c = bb.Center
+            centroids[i] = (c.X, c.Y, c.Z)
+            areas[i] = (bb.Max.X - bb.Min.X) * (bb.Max.Y - bb.Min.Y)
+    return centroids, areas
+
+def get_heights(sources, h_min, h_max):
+    """Prompt for the height mode and compute one height per source.
+
+    Returns:
+        (heights array, mode name), or None if cancelled.
+    """
+    mode = rs.GetString("Height mode", "Random", ["Random", "Attractor", "Area", "Raster"])
+    if mode is None: return None
+    mode = mode.capitalize()
+
+    if mode == "Random":
+        return random_heights(len(sources), h_min, h_max, np.random.default_rng()), mode
+
+    centroids, areas = footprint_metrics(sources)
+
+    if mode == "Attractor":
+        pt_ids = rs.GetObjects("Select attractor points (tallest there)", rs.filter.point)
+        if not pt_ids: return None
+        attractors = np.array([tuple(rs.PointCoordinates(pid)) for pid in pt_ids])
+        bb_diag = np.linalg.norm(centroids.max(0) - centroids.min(0))
+        falloff = rs.GetReal("Falloff distance (minimum height beyond)", round(max(bb_diag / 3.0, 1.0), 2), 0.001)
+        if falloff is None: return None
+        return attractor_heights(centroids, attractors, h_min, h_max, falloff), mode
+
+    if mode == "Area":
+        inv = rs.GetBoolean("Area mapping", (("Tallest", "LargestFootprints", "SmallestFootprints"),), (False,))
+        if inv is None: return None
+        return area_heights(areas, h_min, h_max, inv[0]), mode
+
+    if mode == "Raster":
+        path = rs.OpenFileName("Heightmap (image or CSV)",
+                               "Heightmaps (*.png;*.jpg;*.bmp;*.tif;*.csv;*.txt)|*.png;*.jpg;*.jpeg;*.bmp;*.tif;*.tiff;*.csv;*.txt||")
+        if not path: return None
+        try:
+            if os.path.splitext(path)[1].lower() in (".csv", ".txt"):
+                grid = load_csv_grid(path)
+            else:
+                grid = load_grayscale(path)
+        except Exception as e:
+            print("Could not read heightmap: {}".format(e))
+            return None
+        # The map is stretched over the plan extents of the footprints
+        lo = centroids.min(0)
+        hi = centroids.max(0)
+        bounds = (lo[0], lo[1], hi[0], hi[1])
+        return raster_heights(centroids, grid, bounds, h_min, h_max), mode
+
+    return None
+
+def extrude_curve(curve, height, direction, tol):
+    """Extrude a curve by height along direction (unit vector).
+
+    Closed planar curves whose plane faces the direction become capped
+    Extrusion objects (the cheapest solid Rhino has); anything else is
+    swept along the vector with Surface.CreateExtrusion and capped when
+    the curve is closed and planar.
+    """
+    closed = curve.IsClosed
+    if closed:
+        rc, plane = curve.TryGetPlane(tol)
+        if rc and abs(plane.ZAxis * direction) > 1.0 - 1e-6:
+            # Extrusion.Create extrudes along the curve plane's normal, whose
+            # sign follows the curve orientation
+            signed = height if plane.ZAxis * direction > 0 else -height
+            ext = rg.Extrusion.Create(curve, signed, True)
+            if ext:
+                return ext
+    srf = rg.Surface.CreateExtrusion(curve, direction * height)
+    if srf is None:
+        return None
+    brep = srf.ToBrep()
+    if closed and curve.IsPlanar(tol):
+        capped = brep.CapPlanarHoles(tol)
+        if capped:
+            brep = capped
+    return _outward(brep)
+
+def extrude_brep(brep, height, direction, tol):
+    """Extrude a surface or polysurface into a solid.
+
+    Everything is swept along direction like ExtrudeSrf. Single faces use
+    BrepFace.CreateExtrusion along a straight path; polysurfaces (or a face
+    it fails on) are built from the original faces, a translated copy and
+    one wall per naked edge, joined into one brep.
+    """
+    vec = direction * height
+    if brep.Faces.Count == 1:
+        path = rg.LineCurve(rg.Point3d.Origin, rg.Point3d.Origin + vec)
+        solid = brep.Faces[0].CreateExtrusion(path, True)
+        if solid:
+            return _outward(solid)
+
+    top = brep.DuplicateBrep()
+    top.Translate(vec)
+    parts = [brep.DuplicateBrep(), top]
+    for edge in brep.DuplicateNakedEdgeCurves(True, False):
+        wall = rg.Surface.CreateExtrusion(edge, vec)
+        if wall:
+            parts.append(wall.ToBrep())
+    joined = rg.Brep.JoinBreps(parts, tol)
+    if not joined or len(joined) != 1:
+        return None
+    return _outward(joined[0])
+
+def extrude_subd(subd, height):
+    """Offset a SubD along its normals and close the gap (ExtrudeSubD Direction=Normal)."""
+    return subd.Offset(height, True)
+
+def _outward(brep):
+    if brep.IsSolid and brep.SolidOrientation == rg.BrepSolidOrientation.Inward:
+        brep.Flip()
+    return brep
+
+def build_extrusions(sources, heights, direction, tol):
+    """Extrude every source in memory.
+
+    A source that RhinoCommon fails on is reported and skipped.
+
+    Returns:
+        List of (obj_id, geometry, height) for the sources that extruded, or None if
+        the user pressed Escape.
+    """
+    results = []
+    rs.StatusBarProgressMeterShow("Extruding", 0, len(sources), True, True)
+    try:
+        for i, ((obj_id, kind, geo), h) in enumerate(zip(sources, heights)):
+            try:
+                if kind == CURVE:
+                    out = extrude_curve(geo, h, direction, tol)
+                elif kind == BREP:
+                    out = extrude_brep(geo, h, direction, tol)
+                else:
+                    out = extrude_subd(geo, h)
+            except Exception as e:
+                print("Skipping object {}: {}".format(obj_id, e))
+                out = None
+            if out:
+                results.append((obj_id, out, h))
+
+            if (i + 1) % BUILD_CHUNK == 0:
+                rs.StatusBarProgressMeterUpdate(i + 1, True)
+                if sc.escape_test(False):
+                    return None
+    finally:
+        rs.StatusBarProgressMeterHide()
+    return results
+
+def bake_extrusions(results, mode):
+    """Add the extruded geometry to the document in one pass, on each source's layer.
+
+    The height and the mode that produced it are stored as user text
+    ("height", "height_mode") on every new object.
+    """
+    table = sc.doc.Objects
+    created = []
+    for obj_id, geo, h in results:
+        attr = table.FindId(obj_id).Attributes.Duplicate()
+        attr.ObjectId = System.Guid.Empty
+        attr.SetUserString("height", "{:.4f}".format(h))
+        attr.SetUserString("height_mode", mode)
+        if isinstance(geo, rg.Extrusion):
+            new_id = table.AddExtrusion(geo, attr)
+        elif isinstance(geo, rg.SubD):
+            new_id = table.AddSubD(geo, attr)
+        else:
+            new_id = table.AddBrep(geo, attr)
+        if new_id != System.Guid.Empty:
+            created.append(new_id)
+    return created
+
+# ---------------------------------------------------------------------------
+# Massing (mesh) output
+# ---------------------------------------------------------------------------
+
+def footprint_points(kind, geo, tol):
+    """Corners of a planar footprint as an (n, 3) array, or None.
+
+    Closed planar curves and single planar faces (outer boundary) qualify;
+    curved segments are flattened within tolerance.
+    """
+    if kind == CURVE:
+        crv = geo
+    elif kind == BREP and geo.Faces.Count == 1 and geo.Faces[0].IsPlanar(tol):
+        crv = geo.Faces[0].OuterLoop.To3dCurve()
+    else:
+        return None
+    if crv is None or not crv.IsClosed or not crv.IsPlanar(tol):
+        return None
+    rc, pl = crv.TryGetPolyline()
+    if not rc:
+        pl_crv = crv.ToPolyline(tol, sc.doc.ModelAngleToleranceRadians, 0.0, 0.0)
+        if pl_crv is None:
+            return None
+        pl = pl_crv.ToPolyline()
+    return np.array([(p.X, p.Y, p.Z) for p in pl])
+
+def build_massing(sources, heights, direction, tol):
+    """Triangulate every footprint once and build prisms into one buffer per layer.
+
+    Returns:
+        (dict of layer index -> (vertices, faces, parcels), footprints used).
+        parcels lists (source id, height, first face index) per prism, in
+        mesh face order.
+    """
+    by_layer = {}
+    for (obj_id, kind, geo), h in zip(sources, heights):
+        try:
+            pts = footprint_points(kind, geo, tol)
+        except Exception as e:
+            print("Skipping object {}: {}".format(obj_id, e))
+            pts = None
+        if pts is None:
+            continue
+        layer = sc.doc.Objects.FindId(obj_id).Attributes.LayerIndex
+        ids, footprints, layer_heights = by_layer.setdefault(layer, ([], [], []))
+        ids.append(obj_id)
+        footprints.append(pts)
+        layer_heights.append(h)
+
+    d = np.array([direction.X, direction.Y, direction.Z])
+    buffers = {}
+    used = 0
+    for layer, (ids, footprints, layer_heights) in by_layer.items():
+        prepared = prepare_footprints(footprints, d)
+        if not prepared:
+            continue
+        vertices, faces = prism_buffers(prepared, layer_heights, d)
+        # Caps and walls of each prism are written one after the other
+        parcels = []
+        f = 0
+        for i, corners, tris in prepared:
+            parcels.append((ids[i], layer_heights[i], f))
+            f += 2 * len(tris) + len(corners)
+        buffers[layer] = (vertices, faces, parcels)
+        used += len(prepared)
+    return buffers, used
+
+def bake_massing(buffers, mode):
+    """Add one mesh per layer. Returns the new object ids.
+
+    Besides "height_mode", each mesh carries its prisms as comma separated
+    user text in face order: "parcels" (source object ids), "heights" and
+    "parcel_faces" (index of each prism's first face).
+    """
+    created = []
+    for layer, (vertices, faces, parcels) in buffers.items():
+        attr = sc.doc.CreateDefaultAttributes()
+        attr.LayerIndex = layer
+        attr.SetUserString("height_mode", mode)
+        attr.SetUserString("parcels", ",".join(str(obj_id) for obj_id, _, _ in parcels))
+        attr.SetUserString("heights", ",".join("{:.4f}".format(h) for _, h, _ in parcels))
+        attr.SetUserString("parcel_faces", ",".join(str(f) for _, _, f in parcels))
+        new_id = sc.doc.Objects.AddMesh(mesh_from_arrays(vertices, faces), attr)
+        if new_id != System.Guid.Empty:
+            created.append(new_id)
+    return created
 
 def random_extrusion():
     """
     Randomly extrudes selected curves, surfaces, polysurfaces, or SubD objects.
-    Each object gets a random extrusion height between a user-defined min and max.
+    Each object gets an extrusion height between a user-defined min and max,
+    either random or driven by attractor points, footprint area or a heightmap.
     """
     # 1. Select Objects
-    # Object types: 4=Curve, 8=Surface, 16=Polysurface, 262144=SubD (approx logic, usually 0 selects all but we can filter)
-    # We allow everything initially and filter in loop or let command fail gracefully?
-    # Better to filter: 4 + 8 + 16 (Polysrf) 
-    # SubD type filter in rs.GetObjects might rely on the integer. 
-    # 0 = All. Let's use 0 and check Is... later.
-    
     ids = rs.GetObjects("Select curves, surfaces, polysurfaces, or SubD to extrude", 0, preselect=True)
     if not ids:
         return
@@ -23,7 +346,7 @@ def random_extrusion():
     # 2. Get Parameters
     h_min = rs.GetReal("Minimum Extrusion Height", 5.0)
     if h_min is None: return
-    
+
     h_max = rs.GetReal("Maximum Extrusion Height", 15.0)
     if h_max is None: return
 
@@ -31,85 +354,59 @@ def random_extrusion():
     if h_min > h_max:
         h_min, h_max = h_max, h_min
 
+    sources = collect_sources(ids)
+    if not sources:
+        print("Nothing to extrude.")
+        return
+
+    output = rs.GetString("Output", "Solids", ["Solids", "Mesh"])
+    if output is None: return
+    massing = output.capitalize() == "Mesh"
+
+    # 3. Heights (one vectorized pass) and extrusion direction (CPlane Z, like ExtrudeCrv)
+    picked = get_heights(sources, h_min, h_max)
+    if picked is None: return
+    heights, mode = picked
+    direction = rs.ViewCPlane().ZAxis
+    tol = sc.doc.ModelAbsoluteTolerance
+
+    # 4. Build everything in memory, then bake once
+    if massing:
+        buffers, used = build_massing(sources, heights.tolist(), direction, tol)
+        if not used:
+            print("No closed planar footprints to build a massing mesh from.")
+            return
+    else:
+        results = build_extrusions(sources, heights.tolist(), direction, tol)
+        if results is None:
+            print("Cancelled.")
+            return
+
     rs.EnableRedraw(False)
-    
-    # 3. Iterate and Extrude
-    count = 0
-    new_objects = []
-    
-    # Start Undo Record
     undo_record_id = sc.doc.BeginUndoRecord("Random Extrusion")
-    
+    created = []
     try:
-        for obj_id in ids:
-            # Determine correct command
-            cmd = None
-            
-            # Check Types
-            obj_type = rs.ObjectType(obj_id)
-            
-            if obj_type == 4: # Curve
-                cmd = "ExtrudeCrv"
-            elif obj_type == 8 or obj_type == 16: # Surface or Polysurface
-                cmd = "ExtrudeSrf"
-            elif obj_type == 262144: # SubD
-                cmd = "ExtrudeSubD"
-            else:
-                # Fallback check
-                if rs.IsCurve(obj_id):
-                    cmd = "ExtrudeCrv"
-                elif rs.IsSurface(obj_id) or rs.IsPolysurface(obj_id):
-                    cmd = "ExtrudeSrf"
-                elif hasattr(rs, "IsSubD") and rs.IsSubD(obj_id):
-                     cmd = "ExtrudeSubD"
-                # Check directly via RhinoCommon if rs.IsSubD missing
-                elif sc.doc.Objects.Find(obj_id).Geometry.ObjectType == Rhino.DocObjects.ObjectType.SubD:
-                    cmd = "ExtrudeSubD"
-            
-            if not cmd:
-                continue
-
-            # Calculate random height
-            dist = random.uniform(h_min, h_max)
-            
-            # Select object for command
-            rs.UnselectAllObjects()
-            rs.SelectObject(obj_id)
-            
-            # Construct command
-            macro = ""
-            if cmd == "ExtrudeCrv":
-                macro = "-_ExtrudeCrv _Solid=_Yes {}".format(dist)
-            elif cmd == "ExtrudeSrf":
-                macro = "-_ExtrudeSrf _Solid=_Yes {}".format(dist)
-            elif cmd == "ExtrudeSubD":
-                macro = "-_ExtrudeSubD _Direction=_Normal {}".format(dist)
-            
-            # Execute
-            success = rs.Command(macro, False)
-            if success:
-                count += 1
-                # Capture created objects
-                last_objs = rs.LastCreatedObjects()
-                if last_objs:
-                    new_objects.extend(last_objs)
-
+        if massing:
+            created = bake_massing(buffers, mode)
+        else:
+            created = bake_extrusions(results, mode)
     except Exception as e:
         print("An error occurred: {}".format(e))
-    
     finally:
-        # End Undo Record
         if undo_record_id != 0:
             sc.doc.EndUndoRecord(undo_record_id)
 
         rs.EnableRedraw(True)
-        rs.UnselectAllObjects() # Clean up selection
-        
-        # Select newly created objects for user convenience (fixes SelLast/Selection issue)
-        if new_objects:
-            rs.SelectObjects(new_objects)
-            
-        print("Randomly extruded {} objects.".format(count))
+        rs.UnselectAllObjects()
+
+        # Select newly created objects for user convenience
+        if created:
+            rs.SelectObjects(created)
+
+        if massing:
+            print("Built {} of {} footprints into {} mesh(es).".format(used, len(sources), len(created)))
+        else:
+            print("Randomly extruded {} of {} objects.".format(len(created), len(sources)))
 
 if __name__ == "__main__":
     random_extrusion()
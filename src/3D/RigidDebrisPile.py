@@ -0,0 +1,152 @@
+# r: numpy
+import rhinoscriptsyntax as rs
+import scriptcontext as sc
+import random
+import math
+import os
+import sys
+
+import numpy as np
+
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
+
+from pile.hull_assets import hull_asset
+from pile.bake import StreamingBake
+from pile.document import get_pile, save_pile, tag_pile_objects
+from pile.hulls import MAX_PIECES
+from pile.world import PileWorld, SETTLE_ITERATIONS, rotation, yaw
+
+# Hulls roll over many small facets before they rest, so debris gets a
+# bigger budget and coarser tip steps than bricks (each step is still
+# bisected down to the first new contact)
+DEBRIS_ITERATIONS = 2 * SETTLE_ITERATIONS
+DEBRIS_TILT_STEP = math.radians(30.0)
+
+def random_rotation(tumble):
+    """Spawn orientation: uniformly random if tumble, else spin + slight tilt."""
+    if tumble:
+        # Uniform random rotation from a random unit quaternion (w >= 0)
+        q = [random.gauss(0, 1) for _ in range(4)]
+        if q[0] < 0:
+            q = [-c for c in q]
+        w, x, y, z = q
+        s = math.sqrt(x * x + y * y + z * z)
+        if s < 1e-12:
+            return np.eye(3)
+        return rotation((x / s, y / s, z / s), 2.0 * math.atan2(s, w))
+    rot_z = math.radians(random.uniform(0, 360))
+    rot_x = math.radians(random.gauss(0, 15))
+    rot_y = math.radians(random.gauss(0, 15))
+    return (yaw(rot_z)
+            .dot(rotation((0.0, 1.0, 0.0), rot_y))
+            .dot(rotation((1.0, 0.0, 0.0), rot_x)))
+
+def create_rigid_debris_pile():
+    """
+    Creates a pile of user geometry (rubble, logs, custom pieces) by
+    dropping copies of the picked objects. Each object is reduced once to a
+    convex hull (or a few convex pieces) for collision; the copies are
+    placed as block references.
+    """
+    # 1. User Inputs
+    # New pile, or continue a stored one and only drop the new pieces
+    pile = get_pile("DebrisPile")
+    if pile is None: return False
+    pile_name, world = pile
+
+    obj_ids = rs.GetObjects("Select meshes or polysurfaces to pile",
+                            rs.filter.mesh | rs.filter.polysurface | rs.filter.surface |
+                            rs.filter.extrusion, preselect=True)
+    if not obj_ids: return False
+
+    num_pieces = rs.GetInteger("Number of pieces", 200, 1, 5000)
+    if num_pieces is None: return False
+
+    # Convex pieces per object: 1 = a single hull, more for long or bent shapes
+    hull_pieces = rs.GetInteger("Convex pieces per object", 1, 1, MAX_PIECES)
+    if hull_pieces is None: return False
+
+    # Hulls are computed once per object (and cached for the session)
+    assets = []
+    for obj_id in obj_ids:
+        asset = hull_asset(obj_id, hull_pieces)
+        if asset is None:
+            print("Skipping an object that could not be meshed.")
+            continue
+        assets.append(asset)
+    if not assets: return False
+    size = max(2.0 * max(a.half_extents) for a in assets)
+
+    # Pile Radius
+    pile_radius = rs.GetReal("Pile Radius", round(2.5 * size, 4))
+    if pile_radius is None: return False
+
+    tumble = rs.GetBoolean("Spawn orientation", (("Tumble", "No", "Yes"),), (True,))
+    if tumble is None: return False
+    tumble = tumble[0]
+
+    # Tip steps each piece may take while settling (0 = no tipping)
+    iterations = rs.GetInteger("Settling iterations (0 = no tipping)", DEBRIS_ITERATIONS, 0, 200)
+    if iterations is None: return False
+
+    center = rs.GetPoint("Select center point")
+    if not center: return False
+
+    rs.EnableRedraw(False)
+    rs.StatusBarProgressMeterShow("Piling Debris", 0, num_pieces, True, True)
+
+    if world is None:
+        world = PileWorld(center.Z, cell=size)
+    first = world.count
+    # Register the hulls so the baker can map each body back to its block
+    by_shape = dict((world.shape(a.shape)[0], a) for a in assets)
+    # Block references, flushed every BAKE_CHUNK pieces
+    baker = StreamingBake(world, by_shape, first, blocks=True)
+
+    try:
+        for i in range(num_pieces):
+            rs.StatusBarProgressMeterUpdate(i, True)
+            if sc.escape_test(False):
+                print("Cancelled, keeping {} pieces.".format(world.count - first))
+                break
+
+            if i % 10 == 0:
+                rs.Prompt("Dropping piece {} of {}...".format(i+1, num_pieces))
+
+            # 1. Spawn Position
+            # Gaussian distribution for natural conical piling
+            angle = random.uniform(0, 2 * math.pi)
+            r_dist = abs(random.gauss(0, pile_radius / 2.0))
+
+            spawn_x = center.X + r_dist * math.cos(angle)
+            spawn_y = center.Y + r_dist * math.sin(angle)
+
+            # 2. Piece and orientation
+            asset = random.choice(assets)
+            rot = random_rotation(tumble)
+
+            # 3. Drop, settle and re-check the pieces it lands on
+            world.drop([spawn_x, spawn_y], rot, asset.shape, iterations, DEBRIS_TILT_STEP)
+            if baker.pending():
+                tag_pile_objects(baker.flush(), pile_name)
+
+    except Exception as e:
+        print("Error: {}".format(e))
+
+    finally:
+        # Bake what is left, then store the pile so it can be continued
+        tag_pile_objects(baker.flush(final=True), pile_name)
+        if world.count > first:
+            save_pile(pile_name, world)
+
+        rs.StatusBarProgressMeterHide()
+        rs.EnableRedraw(True)
+        sc.doc.Views.Redraw()
+        print("Dropped {} pieces on {} ({} in total).".format(world.count - first, pile_name, world.count))
+
+    return True
+
+if __name__ == "__main__":
+    create_rigid_debris_pile()
@@ -1,256 +1,22 @@
+# r: numpy
 import rhinoscriptsyntax as rs
 import Rhino
 import Rhino.Geometry as rg
 import scriptcontext as sc
-import random
-import math
+import os
+import sys
 
-# ============================================================
-# SUBDIVISION ALGORITHMS
-# Each returns {'cuts': [((u0,v0),(u1,v1)),...], 'panels': [(u0,u1,v0,v1),...]}
-# ============================================================
-
-def mondrian_subdivide(u_dom, v_dom, max_depth, min_ratio, split_min, split_max):
-    """Recursive Mondrian-style subdivision."""
-    cuts = []
-    panels = []
-    u_total = u_dom[1] - u_dom[0]
-    v_total = v_dom[1] - v_dom[0]
-
-    def recurse(u0, u1, v0, v1, depth):
-        u_frac = (u1 - u0) / u_total if u_total > 0 else 0
-        v_frac = (v1 - v0) / v_total if v_total > 0 else 0
-
-        if depth >= max_depth or (u_frac < min_ratio and v_frac < min_ratio):
-            panels.append((u0, u1, v0, v1))
-            return
-        if depth > 1 and random.random() < 0.12 * depth:
-            panels.append((u0, u1, v0, v1))
-            return
-
-        can_u = u_frac >= min_ratio * 2
-        can_v = v_frac >= min_ratio * 2
-        if not can_u and not can_v:
-            panels.append((u0, u1, v0, v1))
-            return
-
-        if can_u and can_v:
-            d = random.choice(['u', 'v'])
-        elif can_u:
-            d = 'u'
-        else:
-            d = 'v'
-
-        r = random.uniform(split_min, split_max)
-        if d == 'u':
-            s = u0 + r * (u1 - u0)
-            cuts.append(((s, v0), (s, v1)))
-            recurse(u0, s, v0, v1, depth + 1)
-            recurse(s, u1, v0, v1, depth + 1)
-        else:
-            s = v0 + r * (v1 - v0)
-            cuts.append(((u0, s), (u1, s)))
-            recurse(u0, u1, v0, s, depth + 1)
-            recurse(u0, u1, s, v1, depth + 1)
-
-    recurse(u_dom[0], u_dom[1], v_dom[0], v_dom[1], 0)
-    return {'cuts': cuts, 'panels': panels}
-
-
-def attractor_grid_subdivide(u_dom, v_dom, attractor_uv, u_count, v_count, contrast):
-    """Non-uniform grid that densifies near an attractor point."""
-
-    def generate_spacing(dom, count, attr_p, c):
-        d_min, d_max = dom
-        d_range = d_max - d_min
-        if d_range < 1e-12:
-            return [d_min, d_max]
-
-        n = 500
-        density = []
-        for i in range(n):
-            t = d_min + d_range * i / (n - 1)
-            dist = abs(t - attr_p) / d_range
-            # Clamp density to avoid extreme spikes
-            raw = 1.0 + c * (1.0 / (dist + 0.1) - 1.0)
-            density.append(max(0.2, min(raw, 50.0)))
-
-        cdf = [0.0]
-        for i in range(1, n):
-            cdf.append(cdf[-1] + density[i] * d_range / (n - 1))
-        total = cdf[-1]
-        if total < 1e-12:
-            # Fallback to uniform
-            return [d_min + d_range * k / float(count) for k in range(count + 1)]
-        cdf = [x / total for x in cdf]
-
-        vals = [d_min]
-        for k in range(1, count):
-            target = k / float(count)
-            lo, hi = 0, n - 1
-            while lo < hi:
-                mid = (lo + hi) // 2
-                if cdf[mid] < target:
-                    lo = mid + 1
-                else:
-                    hi = mid
-            vals.append(d_min + d_range * lo / (n - 1))
-        vals.append(d_max)
-        return vals
-
-    u_vals = generate_spacing(u_dom, u_count, attractor_uv[0], contrast)
-    v_vals = generate_spacing(v_dom, v_count, attractor_uv[1], contrast)
-
-    cuts = []
-    for u in u_vals[1:-1]:
-        cuts.append(((u, v_dom[0]), (u, v_dom[1])))
-    for v in v_vals[1:-1]:
-        cuts.append(((u_dom[0], v), (u_dom[1], v)))
+import numpy as np
 
-    panels = []
-    for i in range(len(u_vals) - 1):
-        for j in range(len(v_vals) - 1):
-            panels.append((u_vals[i], u_vals[i + 1], v_vals[j], v_vals[j + 1]))
-
-    return {'cuts': cuts, 'panels': panels}
-
-
-def staggered_strips_subdivide(u_dom, v_dom, num_strips, min_cross, max_cross, stagger, use_v):
-    """Variable-width strips with staggered cross-cuts (brick bond)."""
-    cuts = []
-    panels = []
-
-    if use_v:
-        p_dom, s_dom = v_dom, u_dom
-    else:
-        p_dom, s_dom = u_dom, v_dom
-
-    p_range = p_dom[1] - p_dom[0]
-    s_range = s_dom[1] - s_dom[0]
-
-    weights = [random.uniform(0.6, 1.4) for _ in range(num_strips)]
-    total_w = sum(weights)
-    edges = [p_dom[0]]
-    for w in weights[:-1]:
-        edges.append(edges[-1] + (w / total_w) * p_range)
-    edges.append(p_dom[1])
-
-    for p in edges[1:-1]:
-        if use_v:
-            cuts.append(((s_dom[0], p), (s_dom[1], p)))
-        else:
-            cuts.append(((p, s_dom[0]), (p, s_dom[1])))
-
-    for si in range(num_strips):
-        n_cross = random.randint(min_cross, max_cross)
-        positions = sorted([random.uniform(s_dom[0] + 0.04 * s_range,
-                                           s_dom[1] - 0.04 * s_range) for _ in range(n_cross)])
-
-        if si % 2 == 1 and stagger > 0 and n_cross > 0:
-            avg_sp = s_range / (n_cross + 1)
-            offset = stagger * avg_sp
-            positions = [p + offset for p in positions]
-            positions = [p for p in positions
-                         if s_dom[0] + 0.02 * s_range < p < s_dom[1] - 0.02 * s_range]
-
-        p0 = edges[si]
-        p1 = edges[si + 1]
-
-        for s in positions:
-            if use_v:
-                cuts.append(((s, p0), (s, p1)))
-            else:
-                cuts.append(((p0, s), (p1, s)))
-
-        all_s = [s_dom[0]] + sorted(positions) + [s_dom[1]]
-        for k in range(len(all_s) - 1):
-            if use_v:
-                panels.append((all_s[k], all_s[k + 1], p0, p1))
-            else:
-                panels.append((p0, p1, all_s[k], all_s[k + 1]))
-
-    return {'cuts': cuts, 'panels': panels}
-
-
-def quadtree_subdivide(u_dom, v_dom, max_depth, probability, attractor_uv=None):
-    """Quadtree with optional attractor-biased subdivision probability."""
-    cuts = []
-    panels = []
-    u_range = u_dom[1] - u_dom[0]
-    v_range = v_dom[1] - v_dom[0]
-
-    def recurse(u0, u1, v0, v1, depth):
-        if depth >= max_depth:
-            panels.append((u0, u1, v0, v1))
-            return
-
-        p = probability
-        if attractor_uv:
-            cu = (u0 + u1) / 2.0
-            cv = (v0 + v1) / 2.0
-            dist = math.sqrt(((cu - attractor_uv[0]) / max(u_range, 1e-12)) ** 2 +
-                             ((cv - attractor_uv[1]) / max(v_range, 1e-12)) ** 2)
-            p = min(1.0, probability * (1.5 / (dist + 0.3)))
-
-        if depth > 0 and random.random() > p:
-            panels.append((u0, u1, v0, v1))
-            return
-
-        mu = (u0 + u1) / 2.0
-        mv = (v0 + v1) / 2.0
-        cuts.append(((mu, v0), (mu, v1)))
-        cuts.append(((u0, mv), (u1, mv)))
-
-        recurse(u0, mu, v0, mv, depth + 1)
-        recurse(mu, u1, v0, mv, depth + 1)
-        recurse(u0, mu, mv, v1, depth + 1)
-        recurse(mu, u1, mv, v1, depth + 1)
-
-    recurse(u_dom[0], u_dom[1], v_dom[0], v_dom[1], 0)
-    return {'cuts': cuts, 'panels': panels}
-
-
-def fracture_subdivide(u_dom, v_dom, num_lines, angle_min, angle_max):
-    """Random fracture lines across the UV domain (cracked glass)."""
-    cuts = []
-    u_range = u_dom[1] - u_dom[0]
-    v_range = v_dom[1] - v_dom[0]
-
-    for _ in range(num_lines):
-        angle = random.uniform(angle_min, angle_max)
-        rad = math.radians(angle)
-        du = math.cos(rad)
-        dv = math.sin(rad)
-        ou = random.uniform(u_dom[0], u_dom[1])
-        ov = random.uniform(v_dom[0], v_dom[1])
-
-        t_cands = []
-        if abs(du) > 1e-10:
-            t_cands.append((u_dom[0] - ou) / du)
-            t_cands.append((u_dom[1] - ou) / du)
-        if abs(dv) > 1e-10:
-            t_cands.append((v_dom[0] - ov) / dv)
-            t_cands.append((v_dom[1] - ov) / dv)
-
-        eps = 1e-6 * max(u_range, v_range)
-        valid = []
-        for t in t_cands:
-            u_t = ou + t * du
-            v_t = ov + t * dv
-            if (u_dom[0] - eps <= u_t <= u_dom[1] + eps and
-                    v_dom[0] - eps <= v_t <= v_dom[1] + eps):
-                valid.append(t)
-
-        if len(valid) >= 2:
-            valid.sort()
-            start = (max(u_dom[0], min(u_dom[1], ou + valid[0] * du)),
-                     max(v_dom[0], min(v_dom[1], ov + valid[0] * dv)))
-            end = (max(u_dom[0], min(u_dom[1], ou + valid[-1] * du)),
-                   max(v_dom[0], min(v_dom[1], ov + valid[-1] * dv)))
-            cuts.append((start, end))
-
-    return {'cuts': cuts, 'panels': []}
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
 
+# Algorithms return {'cuts': (M, 2, 2) array, 'panels': (N, 4) array} in UV
+from subdivision.parallel import subdivide_faces, face_rng
+from subdivision.solids import inset_panels, random_depths, attractor_depths
+from subdivision.bake import (panel_polylines, cut_polylines, add_polylines, panel_frames,
+                              add_box_mesh, add_extrusions)
 
 # ============================================================
 # GEOMETRY HELPERS
@@ -440,6 +206,37 @@ def surface_subdivider():
         params['a_max'] = rs.GetReal("Max angle (degrees)", 180.0, params['a_min'], 180.0)
         if params['a_max'] is None: return False
 
+    # Polylines sample shared edges once with curvature-adaptive density;
+    # Curves fits an interpolated curve per edge (slow on large subdivisions)
+    output = rs.GetString("Outline output", "Polylines", ["Polylines", "Curves"])
+    if output is None: return False
+
+    # Every face draws from its own stream derived from this seed
+    seed = rs.GetInteger("Random seed (0 = new random seed)", 0, 0)
+    if seed is None: return False
+    if seed == 0:
+        seed = int(np.random.SeedSequence().entropy % (2 ** 31 - 1)) + 1
+
+    # Optional solid stage: extrude the panels straight from their UV records
+    solid = {'mode': rs.GetString("Panel solids", "None", ["None", "Mesh", "Extrusions"])}
+    if solid['mode'] is None: return False
+    if solid['mode'] != "None":
+        solid['depth_mode'] = rs.GetString("Solid depth", "Random", ["Random", "Attractor"])
+        if solid['depth_mode'] is None: return False
+        solid['min_d'] = rs.GetReal("Min extrusion depth", 0.2, 0.0)
+        if solid['min_d'] is None: return False
+        solid['max_d'] = rs.GetReal("Max extrusion depth", 1.0, solid['min_d'])
+        if solid['max_d'] is None: return False
+        solid['inset'] = rs.GetReal("Panel inset (fraction per side)", 0.05, 0.0, 0.45)
+        if solid['inset'] is None: return False
+        solid['offset'] = rs.GetReal("Base offset from surface", 0.0)
+        if solid['offset'] is None: return False
+        if solid['depth_mode'] == "Attractor":
+            solid['attr_pt'] = params.get('attr_pt') or rs.GetPoint("Pick depth attractor point")
+            if solid['attr_pt'] is None: return False
+            solid['falloff'] = rs.GetReal("Attractor falloff (UV fraction)", 0.5, 0.01, 2.0)
+            if solid['falloff'] is None: return False
+
     # --- Process each surface ---
     rs.EnableRedraw(False)
 
@@ -448,24 +245,30 @@ def surface_subdivider():
         rs.AddLayer(parent)
     cut_layer = ensure_child_layer(parent, "Cuts", rs.CreateColor(255, 80, 80))
     panel_layer = ensure_child_layer(parent, "Panels", rs.CreateColor(80, 180, 255))
+    solid_layer = None
+    if solid['mode'] != "None":
+        solid_layer = ensure_child_layer(parent, "Solids", rs.CreateColor(200, 200, 200))
 
     total_cuts = 0
     total_panels = 0
+    total_solids = 0
+    # Mesh output collects every face's boxes into one mesh on the Solids layer
+    solid_parts = []
+    # Maximum polyline deviation from the surface
+    sag_tol = sc.doc.ModelAbsoluteTolerance * 10
 
     try:
+        # UV stage: map attractors on the main thread, then subdivide all
+        # faces on a worker pool
+        jobs = []
         for face_idx, (srf, fi) in enumerate(surfaces):
             u_dom = (srf.Domain(0).Min, srf.Domain(0).Max)
             v_dom = (srf.Domain(1).Min, srf.Domain(1).Max)
-
             face_label = "face {}".format(fi) if fi >= 0 else "surface"
-            rs.Prompt("Subdividing {} ({}/{})...".format(face_label, face_idx + 1, len(surfaces)))
-
-            # Run the algorithm for this face
-            result = None
 
             if idx == 0:
-                result = mondrian_subdivide(u_dom, v_dom, params['depth'],
-                                            params['min_r'], params['sp_lo'], params['sp_hi'])
+                jobs.append((face_idx, 'mondrian', u_dom, v_dom,
+                             (params['depth'], params['min_r'], params['sp_lo'], params['sp_hi'])))
 
             elif idx == 1:
                 pt = params['attr_pt']
@@ -474,13 +277,13 @@ def surface_subdivider():
                 if not rc:
                     print("Skipping {} - could not map attractor.".format(face_label))
                     continue
-                result = attractor_grid_subdivide(u_dom, v_dom, (au, av),
-                                                  params['u_n'], params['v_n'], params['ctr'])
+                jobs.append((face_idx, 'attractor_grid', u_dom, v_dom,
+                             ((au, av), params['u_n'], params['v_n'], params['ctr'])))
 
             elif idx == 2:
-                result = staggered_strips_subdivide(u_dom, v_dom, params['n_strips'],
-                                                    params['mn_c'], params['mx_c'],
-                                                    params['stg'], params['use_v'])
+                jobs.append((face_idx, 'staggered_strips', u_dom, v_dom,
+                             (params['n_strips'], params['mn_c'], params['mx_c'],
+                              params['stg'], params['use_v'])))
 
             elif idx == 3:
                 a_uv = None
@@ -490,23 +293,62 @@ def surface_subdivider():
                     rc, au, av = srf.ClosestPoint(pt3d)
                     if rc:
                         a_uv = (au, av)
-                result = quadtree_subdivide(u_dom, v_dom, params['depth'],
-                                            params['prob'], a_uv)
+                jobs.append((face_idx, 'quadtree', u_dom, v_dom,
+                             (params['depth'], params['prob'], a_uv)))
 
             elif idx == 4:
-                result = fracture_subdivide(u_dom, v_dom, params['n_lines'],
-                                            params['a_min'], params['a_max'])
+                jobs.append((face_idx, 'fracture', u_dom, v_dom,
+                             (params['n_lines'], params['a_min'], params['a_max'])))
+
+        rs.Prompt("Subdividing {} face(s)...".format(len(jobs)))
+        results = subdivide_faces(jobs, seed)
 
-            if not result:
+        # Evaluation and baking stay on the main thread
+        for face_idx, (srf, fi) in enumerate(surfaces):
+            result = results.get(face_idx)
+            if result is None:
                 continue
+            face_label = "face {}".format(fi) if fi >= 0 else "surface"
+
+            if solid_layer and len(result['panels']):
+                panels = inset_panels(result['panels'], solid['inset'])
+                if solid['depth_mode'] == "Attractor":
+                    u_dom = (srf.Domain(0).Min, srf.Domain(0).Max)
+                    v_dom = (srf.Domain(1).Min, srf.Domain(1).Max)
+                    pt = solid['attr_pt']
+                    rc, au, av = srf.ClosestPoint(rg.Point3d(pt.X, pt.Y, pt.Z))
+                    if not rc:
+                        au, av = (u_dom[0] + u_dom[1]) / 2.0, (v_dom[0] + v_dom[1]) / 2.0
+                    depths = attractor_depths(panels, u_dom, v_dom, (au, av), solid['min_d'],
+                                              solid['max_d'], solid['falloff'])
+                else:
+                    depths = random_depths(len(panels), solid['min_d'], solid['max_d'],
+                                           face_rng(seed, face_idx, 1))
+                corners, normals = panel_frames(srf, panels)
+                if solid['mode'] == "Mesh":
+                    solid_parts.append((corners, normals, depths))
+                else:
+                    total_solids += len(add_extrusions(corners, normals, depths,
+                                                       solid['offset'], solid_layer))
+
+            if output == "Polylines":
+                rs.Prompt("Sampling {} ({}/{})...".format(face_label, face_idx + 1, len(surfaces)))
+                total_cuts += len(add_polylines(cut_polylines(srf, result['cuts'], sag_tol),
+                                                cut_layer))
+                total_panels += len(add_polylines(panel_polylines(srf, result['panels'], sag_tol),
+                                                  panel_layer))
+                continue
+
+            cuts = result['cuts'].tolist()
+            panels = result['panels'].tolist()
 
             # Create geometry for this face
             rs.StatusBarProgressMeterShow("Creating geometry",
-                                          0, max(len(result['cuts']) + len(result['panels']), 1),
+                                          0, max(len(cuts) + len(panels), 1),
                                           True, True)
             progress = 0
 
-            for uv0, uv1 in result['cuts']:
+            for uv0, uv1 in cuts:
                 crv = uv_to_curve(srf, uv0, uv1)
                 if crv:
                     guid = sc.doc.Objects.AddCurve(crv)
@@ -516,7 +358,7 @@ def surface_subdivider():
                 progress += 1
                 rs.StatusBarProgressMeterUpdate(progress, True)
 
-            for (u0, u1, v0, v1) in result['panels']:
+            for (u0, u1, v0, v1) in panels:
                 outline = panel_outline(srf, u0, u1, v0, v1)
                 if outline:
                     guid = sc.doc.Objects.AddCurve(outline)
@@ -526,6 +368,12 @@ def surface_subdivider():
                 progress += 1
                 rs.StatusBarProgressMeterUpdate(progress, True)
 
+        if solid_parts:
+            total_solids += len(add_box_mesh(np.concatenate([p[0] for p in solid_parts]),
+                                             np.concatenate([p[1] for p in solid_parts]),
+                                             np.concatenate([p[2] for p in solid_parts]),
+                                             solid['offset'], solid_layer))
+
     except Exception as e:
         print("Error: {}".format(e))
         import traceback
@@ -535,8 +383,10 @@ def surface_subdivider():
         rs.StatusBarProgressMeterHide()
         rs.EnableRedraw(True)
         sc.doc.Views.Redraw()
-        print("Done! {} cut curves, {} panel outlines across {} face(s).".format(
-            total_cuts, total_panels, len(surfaces)))
+        print("Done! {} cut curves, {} panel outlines across {} face(s) (seed {}).".format(
+            total_cuts, total_panels, len(surfaces), seed))
+        if solid_layer:
+            print("Added {} solid object(s) on {}.".format(total_solids, solid_layer))
 
     return True
 
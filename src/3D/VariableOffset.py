@@ -1,124 +1,278 @@
 # -*- coding: utf-8 -*-
+# r: numpy
 """
 VariableOffset - Offset curves and surfaces with a varying distance.
 Works like Rhino's built-in offset but interpolates between a min and max distance.
 Curves: offsets in the CPlane (like native offset).
 Surfaces/Polysurfaces: offsets along normals.
+The distance follows a law: linear/wave gradient, seeded noise, attractor
+curves, or a greyscale image.
 """
 import rhinoscriptsyntax as rs
 import Rhino
 import Rhino.Geometry as rg
 import scriptcontext as sc
 import math
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
 
-def variable_offset_curve(curve, cplane, dist_start, dist_end, num_waves, num_samples, both_sides):
-    """Offset a curve in the CPlane with variable distance."""
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
+
+from fields import NOISE_KINDS, WaveLaw, NoiseLaw, AttractorLaw, ImageLaw
+from fields.raster import load_grayscale
+from meshing.bake import mesh_from_arrays
+
+# Curve segments whose end tangents turn more than this are split
+REFINE_ANGLE = math.radians(5.0)
+REFINE_PASSES = 4
+
+
+def _tangents(curve, params):
+    out = np.empty((len(params), 3))
+    for k, t in enumerate(params):
+        v = curve.TangentAt(t)
+        out[k] = (v.X, v.Y, v.Z)
+    return out
+
+
+def sample_curve(curve, num_samples, max_angle=REFINE_ANGLE, passes=REFINE_PASSES):
+    """Sample a curve evenly, refine where it bends, and measure arc length once.
+
+    The curve is divided into num_samples segments; segments whose end
+    tangents turn by more than max_angle are halved, up to passes times.
+    Arc length is then integrated once per segment (not from the curve
+    start for every sample) into a cumulative table.
+
+    Returns:
+        (params, t_norm): (n,) curve parameters and their normalized arc
+        length positions in [0, 1], or None if the curve is too short.
+    """
     divs = curve.DivideByCount(num_samples, True)
     if not divs or len(divs) < 2:
-        return []
+        return None
+    params = np.array(list(divs), dtype=float)
+    if curve.IsClosed and params[-1] < curve.Domain.Max:
+        params = np.append(params, curve.Domain.Max)
+
+    tangents = _tangents(curve, params)
+    for _ in range(passes):
+        turn = np.einsum('ij,ij->i', tangents[:-1], tangents[1:])
+        split = np.nonzero(turn < math.cos(max_angle))[0]
+        if not len(split):
+            break
+        mids = (params[split] + params[split + 1]) / 2.0
+        params = np.insert(params, split + 1, mids)
+        tangents = np.insert(tangents, split + 1, _tangents(curve, mids), axis=0)
+
+    # Cumulative arc-length table, one short integral per segment
+    seg = [curve.GetLength(rg.Interval(a, b)) for a, b in zip(params[:-1].tolist(), params[1:].tolist())]
+    cum = np.concatenate([[0.0], np.cumsum(seg)])
+    if cum[-1] < 1e-10:
+        return None
+    return params, cum / cum[-1]
+
 
-    curve_length = curve.GetLength()
-    if curve_length < 1e-10:
+def variable_offset_curve(curve, cplane, dist_start, dist_end, law, num_samples, both_sides):
+    """Offset a curve in the CPlane with variable distance."""
+    sampled = sample_curve(curve, num_samples)
+    if sampled is None:
         return []
+    params, t_norm = sampled
+
+    # Points and offset directions: perpendicular in the CPlane
+    n = len(params)
+    pts = np.empty((n, 3))
+    dirs = np.empty((n, 3))
+    normal = cplane.Normal
+    for k, t in enumerate(params.tolist()):
+        pt = curve.PointAt(t)
+        tangent = curve.TangentAt(t)
+        offset_dir = rg.Vector3d.CrossProduct(tangent, normal)
+        if offset_dir.Length < 1e-10:
+            # Fallback if tangent is parallel to CPlane normal
+            offset_dir = rg.Vector3d.CrossProduct(tangent, rg.Vector3d.ZAxis)
+        offset_dir.Unitize()
+        pts[k] = (pt.X, pt.Y, pt.Z)
+        dirs[k] = (offset_dir.X, offset_dir.Y, offset_dir.Z)
+
+    # Distance law over all samples at once
+    dists = law.distances(t_norm, None, pts, dist_start, dist_end)
 
     results = []
     sides = [1, -1] if both_sides else [1]
 
     for side in sides:
-        offset_pts = []
-        for t in divs:
-            pt = curve.PointAt(t)
-
-            # Normalized position along curve (0 to 1)
-            sub_len = curve.GetLength(rg.Interval(curve.Domain.Min, t))
-            t_norm = sub_len / curve_length
-
-            # Compute variable distance
-            if num_waves <= 1:
-                # Linear gradient from start to end
-                d = dist_start + t_norm * (dist_end - dist_start)
-            else:
-                # Sine wave between min and max
-                mid = (dist_start + dist_end) / 2.0
-                amp = (dist_end - dist_start) / 2.0
-                d = mid + amp * math.sin(2.0 * math.pi * num_waves * t_norm)
-
-            # Offset direction: perpendicular in the CPlane
-            tangent = curve.TangentAt(t)
-            offset_dir = rg.Vector3d.CrossProduct(tangent, cplane.Normal)
-            if offset_dir.Length < 1e-10:
-                # Fallback if tangent is parallel to CPlane normal
-                offset_dir = rg.Vector3d.CrossProduct(tangent, rg.Vector3d.ZAxis)
-            offset_dir.Unitize()
-
-            offset_pts.append(pt + offset_dir * d * side)
-
-        if len(offset_pts) >= 2:
-            crv = rg.Curve.CreateInterpolatedCurve(offset_pts, 3)
-            if crv:
-                results.append(crv)
+        offset_pts = pts + dirs * (dists * side)[:, None]
+        crv = rg.Curve.CreateInterpolatedCurve([rg.Point3d(*p) for p in offset_pts.tolist()], 3)
+        if crv:
+            results.append(crv)
 
     return results
 
 
-def variable_offset_surface(surface, dist_start, dist_end, num_waves, samples):
+_GRID_FACES = {}
+
+
+def grid_faces(rows, cols):
+    """Quad index buffer of a row-major rows x cols vertex grid (cached per size)."""
+    key = (rows, cols)
+    faces = _GRID_FACES.get(key)
+    if faces is None:
+        a = (np.arange(rows - 1)[:, None] * cols + np.arange(cols - 1)[None, :]).ravel()
+        faces = np.stack([a, a + 1, a + cols + 1, a + cols], -1)
+        _GRID_FACES[key] = faces
+    return faces
+
+
+def sample_surface_grid(surface, samples):
+    """Evaluate a samples x samples grid in one pass.
+
+    Returns:
+        (u_norm, v_norm, points, normals): flat row-major arrays (v rows,
+        u columns) of normalized parameters, (n, 3) points and unit normals.
+    """
+    u_dom = surface.Domain(0)
+    v_dom = surface.Domain(1)
+    steps = np.linspace(0.0, 1.0, samples)
+    v_norm, u_norm = [g.ravel() for g in np.meshgrid(steps, steps, indexing='ij')]
+    us = (u_dom.Min + u_norm * (u_dom.Max - u_dom.Min)).tolist()
+    vs = (v_dom.Min + v_norm * (v_dom.Max - v_dom.Min)).tolist()
+
+    points = np.empty((len(us), 3))
+    normals = np.empty((len(us), 3))
+    point_at = surface.PointAt
+    normal_at = surface.NormalAt
+    for k in range(len(us)):
+        pt = point_at(us[k], vs[k])
+        n = normal_at(us[k], vs[k])
+        points[k] = (pt.X, pt.Y, pt.Z)
+        normals[k] = (n.X, n.Y, n.Z)
+
+    length = np.linalg.norm(normals, axis=1)
+    bad = ~np.isfinite(length) | (length < 1e-10)
+    normals[bad] = (0.0, 0.0, 1.0)
+    length[bad] = 1.0
+    return u_norm, v_norm, points, normals / length[:, None]
+
+
+def mesh_from_grid(points, rows, cols):
+    """Build a mesh from a row-major point grid using the cached index buffer."""
+    return mesh_from_arrays(points, grid_faces(rows, cols))
+
+
+def variable_offset_surface(surface, dist_start, dist_end, law, samples):
     """Offset a surface along its normals with variable distance."""
     u_dom = surface.Domain(0)
     v_dom = surface.Domain(1)
-    u_range = u_dom.Max - u_dom.Min
-    v_range = v_dom.Max - v_dom.Min
-
-    if u_range < 1e-12 or v_range < 1e-12:
+    if u_dom.Max - u_dom.Min < 1e-12 or v_dom.Max - v_dom.Min < 1e-12:
         return None
 
-    points = []
-    for j in range(samples):
-        v_norm = j / float(samples - 1)
-        v = v_dom.Min + v_norm * v_range
-        for i in range(samples):
-            u_norm = i / float(samples - 1)
-            u = u_dom.Min + u_norm * u_range
-
-            pt = surface.PointAt(u, v)
-            normal = surface.NormalAt(u, v)
-            if not normal.IsValid or normal.Length < 1e-10:
-                normal = rg.Vector3d.ZAxis
-            normal.Unitize()
-
-            # Vary distance along U direction
-            if num_waves <= 1:
-                d = dist_start + u_norm * (dist_end - dist_start)
-            else:
-                mid = (dist_start + dist_end) / 2.0
-                amp = (dist_end - dist_start) / 2.0
-                d = mid + amp * math.sin(2.0 * math.pi * num_waves * u_norm)
-
-            points.append(pt + normal * d)
+    u_norm, v_norm, points, normals = sample_surface_grid(surface, samples)
+
+    # Distance law over the whole grid (waves run along U)
+    dists = law.distances(u_norm, v_norm, points, dist_start, dist_end)
+    points = points + normals * dists[:, None]
 
     # Try NURBS surface
     try:
         srf = rg.NurbsSurface.CreateThroughPoints(
-            points, samples, samples, 3, 3, False, False)
+            [rg.Point3d(*p) for p in points.tolist()], samples, samples, 3, 3, False, False)
         if srf:
             return srf
     except:
         pass
 
     # Fallback: mesh
-    mesh = rg.Mesh()
-    for pt in points:
-        mesh.Vertices.Add(pt)
-    for j in range(samples - 1):
-        for i in range(samples - 1):
-            a = j * samples + i
-            b = a + 1
-            c = (j + 1) * samples + i + 1
-            dd = (j + 1) * samples + i
-            mesh.Faces.AddFace(a, b, c, dd)
-    mesh.Normals.ComputeNormals()
-    mesh.Compact()
-    return mesh
+    return mesh_from_grid(points, samples, samples)
+
+
+def offset_surfaces(surfaces, dist_start, dist_end, law, samples, parallel=False):
+    """Offset many surfaces, optionally on a thread pool. Results keep input order.
+
+    Only geometry is computed here; adding it to the document stays on the
+    calling thread.
+    """
+    def work(srf):
+        return variable_offset_surface(srf, dist_start, dist_end, law, samples)
+
+    if not parallel or len(surfaces) < 2:
+        return [work(srf) for srf in surfaces]
+    workers = min(len(surfaces), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(work, surfaces))
+
+
+def curve_polylines(curve_ids):
+    """Attractor curves as (n, 3) point arrays, flattened within document tolerance."""
+    tol = sc.doc.ModelAbsoluteTolerance
+    ang = sc.doc.ModelAngleToleranceRadians
+    out = []
+    for cid in curve_ids:
+        crv = rs.coercecurve(cid)
+        if not crv:
+            continue
+        pl = crv.ToPolyline(tol, ang, 0.0, 0.0)
+        if pl and pl.PointCount >= 2:
+            out.append(np.array([(p.X, p.Y, p.Z) for p in (pl.Point(i) for i in range(pl.PointCount))]))
+    return out
+
+
+def get_distance_law():
+    """Prompt for the distance law. Returns a law object, or None if cancelled."""
+    kind = rs.GetString("Distance law", "Wave", ["Wave", "Noise", "Attractor", "Image"])
+    if kind is None:
+        return None
+    kind = kind.capitalize()
+
+    if kind == "Noise":
+        noise = rs.GetString("Noise type", "Perlin", ["Value", "Perlin", "Simplex"])
+        if noise is None or noise.lower() not in NOISE_KINDS:
+            return None
+        seed = rs.GetInteger("Noise seed", 1, 0)
+        if seed is None:
+            return None
+        frequency = rs.GetReal("Noise frequency (cells across the object)", 4.0, 0.1, 200.0)
+        if frequency is None:
+            return None
+        octaves = rs.GetInteger("Noise octaves", 1, 1, 8)
+        if octaves is None:
+            return None
+        return NoiseLaw(noise.lower(), seed, frequency, octaves)
+
+    if kind == "Attractor":
+        attr_ids = rs.GetObjects("Select attractor curves", rs.filter.curve)
+        if not attr_ids:
+            return None
+        polylines = curve_polylines(attr_ids)
+        if not polylines:
+            print("No usable attractor curves.")
+            return None
+        falloff = rs.GetReal("Falloff distance (maximum offset on the curves)", 10.0, 0.001)
+        if falloff is None:
+            return None
+        return AttractorLaw(polylines, falloff)
+
+    if kind == "Image":
+        path = rs.OpenFileName("Distance map image", "Images (*.png;*.jpg;*.bmp;*.tif)|*.png;*.jpg;*.jpeg;*.bmp;*.tif;*.tiff||")
+        if not path:
+            return None
+        invert = rs.GetBoolean("Image mapping", (("Bright", "MaxOffset", "MinOffset"),), (False,))
+        try:
+            image = load_grayscale(path)
+        except Exception as e:
+            print("Could not read image: {}".format(e))
+            return None
+        return ImageLaw(image, bool(invert and invert[0]))
+
+    num_waves = rs.GetReal("Variation waves (1=linear gradient, 2+=wave pattern)", 1.0, 0.5, 50.0)
+    if num_waves is None:
+        return None
+    return WaveLaw(num_waves)
 
 
 def ensure_child_layer(parent_name, child_name, color=None):
@@ -147,9 +301,9 @@ def variable_offset():
     if dist_max is None:
         return
 
-    # 3. Variation - simple choice
-    num_waves = rs.GetReal("Variation waves (1=linear gradient, 2+=wave pattern)", 1.0, 0.5, 50.0)
-    if num_waves is None:
+    # 3. Variation law
+    law = get_distance_law()
+    if law is None:
         return
 
     # 4. Classify geometry
@@ -181,6 +335,12 @@ def variable_offset():
         if sides_opt:
             both_sides = sides_opt[0]
 
+    curve_samples = 100
+    if curves:
+        curve_samples = rs.GetInteger("Curve samples (refined where the curve bends)", 100, 4, 5000)
+        if curve_samples is None:
+            curve_samples = 100
+
     # Surface resolution
     srf_samples = 25
     if surfaces:
@@ -188,6 +348,13 @@ def variable_offset():
         if srf_samples is None:
             srf_samples = 25
 
+    parallel = False
+    if len(surfaces) > 1:
+        par_opt = rs.GetBoolean("Offset faces in parallel?",
+                                (("Parallel", "No", "Yes"),), (True,))
+        if par_opt:
+            parallel = par_opt[0]
+
     # 6. Process
     rs.EnableRedraw(False)
     cplane = rs.ViewCPlane()
@@ -203,16 +370,16 @@ def variable_offset():
     try:
         for crv in curves:
             results = variable_offset_curve(crv, cplane, dist_min, dist_max,
-                                             num_waves, 100, both_sides)
+                                             law, curve_samples, both_sides)
             for oc in results:
                 guid = sc.doc.Objects.AddCurve(oc)
                 if guid:
                     rs.ObjectLayer(guid, crv_layer)
                     total += 1
 
-        for srf in surfaces:
-            result = variable_offset_surface(srf, dist_min, dist_max,
-                                              num_waves, srf_samples)
+        srf_results = offset_surfaces(surfaces, dist_min, dist_max, law,
+                                      srf_samples, parallel)
+        for result in srf_results:
             if result:
                 if isinstance(result, rg.NurbsSurface):
                     guid = sc.doc.Objects.AddSurface(result)
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+"""
+facade - Shared 2D layout kernel for the curtain wall / storefront commands.
+
+Commands compute their layout into a FacadeLayout (pure Python, no Rhino
+needed) and hand it to facade.bake, the single Rhino baking backend.
+facade.bake is not imported here so the layout modules stay importable
+outside Rhino.
+"""
+from facade.layout import (FacadeLayout, PANEL, MULLION, JAMB, SILL, FRAME,
+                           KIND_NAMES, FRAMING_KINDS)
+from facade.grid import (even_positions, weighted_positions, jittered_lines, bay_span,
+                         add_grid, add_frame_members, rotated_grid_cells)
+from facade.clip import (CELL_INSIDE, CELL_OUTSIDE, CELL_STRADDLE, rotate_2d,
+                         clip_polygon_halfplane, clip_polygon_convex, clip_polygon_rect,
+                         polygon_bbox, make_loops, point_in_loops, classify_rect,
+                         classify_polygon)
@@ -0,0 +1,637 @@
+# -*- coding: utf-8 -*-
+"""
+bake.py - Rhino baking backend for facade layouts.
+
+Everything that touches RhinoCommon lives here: fitting facade planes,
+clipping layouts against real boundary curves, mapping 2D layout
+coordinates onto planes or surfaces, and adding the result to the
+document. The layout itself (facade.layout / facade.grid / facade.clip)
+stays Rhino-free.
+"""
+import Rhino.Geometry as rg
+import rhinoscriptsyntax as rs
+import scriptcontext as sc
+import System
+from array import array
+
+from facade.layout import FacadeLayout, PANEL, MULLION, FRAMING_KINDS
+from facade.clip import (CELL_INSIDE, CELL_OUTSIDE, make_loops,
+                         classify_polygon, point_in_loops)
+from facade.mesh import MeshBuffer, offset_panel
+from meshing.bake import mesh_from_arrays
+from meshing.polygon import signed_area, triangulate
+
+
+# ---------------------------------------------------------------------------
+# Planes, bounds and measurement
+# ---------------------------------------------------------------------------
+
+def fit_facade_plane(pts):
+    """Fit a plane through pts with its X axis horizontal and Y axis pointing up.
+
+    Returns None if no plane can be fitted.
+    """
+    plane = rs.PlaneFitFromPoints(pts)
+    if not plane: return None
+
+    world_z = rg.Vector3d(0, 0, 1)
+    if abs(plane.ZAxis.Z) < 0.99:
+        horiz_x = rg.Vector3d.CrossProduct(plane.ZAxis, world_z)
+        horiz_x.Unitize()
+        horiz_y = rg.Vector3d.CrossProduct(plane.ZAxis, horiz_x)
+        horiz_y.Unitize()
+        if horiz_y.Z < 0:
+            horiz_y = -horiz_y
+            horiz_x = -horiz_x
+        plane = rg.Plane(plane.Origin, horiz_x, horiz_y)
+    return plane
+
+
+def get_plane_and_bounds_from_curves(crv_ids):
+    """Fit a facade plane to the first curve and return 2D bounds of all curves.
+
+    Returns:
+        (plane, [min_x, min_y, 0], [max_x, max_y, 0]) in plane coordinates,
+        or (None, None, None).
+    """
+    if not crv_ids: return None, None, None
+    poly = rs.ConvertCurveToPolyline(crv_ids[0])
+    if not poly: return None, None, None
+    pts = rs.CurvePoints(poly)
+    rs.DeleteObject(poly)
+    if not pts: return None, None, None
+
+    plane = fit_facade_plane(pts)
+    if not plane: return None, None, None
+
+    xform_to_2d = rg.Transform.ChangeBasis(rg.Plane.WorldXY, plane)
+
+    min_x, min_y = float('inf'), float('inf')
+    max_x, max_y = float('-inf'), float('-inf')
+
+    for cid in crv_ids:
+        cg = rs.coercecurve(cid).Duplicate()
+        cg.Transform(xform_to_2d)
+        bbox = cg.GetBoundingBox(True)
+        if bbox.Min.X < min_x: min_x = bbox.Min.X
+        if bbox.Min.Y < min_y: min_y = bbox.Min.Y
+        if bbox.Max.X > max_x: max_x = bbox.Max.X
+        if bbox.Max.Y > max_y: max_y = bbox.Max.Y
+
+    return plane, [min_x, min_y, 0], [max_x, max_y, 0]
+
+
+def measure_surface(surface, domain_u, domain_v, n_measure=50):
+    """Measure physical size of a surface by sampling its mid isocurves."""
+    mid_v = (domain_v[0] + domain_v[1]) / 2.0
+    u_length = 0.0
+    prev = surface.PointAt(domain_u[0], mid_v)
+    for i in range(1, n_measure + 1):
+        u = domain_u[0] + (domain_u[1] - domain_u[0]) * i / float(n_measure)
+        pt = surface.PointAt(u, mid_v)
+        u_length += prev.DistanceTo(pt)
+        prev = pt
+
+    mid_u = (domain_u[0] + domain_u[1]) / 2.0
+    v_length = 0.0
+    prev = surface.PointAt(mid_u, domain_v[0])
+    for i in range(1, n_measure + 1):
+        v = domain_v[0] + (domain_v[1] - domain_v[0]) * i / float(n_measure)
+        pt = surface.PointAt(mid_u, v)
+        v_length += prev.DistanceTo(pt)
+        prev = pt
+
+    return u_length, v_length
+
+
+# ---------------------------------------------------------------------------
+# Clipping against real boundaries
+# ---------------------------------------------------------------------------
+
+def curve_to_points(crv, tol):
+    """Return the vertices of a closed planar curve as (x, y) tuples (no closing duplicate)."""
+    ok, pline = crv.TryGetPolyline()
+    if not ok:
+        pline_crv = crv.ToPolyline(0, 0, 0.1, 0.0, 0.0, tol, 0.0, 0.0, True)
+        if pline_crv is None:
+            return []
+        pline = pline_crv.ToPolyline()
+    pts = [(p.X, p.Y) for p in pline]
+    if len(pts) > 1 and pts[0] == pts[-1]:
+        pts.pop()
+    return pts
+
+
+def face_trim_curves(face):
+    """Return the trim loops of a Brep face as 2D curves in its UV space."""
+    curves = []
+    for loop in face.Loops:
+        crv = loop.To2dCurve()
+        if crv is not None:
+            curves.append(crv)
+    return curves
+
+
+def clip_layout(layout, region_curves, tol, kinds=None):
+    """Clip layout records to the region bounded by region_curves.
+
+    region_curves are closed curves in layout coordinates: the one enclosing
+    the largest area is the outer boundary, the rest are holes. They are
+    polygonized once and every record is classified against them; only
+    records straddling a boundary pay for the curve booleans (intersection
+    with the outer boundary, then difference with the holes), the rest are
+    kept or dropped outright. A record whose boolean fails or comes back
+    empty is kept whole if its centroid lies in the region.
+
+    Args:
+        layout:        FacadeLayout to clip.
+        region_curves: list of Curve in layout coordinates.
+        tol:           tolerance in layout units.
+        kinds:         record kinds to clip; other kinds are copied unchanged.
+    Returns:
+        A new FacadeLayout.
+    """
+    polys = [curve_to_points(c, tol) for c in region_curves]
+    loops = make_loops(polys)
+    out = FacadeLayout()
+    if not loops:
+        out.extend(layout)
+        return out
+    outer_idx = max(range(len(polys)),
+                    key=lambda k: abs(signed_area(polys[k])) if len(polys[k]) >= 3 else -1.0)
+    outer = region_curves[outer_idx]
+    holes = [c for k, c in enumerate(region_curves) if k != outer_idx]
+
+    def in_region(points):
+        cx = sum(x for x, _ in points) / len(points)
+        cy = sum(y for _, y in points) / len(points)
+        return point_in_loops(cx, cy, loops)
+
+    for rid in range(len(layout)):
+        if (kinds is not None and layout.kinds[rid] not in kinds) or not layout.closed[rid]:
+            out.add_record(layout, rid)
+            continue
+        pts = layout.polygon(rid)
+        cell = classify_polygon(loops, pts, tol)
+        if cell == CELL_INSIDE:
+            out.add_record(layout, rid)
+            continue
+        if cell == CELL_OUTSIDE:
+            continue
+
+        ring = [rg.Point3d(x, y, 0) for x, y in pts]
+        ring.append(ring[0])
+        try:
+            pieces = list(rg.Curve.CreateBooleanIntersection(rg.PolylineCurve(ring), outer, tol) or [])
+            if pieces and holes:
+                cut = []
+                for piece in pieces:
+                    rest = rg.Curve.CreateBooleanDifference(piece, holes, tol)
+                    if rest:
+                        cut.extend(rest)
+                    elif in_region(curve_to_points(piece, tol)):
+                        # Empty difference on near-coincident edges; keep
+                        # the piece when it sits outside the holes
+                        cut.append(piece)
+                if not cut:
+                    continue  # every piece fell inside a hole
+                pieces = cut
+        except Exception:
+            pieces = None
+        if not pieces:
+            # The boolean can fail or come back empty on near-coincident
+            # edges; keep the record whole when it sits in the region
+            if in_region(pts):
+                out.add_record(layout, rid)
+            continue
+        for piece in pieces:
+            piece_pts = curve_to_points(piece, tol)
+            if len(piece_pts) >= 3:
+                out.add_record(layout, rid, piece_pts)
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Mapping layout coordinates into 3D
+# ---------------------------------------------------------------------------
+
+class PlaneMapper(object):
+    """Map layout (x, y) onto a plane, or onto world XY at height z."""
+
+    def __init__(self, plane=None, z=0.0):
+        self.plane = plane
+        self.z = z
+
+    def point(self, x, y):
+        if self.plane:
+            return self.plane.PointAt(x, y)
+        return rg.Point3d(x, y, self.z)
+
+    def normal(self, x, y):
+        return rg.Vector3d(self.plane.ZAxis) if self.plane else rg.Vector3d(0, 0, 1)
+
+    def sample(self, nodes):
+        """Evaluate nodes in one pass into flat point and normal arrays."""
+        n = self.normal(0.0, 0.0)
+        points = array('d')
+        normals = array('d')
+        for x, y in nodes:
+            p = self.point(x, y)
+            points.extend((p.X, p.Y, p.Z))
+            normals.extend((n.X, n.Y, n.Z))
+        return points, normals
+
+    def sample_ring(self, pts, closed=True):
+        return list(pts)
+
+    def map_polygon(self, pts, closed=True):
+        out = [self.point(x, y) for x, y in pts]
+        if closed and out:
+            out.append(out[0])
+        return out
+
+
+class SurfaceMapper(object):
+    """Map layout (x, y) onto a surface through its UV domain.
+
+    With len_u/len_v given, layout coordinates are lengths that span the
+    measured surface size; otherwise they are UV parameters directly.
+    Polygon edges are densified either with a fixed number of samples per
+    edge or so no segment is longer than max_segment, then evaluated.
+    """
+
+    def __init__(self, surface, domain_u, domain_v, len_u=None, len_v=None,
+                 edge_samples=None, max_segment=None, min_spacing=0.0):
+        self.surface = surface
+        self.u0, self.su = 0.0, 1.0
+        self.v0, self.sv = 0.0, 1.0
+        if len_u:
+            self.u0, self.su = domain_u[0], (domain_u[1] - domain_u[0]) / len_u
+        if len_v:
+            self.v0, self.sv = domain_v[0], (domain_v[1] - domain_v[0]) / len_v
+        self.edge_samples = edge_samples
+        self.max_segment = max_segment
+        self.min_spacing = min_spacing
+        self._cache = {}
+
+    def uv(self, x, y):
+        return self.u0 + x * self.su, self.v0 + y * self.sv
+
+    def point(self, x, y):
+        pt = self._cache.get((x, y))
+        if pt is None:
+            u, v = self.uv(x, y)
+            pt = self.surface.PointAt(u, v)
+            self._cache[(x, y)] = pt
+        return pt
+
+    def normal(self, x, y):
+        u, v = self.uv(x, y)
+        return self.surface.NormalAt(u, v)
+
+    def sample(self, nodes):
+        """Evaluate points and normals of all nodes in a single sweep.
+
+        Returns flat (x, y, z, ...) arrays, one triple per node, so callers
+        can run offsets and shrinks over plain numbers.
+        """
+        point_at = self.surface.PointAt
+        normal_at = self.surface.NormalAt
+        u0, su, v0, sv = self.u0, self.su, self.v0, self.sv
+        points = array('d')
+        normals = array('d')
+        for x, y in nodes:
+            u = u0 + x * su
+            v = v0 + y * sv
+            p = point_at(u, v)
+            n = normal_at(u, v)
+            points.extend((p.X, p.Y, p.Z))
+            normals.extend((n.X, n.Y, n.Z))
+        return points, normals
+
+    def _edge_params(self, a, b):
+        if self.edge_samples:
+            n = self.edge_samples
+        elif self.max_segment:
+            dist = ((b[0] - a[0]) ** 2 + (b[1] - a[1]) ** 2) ** 0.5
+            n = int(dist / self.max_segment) + 1
+        else:
+            n = 1
+        return [k / float(n) for k in range(n)]
+
+    def sample_ring(self, pts, closed=True):
+        """Densify polygon edges in layout coordinates (no closing duplicate)."""
+        ring = list(pts) + ([pts[0]] if closed else [])
+        samples = []
+        for k in range(len(ring) - 1):
+            a, b = ring[k], ring[k + 1]
+            for t in self._edge_params(a, b):
+                samples.append((a[0] + t * (b[0] - a[0]), a[1] + t * (b[1] - a[1])))
+        if not closed:
+            samples.append(ring[-1])
+        return samples
+
+    def map_polygon(self, pts, closed=True):
+        samples = self.sample_ring(pts, closed)
+        if closed and samples:
+            samples.append(samples[0])
+
+        out = []
+        for x, y in samples:
+            pt = self.point(x, y)
+            if not out or out[-1].DistanceTo(pt) > self.min_spacing:
+                out.append(pt)
+        if closed and len(out) > 1 and out[0].DistanceTo(out[-1]) > self.min_spacing:
+            out.append(out[0])
+        return out
+
+
+# ---------------------------------------------------------------------------
+# Baking
+# ---------------------------------------------------------------------------
+
+def _attributes_for(layout, rid, cache):
+    layer = layout.layer(rid)
+    attr = cache.get(layer)
+    if attr is None:
+        attr = sc.doc.CreateDefaultAttributes()
+        if layer:
+            idx = sc.doc.Layers.FindByFullPath(layer, -1)
+            if idx >= 0:
+                attr.LayerIndex = idx
+        cache[layer] = attr
+    return attr
+
+
+def bake_outlines(layout, mapper, kinds=None, xform=None, progress_label=None):
+    """Add every record as a polyline curve. Returns the new object ids."""
+    rids = layout.ids(kinds)
+    attr_cache = {}
+    created = []
+    if progress_label:
+        rs.StatusBarProgressMeterShow(progress_label, 0, max(len(rids), 1), True, True)
+    try:
+        for n, rid in enumerate(rids):
+            pts = mapper.map_polygon(layout.polygon(rid), layout.closed[rid] == 1)
+            if len(pts) >= 2:
+                crv = rg.PolylineCurve(pts)
+                if xform: crv.Transform(xform)
+                obj_id = sc.doc.Objects.AddCurve(crv, _attributes_for(layout, rid, attr_cache))
+                if obj_id != System.Guid.Empty:
+                    created.append(obj_id)
+            if progress_label:
+                rs.StatusBarProgressMeterUpdate(n + 1, True)
+    finally:
+        if progress_label:
+            rs.StatusBarProgressMeterHide()
+    return created
+
+
+def bake_panel_surfaces(layout, mapper, gap=0.0, kinds=(PANEL,)):
+    """Add three- and four-sided records as corner surfaces.
+
+    Each panel is offset by its depth along the averaged vertex normal and
+    shrunk by gap (see facade.mesh.offset_panel). Returns the new object ids.
+    """
+    attr_cache = {}
+    created = []
+    for rid in layout.ids(kinds):
+        poly = layout.polygon(rid)
+        if len(poly) not in (3, 4):
+            continue
+        corners = []
+        normal = rg.Vector3d(0, 0, 0)
+        for x, y in poly:
+            p = mapper.point(x, y)
+            corners.append((p.X, p.Y, p.Z))
+            normal += mapper.normal(x, y)
+        normal.Unitize()
+        pts = offset_panel(corners, (normal.X, normal.Y, normal.Z), layout.depths[rid], gap)
+        if not pts:
+            continue
+        srf = rg.NurbsSurface.CreateFromCorners(*[rg.Point3d(*p) for p in pts])
+        if srf:
+            obj_id = sc.doc.Objects.AddSurface(srf, _attributes_for(layout, rid, attr_cache))
+            if obj_id != System.Guid.Empty:
+                created.append(obj_id)
+    return created
+
+
+def bake_panel_mesh(layout, mapper, gap=0.0, colors=None, kinds=(PANEL,)):
+    """Bake panels as one mesh per layer tag instead of one surface each.
+
+    All panel corners are indexed once and sampled through mapper.sample,
+    then offset and shrunk like bake_panel_surfaces.
+
+    Args:
+        colors: optional dict of record id -> ARGB integer, stored as vertex
+                colours (one flat colour per panel face).
+    Returns:
+        The new object ids.
+    """
+    attr_cache = {}
+    groups = {}
+    for rid in layout.ids(kinds):
+        if layout.point_count(rid) >= 3:
+            groups.setdefault(layout.layer(rid), []).append(rid)
+
+    created = []
+    for rids in groups.values():
+        nodes, rings = layout.index_nodes(rids)
+        points, normals = mapper.sample(nodes)
+        depths = [layout.depths[rid] for rid in rids]
+        panel_colors = [colors.get(rid, -1) for rid in rids] if colors else None
+        buf = MeshBuffer()
+        if not buf.add_panels(points, normals, rings, depths, gap, panel_colors):
+            continue
+        obj_id = sc.doc.Objects.AddMesh(mesh_from_buffer(buf), _attributes_for(layout, rids[0], attr_cache))
+        if obj_id != System.Guid.Empty:
+            created.append(obj_id)
+    return created
+
+
+def bake_pipes(layout, mapper, radius, kinds=(MULLION,)):
+    """Add open records as flat-capped round pipes. Returns the new object ids."""
+    tol = sc.doc.ModelAbsoluteTolerance
+    ang_tol = sc.doc.ModelAngleToleranceRadians
+    attr_cache = {}
+    created = []
+    for rid in layout.ids(kinds):
+        pts = [mapper.point(x, y) for x, y in layout.polygon(rid)]
+        if len(pts) < 2:
+            continue
+        rail = rg.LineCurve(pts[0], pts[1]) if len(pts) == 2 else rg.PolylineCurve(pts)
+        pipes = rg.Brep.CreatePipe(rail, radius, False, rg.PipeCapMode.Flat, True, tol, ang_tol)
+        for pipe in pipes or []:
+            obj_id = sc.doc.Objects.AddBrep(pipe, _attributes_for(layout, rid, attr_cache))
+            if obj_id != System.Guid.Empty:
+                created.append(obj_id)
+    return created
+
+
+# ---------------------------------------------------------------------------
+# Solids: mullion prisms and glass slabs
+# ---------------------------------------------------------------------------
+
+def mesh_from_buffer(buf):
+    """Build a Rhino mesh from a MeshBuffer in one pass."""
+    return mesh_from_arrays(buf.coords, buf.faces, buf.colors)
+
+
+def _add_record_prism(buf, mapper, pts, z0, z1):
+    """Offset a record's ring from z0 to z1 along the mapper normals into buf."""
+    ring = mapper.sample_ring(pts)
+    if len(ring) < 3:
+        return
+    if signed_area(ring) < 0:
+        ring.reverse()
+    bottom = []
+    top = []
+    for x, y in ring:
+        p = mapper.point(x, y)
+        n = mapper.normal(x, y)
+        b = p + n * z0
+        t = p + n * z1
+        bottom.append((b.X, b.Y, b.Z))
+        top.append((t.X, t.Y, t.Z))
+    buf.add_prism(bottom, top, triangulate(ring))
+
+
+def _rect_size(pts):
+    """Return (x0, y0, w, h) if pts is an axis-aligned rectangle, else None."""
+    if len(pts) != 4:
+        return None
+    xs = sorted(set(round(p[0], 9) for p in pts))
+    ys = sorted(set(round(p[1], 9) for p in pts))
+    if len(xs) != 2 or len(ys) != 2:
+        return None
+    return xs[0], ys[0], xs[1] - xs[0], ys[1] - ys[0]
+
+
+def _section_definition(w, h, z0, z1):
+    """Find or create the block definition of one rectangular member section."""
+    name = "FacadeSection_{:.6g}x{:.6g}_{:.6g}-{:.6g}".format(w, h, z0, z1)
+    idef = sc.doc.InstanceDefinitions.Find(name)
+    if idef is not None:
+        return idef.Index
+    profile = rg.Rectangle3d(rg.Plane(rg.Point3d(0, 0, z0), rg.Vector3d.ZAxis), w, h).ToNurbsCurve()
+    ext = rg.Extrusion.Create(profile, z1 - z0, True)
+    if ext is None:
+        return -1
+    return sc.doc.InstanceDefinitions.Add(name, "Facade member section", rg.Point3d.Origin,
+                                          [ext], [sc.doc.CreateDefaultAttributes()])
+
+
+def bake_solids(layout, mapper, depth, glass_thickness, instance=False, xform=None,
+                framing_kinds=FRAMING_KINDS, glass_kinds=(PANEL,)):
+    """Bake framing members as solids of the given profile depth plus glass slabs.
+
+    Framing records are offset along the mapper normal from 0 to depth and
+    glass slabs of glass_thickness are centred in that depth. Everything is
+    merged into one mesh per layer tag. With instance=True and a PlaneMapper,
+    rectangular members that share a section are placed as block instances
+    of a single extrusion instead.
+
+    Returns:
+        The new object ids.
+    """
+    attr_cache = {}
+    buffers = {}
+    created = []
+
+    instanced = {}
+    if instance and isinstance(mapper, PlaneMapper):
+        sections = {}
+        for rid in layout.ids(framing_kinds):
+            rect = _rect_size(layout.polygon(rid))
+            if rect:
+                key = (round(rect[2], 6), round(rect[3], 6))
+                sections.setdefault(key, []).append((rid, rect))
+        for key, members in sections.items():
+            if len(members) > 1:
+                for rid, rect in members:
+                    instanced[rid] = rect
+
+    base = None
+    if instanced:
+        if mapper.plane:
+            base = rg.Transform.ChangeBasis(mapper.plane, rg.Plane.WorldXY)
+        else:
+            base = rg.Transform.Translation(0, 0, mapper.z)
+
+    glass_z0 = (depth - glass_thickness) / 2.0
+    for rid in layout.ids(tuple(framing_kinds) + tuple(glass_kinds)):
+        if rid in instanced:
+            x0, y0, w, h = instanced[rid]
+            idef_index = _section_definition(w, h, 0.0, depth)
+            if idef_index >= 0:
+                place = base * rg.Transform.Translation(x0, y0, 0)
+                if xform: place = xform * place
+                obj_id = sc.doc.Objects.AddInstanceObject(idef_index, place,
+                                                          _attributes_for(layout, rid, attr_cache))
+                if obj_id != System.Guid.Empty:
+                    created.append(obj_id)
+                continue
+        is_glass = layout.kinds[rid] in glass_kinds
+        key = (layout.layer(rid), is_glass)
+        buf = buffers.get(key)
+        if buf is None:
+            buf = buffers[key] = (MeshBuffer(), rid)
+        if is_glass:
+            _add_record_prism(buf[0], mapper, layout.polygon(rid), glass_z0, glass_z0 + glass_thickness)
+        else:
+            _add_record_prism(buf[0], mapper, layout.polygon(rid), 0.0, depth)
+
+    for buf, rid in buffers.values():
+        if buf.face_count == 0:
+            continue
+        mesh = mesh_from_buffer(buf)
+        if xform: mesh.Transform(xform)
+        obj_id = sc.doc.Objects.AddMesh(mesh, _attributes_for(layout, rid, attr_cache))
+        if obj_id != System.Guid.Empty:
+            created.append(obj_id)
+    return created
+
+
+def bake_tubes(layout, mapper, radius, sides=6, kinds=(MULLION,)):
+    """Bake open records as N-gon tubes welded into one mesh per layer tag.
+
+    Record end points that coincide in layout coordinates become one shared
+    joint, and each joint's section is oriented by the mapper normal there.
+    Returns the new object ids.
+    """
+    attr_cache = {}
+    groups = {}
+    for rid in layout.ids(kinds):
+        pts = layout.polygon(rid)
+        if len(pts) < 2:
+            continue
+        layer = layout.layer(rid)
+        group = groups.get(layer)
+        if group is None:
+            group = groups[layer] = ({}, [], rid)
+        node_index, edges, _ = group
+        chain = []
+        for xy in pts:
+            idx = node_index.get(xy)
+            if idx is None:
+                idx = node_index[xy] = len(node_index)
+            chain.append(idx)
+        edges.extend(zip(chain[:-1], chain[1:]))
+
+    created = []
+    for node_index, edges, rid in groups.values():
+        xy = [None] * len(node_index)
+        for key, idx in node_index.items():
+            xy[idx] = key
+        points, normals = mapper.sample(xy)
+        nodes = [tuple(points[3 * k:3 * k + 3]) for k in range(len(xy))]
+        ups = [tuple(normals[3 * k:3 * k + 3]) for k in range(len(xy))]
+        buf = MeshBuffer()
+        buf.add_tubes(nodes, edges, radius, sides, ups)
+        if buf.face_count == 0:
+            continue
+        obj_id = sc.doc.Objects.AddMesh(mesh_from_buffer(buf), _attributes_for(layout, rid, attr_cache))
+        if obj_id != System.Guid.Empty:
+            created.append(obj_id)
+    return created
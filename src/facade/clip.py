@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+clip.py - Pure-Python 2D clipping and region classification for facades.
+
+Polygons are lists of (x, y) tuples. Regions (surface borders, trim loops)
+are given as "loops": closed polygons paired with their bounding box, so a
+region is polygonized once and then queried cheaply for every cell.
+"""
+import math
+
+CELL_INSIDE = 0
+CELL_OUTSIDE = 1
+CELL_STRADDLE = 2
+
+
+def rotate_2d(pts, cx, cy, angle_deg):
+    """Rotate a list of (x, y) points about (cx, cy) by angle_deg."""
+    a = math.radians(angle_deg)
+    ca = math.cos(a)
+    sa = math.sin(a)
+    return [(cx + (x - cx) * ca - (y - cy) * sa,
+             cy + (x - cx) * sa + (y - cy) * ca) for x, y in pts]
+
+
+def clip_polygon_halfplane(poly, nx, ny, d):
+    """Keep the part of polygon poly where nx*x + ny*y <= d."""
+    out = []
+    n = len(poly)
+    for k in range(n):
+        a = poly[k]
+        b = poly[(k + 1) % n]
+        da = nx * a[0] + ny * a[1] - d
+        db = nx * b[0] + ny * b[1] - d
+        if da <= 0:
+            out.append(a)
+        if (da < 0 < db) or (db < 0 < da):
+            t = da / (da - db)
+            out.append((a[0] + t * (b[0] - a[0]), a[1] + t * (b[1] - a[1])))
+    return out
+
+
+def clip_polygon_convex(poly, clip):
+    """Sutherland-Hodgman clip of poly against a counter-clockwise convex polygon."""
+    n = len(clip)
+    for k in range(n):
+        if not poly: break
+        ax, ay = clip[k]
+        bx, by = clip[(k + 1) % n]
+        # Outward normal of a CCW edge
+        nx, ny = by - ay, ax - bx
+        poly = clip_polygon_halfplane(poly, nx, ny, nx * ax + ny * ay)
+    return poly
+
+
+def clip_polygon_rect(poly, x0, y0, x1, y1):
+    """Clip poly to the axis-aligned rectangle [x0, x1] x [y0, y1]."""
+    poly = clip_polygon_halfplane(poly, -1.0, 0.0, -x0)
+    poly = clip_polygon_halfplane(poly, 1.0, 0.0, x1)
+    poly = clip_polygon_halfplane(poly, 0.0, -1.0, -y0)
+    return clip_polygon_halfplane(poly, 0.0, 1.0, y1)
+
+
+def polygon_bbox(pts):
+    """Return (min_x, min_y, max_x, max_y) of a point list."""
+    xs = [p[0] for p in pts]
+    ys = [p[1] for p in pts]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def make_loops(polygons):
+    """Turn point lists into closed (points, bbox) loops for classification."""
+    loops = []
+    for pts in polygons:
+        pts = list(pts)
+        if len(pts) < 3:
+            continue
+        if pts[0] != pts[-1]:
+            pts.append(pts[0])
+        loops.append((pts, polygon_bbox(pts)))
+    return loops
+
+
+def _segment_hits_rect(a, b, u0, u1, v0, v1):
+    """Liang-Barsky test: does segment a-b touch the rectangle?"""
+    t0, t1 = 0.0, 1.0
+    du = b[0] - a[0]
+    dv = b[1] - a[1]
+    for p, q in ((-du, a[0] - u0), (du, u1 - a[0]),
+                 (-dv, a[1] - v0), (dv, v1 - a[1])):
+        if p == 0:
+            if q < 0:
+                return False
+            continue
+        r = q / p
+        if p < 0:
+            if r > t1: return False
+            if r > t0: t0 = r
+        else:
+            if r < t0: return False
+            if r < t1: t1 = r
+    return True
+
+
+def point_in_loops(u, v, loops):
+    """Even-odd point-in-region test against all loops."""
+    inside = False
+    for pts, bbox in loops:
+        if u < bbox[0] or u > bbox[2] or v < bbox[1] or v > bbox[3]:
+            continue
+        for k in range(len(pts) - 1):
+            (ua, va), (ub, vb) = pts[k], pts[k + 1]
+            if (va > v) != (vb > v):
+                if u < ua + (v - va) * (ub - ua) / (vb - va):
+                    inside = not inside
+    return inside
+
+
+def classify_rect(loops, u0, u1, v0, v1, margin):
+    """Sort a rectangle into CELL_INSIDE, CELL_OUTSIDE or CELL_STRADDLE.
+
+    The rectangle is grown by margin so cells within the polygonization
+    tolerance of a loop edge are conservatively treated as straddling.
+    """
+    eu0, eu1, ev0, ev1 = u0 - margin, u1 + margin, v0 - margin, v1 + margin
+    for pts, bbox in loops:
+        if bbox[2] < eu0 or bbox[0] > eu1 or bbox[3] < ev0 or bbox[1] > ev1:
+            continue
+        for k in range(len(pts) - 1):
+            if _segment_hits_rect(pts[k], pts[k + 1], eu0, eu1, ev0, ev1):
+                return CELL_STRADDLE
+    # No loop edge crosses the cell, so it lies wholly on one side.
+    if point_in_loops((u0 + u1) / 2.0, (v0 + v1) / 2.0, loops):
+        return CELL_INSIDE
+    return CELL_OUTSIDE
+
+
+def classify_polygon(loops, pts, margin):
+    """Classify an arbitrary polygon conservatively through its bounding box."""
+    x0, y0, x1, y1 = polygon_bbox(pts)
+    return classify_rect(loops, x0, x1, y0, y1, margin)
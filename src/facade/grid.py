@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+grid.py - Grid spacing helpers shared by the facade commands.
+
+All functions work on plain floats in layout coordinates and take an
+optional rng (anything with random()/uniform(), defaults to the random
+module) so commands keep control over seeding.
+"""
+import bisect
+import random
+
+from facade.clip import rotate_2d, clip_polygon_halfplane, clip_polygon_convex
+
+
+def even_positions(lo, hi, n_internal):
+    """Return [lo, ..., hi] with n_internal evenly spaced lines in between."""
+    step = (hi - lo) / float(n_internal + 1)
+    return [lo + i * step for i in range(n_internal + 1)] + [hi]
+
+
+def weighted_positions(lo, hi, count, variation, rng=random):
+    """Split [lo, hi] into count bays whose widths vary by up to variation.
+
+    Returns the count + 1 grid line positions.
+    """
+    weights = [1.0] * count
+    if variation > 0:
+        for i in range(count):
+            weights[i] += (rng.random() * 2 - 1.0) * variation * 0.9
+            if weights[i] < 0.1: weights[i] = 0.1
+    total = sum(weights)
+
+    positions = [lo]
+    current = lo
+    for i in range(count - 1):
+        current += (weights[i] / total) * (hi - lo)
+        positions.append(current)
+    positions.append(hi)
+    return positions
+
+
+def jittered_lines(lo, hi, avg, variation, rng=random):
+    """Lines from lo to hi with an average step of avg, jittered by variation."""
+    lines = []
+    c = lo
+    while c < hi:
+        lines.append(c)
+        jitter = (rng.random() * 2 - 1.0) * variation * 0.9 * avg if variation > 0 else 0
+        step = avg + jitter
+        if step < avg * 0.1: step = avg * 0.1
+        c += step
+    lines.append(hi)
+    return lines
+
+
+def bay_span(positions, i, gap):
+    """Extent of bay i between grid lines, shrunk by half a mullion on inner sides."""
+    a = positions[i] + (gap / 2.0 if i > 0 else 0)
+    b = positions[i + 1] - (gap / 2.0 if i < len(positions) - 2 else 0)
+    return a, b
+
+
+def add_grid(layout, xs, ys, v_gap, h_gap, panel_kind, mullion_kind,
+             panel_layer=None, mullion_layer=None):
+    """Record the panels and mullions of an axis-aligned grid into layout.
+
+    Vertical mullions run the full height between ys[0] and ys[-1];
+    horizontal mullions are split per bay so the two never overlap.
+    """
+    for x in xs[1:-1]:
+        layout.add_rect(mullion_kind, x - v_gap / 2.0, ys[0], x + v_gap / 2.0, ys[-1],
+                        mullion_layer)
+    for j in range(1, len(ys) - 1):
+        for i in range(len(xs) - 1):
+            x0, x1 = bay_span(xs, i, v_gap)
+            layout.add_rect(mullion_kind, x0, ys[j] - h_gap / 2.0, x1, ys[j] + h_gap / 2.0,
+                            mullion_layer)
+    for i in range(len(xs) - 1):
+        x0, x1 = bay_span(xs, i, v_gap)
+        for j in range(len(ys) - 1):
+            y0, y1 = bay_span(ys, j, h_gap)
+            layout.add_rect(panel_kind, x0, y0, x1, y1, panel_layer)
+
+
+def add_frame_members(layout, outer, inner, jamb_kind, sill_kind, layer=None):
+    """Record the jambs (full height) and sills (between jambs) of a frame.
+
+    Args:
+        outer, inner: (min_x, min_y, max_x, max_y) of the outer boundary and
+                      the opening left after jambs and sills.
+    """
+    layout.add_rect(jamb_kind, outer[0], outer[1], inner[0], outer[3], layer)
+    layout.add_rect(jamb_kind, inner[2], outer[1], outer[2], outer[3], layer)
+    layout.add_rect(sill_kind, inner[0], outer[1], inner[2], inner[1], layer)
+    layout.add_rect(sill_kind, inner[0], inner[3], inner[2], outer[3], layer)
+
+
+def rotated_grid_cells(frame_pts, cx, cy, angle, avg_w, avg_h, variation, v_mullion, h_mullion,
+                       rng=random):
+    """Lay out a rotated grid against a convex CCW frame polygon.
+
+    Grid lines are generated in the grid's own (unrotated) coordinates,
+    restricted to the frame's extent there. Each column strip is swept
+    against the frame to find the rows it actually touches, so only cells
+    that overlap the frame are enumerated.
+
+    Returns:
+        (cells, mullions): clipped panel and mullion polygons, already
+        rotated back into the frame's coordinates.
+    """
+    local_frame = rotate_2d(frame_pts, cx, cy, -angle)
+    fx = [p[0] for p in local_frame]
+    fy = [p[1] for p in local_frame]
+
+    xs = jittered_lines(min(fx), max(fx), avg_w, variation, rng)
+    ys = jittered_lines(min(fy), max(fy), avg_h, variation, rng)
+
+    cells = []
+    for i in range(len(xs) - 1):
+        px_min = xs[i] + v_mullion / 2.0
+        px_max = xs[i+1] - v_mullion / 2.0
+        if px_min >= px_max: continue
+
+        # Sweep: the frame slice inside this column gives the row range to visit
+        strip = clip_polygon_halfplane(local_frame, -1.0, 0.0, -px_min)
+        strip = clip_polygon_halfplane(strip, 1.0, 0.0, px_max)
+        if not strip: continue
+        s_min_y = min(p[1] for p in strip)
+        s_max_y = max(p[1] for p in strip)
+        j0 = max(0, bisect.bisect_right(ys, s_min_y + h_mullion / 2.0) - 1)
+        j1 = min(len(ys) - 1, bisect.bisect_left(ys, s_max_y - h_mullion / 2.0) + 1)
+
+        for j in range(j0, j1):
+            py_min = ys[j] + h_mullion / 2.0
+            py_max = ys[j+1] - h_mullion / 2.0
+            if py_min >= py_max: continue
+            if py_max <= s_min_y or py_min >= s_max_y: continue
+            cell = [(px_min, py_min), (px_max, py_min), (px_max, py_max), (px_min, py_max)]
+            clipped = clip_polygon_convex(cell, local_frame)
+            if len(clipped) >= 3:
+                cells.append(rotate_2d(clipped, cx, cy, angle))
+
+    mullions = []
+    y_lo, y_hi = min(fy), max(fy)
+    x_lo, x_hi = min(fx), max(fx)
+    strips = [[(x - v_mullion / 2.0, y_lo), (x + v_mullion / 2.0, y_lo),
+               (x + v_mullion / 2.0, y_hi), (x - v_mullion / 2.0, y_hi)]
+              for x in xs[1:-1] if v_mullion > 0]
+    strips += [[(x_lo, y - h_mullion / 2.0), (x_hi, y - h_mullion / 2.0),
+                (x_hi, y + h_mullion / 2.0), (x_lo, y + h_mullion / 2.0)]
+               for y in ys[1:-1] if h_mullion > 0]
+    for strip in strips:
+        clipped = clip_polygon_convex(strip, local_frame)
+        if len(clipped) >= 3:
+            mullions.append(rotate_2d(clipped, cx, cy, angle))
+    return cells, mullions
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+layout.py - Array-backed record store for 2D facade layouts.
+
+A FacadeLayout holds every panel, mullion, jamb, sill and frame outline of
+a facade as flat arrays (kind, layer tag, depth, closed flag and a shared
+coordinate buffer). It has no Rhino dependency, so layouts can be built,
+inspected and benchmarked headless before a baking backend turns them into
+document geometry.
+"""
+from array import array
+
+# Record kinds
+PANEL = 0
+MULLION = 1
+JAMB = 2
+SILL = 3
+FRAME = 4
+
+KIND_NAMES = ("panel", "mullion", "jamb", "sill", "frame")
+
+# Kinds that make up the structural frame (everything but glass and outlines)
+FRAMING_KINDS = (MULLION, JAMB, SILL)
+
+
+class FacadeLayout(object):
+    """Compact collection of 2D facade records.
+
+    Each record has an integer ID (its insertion index), a kind, an optional
+    layer tag, a depth offset and a polygon. Polygons are stored without a
+    repeated closing point; open polylines (e.g. lattice edges) are flagged
+    with closed=False.
+    """
+
+    __slots__ = ("kinds", "layer_ids", "depths", "closed", "offsets", "coords",
+                 "layer_names", "_layer_lookup")
+
+    def __init__(self):
+        self.kinds = array('b')
+        self.layer_ids = array('h')
+        self.depths = array('d')
+        self.closed = array('b')
+        self.offsets = array('i', [0])
+        self.coords = array('d')
+        self.layer_names = []
+        self._layer_lookup = {}
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def _layer_id(self, layer):
+        if layer is None:
+            return -1
+        idx = self._layer_lookup.get(layer)
+        if idx is None:
+            idx = len(self.layer_names)
+            self.layer_names.append(layer)
+            self._layer_lookup[layer] = idx
+        return idx
+
+    def add(self, kind, pts, layer=None, depth=0.0, closed=True):
+        """Append a record and return its ID.
+
+        Args:
+            kind:   one of PANEL, MULLION, JAMB, SILL, FRAME.
+            pts:    sequence of (x, y) pairs, without a closing duplicate.
+            layer:  optional layer tag (full layer path), None = current layer.
+            depth:  offset of the record along the facade normal.
+            closed: False for open polylines.
+        """
+        for x, y in pts:
+            self.coords.append(x)
+            self.coords.append(y)
+        self.offsets.append(len(self.coords) // 2)
+        self.kinds.append(kind)
+        self.layer_ids.append(self._layer_id(layer))
+        self.depths.append(depth)
+        self.closed.append(1 if closed else 0)
+        return len(self.kinds) - 1
+
+    def add_rect(self, kind, x0, y0, x1, y1, layer=None, depth=0.0):
+        """Append an axis-aligned rectangle. Returns None if it is empty."""
+        if x1 <= x0 or y1 <= y0:
+            return None
+        return self.add(kind, ((x0, y0), (x1, y0), (x1, y1), (x0, y1)), layer, depth)
+
+    def add_record(self, other, rid, pts=None):
+        """Copy record rid of another layout, optionally with new points."""
+        if pts is None:
+            pts = other.polygon(rid)
+        return self.add(other.kinds[rid], pts, other.layer(rid),
+                        other.depths[rid], other.closed[rid] == 1)
+
+    def extend(self, other):
+        """Append every record of another layout."""
+        for rid in range(len(other)):
+            self.add_record(other, rid)
+
+    def polygon(self, rid):
+        """Return the points of record rid as a list of (x, y) tuples."""
+        c = self.coords
+        return [(c[2 * k], c[2 * k + 1])
+                for k in range(self.offsets[rid], self.offsets[rid + 1])]
+
+    def point_count(self, rid):
+        return self.offsets[rid + 1] - self.offsets[rid]
+
+    def layer(self, rid):
+        idx = self.layer_ids[rid]
+        return self.layer_names[idx] if idx >= 0 else None
+
+    def ids(self, kinds=None):
+        """Return record IDs, optionally filtered to a collection of kinds."""
+        if kinds is None:
+            return list(range(len(self.kinds)))
+        return [rid for rid, k in enumerate(self.kinds) if k in kinds]
+
+    def count(self, kind):
+        return self.kinds.count(kind)
+
+    def index_nodes(self, rids):
+        """Collect the distinct points of records rids.
+
+        Points that coincide exactly (e.g. shared lattice corners) become one
+        node, so a backend can evaluate every node once.
+
+        Returns:
+            (nodes, rings): nodes is a list of (x, y); rings holds one list of
+            node indices per record, in the order of rids.
+        """
+        index = {}
+        nodes = []
+        rings = []
+        c = self.coords
+        for rid in rids:
+            ring = []
+            for k in range(self.offsets[rid], self.offsets[rid + 1]):
+                xy = (c[2 * k], c[2 * k + 1])
+                idx = index.get(xy)
+                if idx is None:
+                    idx = index[xy] = len(nodes)
+                    nodes.append(xy)
+                ring.append(idx)
+            rings.append(ring)
+        return nodes, rings
+
+    def bbox(self, rid):
+        """Return (min_x, min_y, max_x, max_y) of record rid."""
+        c = self.coords
+        s, e = 2 * self.offsets[rid], 2 * self.offsets[rid + 1]
+        xs = c[s:e:2]
+        ys = c[s + 1:e:2]
+        return min(xs), min(ys), max(xs), max(ys)
+
+    def summary(self):
+        """Human readable record counts, e.g. '12 panels, 9 mullions'."""
+        parts = []
+        for kind, name in enumerate(KIND_NAMES):
+            n = self.count(kind)
+            if n:
+                parts.append("{} {}s".format(n, name))
+        return ", ".join(parts) if parts else "empty"
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+mesh.py - Pure-Python mesh buffers for facade solids.
+
+MeshBuffer collects vertices and faces of many small solids (mullion
+prisms, glass slabs, lattice tubes, offset panels) in flat arrays so the
+baking backend can turn them into a single Rhino mesh in one pass, instead
+of adding one object per member.
+"""
+import math
+from array import array
+
+
+def _vcross(a, b):
+    return (a[1] * b[2] - a[2] * b[1], a[2] * b[0] - a[0] * b[2], a[0] * b[1] - a[1] * b[0])
+
+
+def _unit(v):
+    length = math.sqrt(v[0] * v[0] + v[1] * v[1] + v[2] * v[2])
+    if length < 1e-12:
+        return None
+    return (v[0] / length, v[1] / length, v[2] / length)
+
+
+def offset_panel(corners, normal, depth, gap):
+    """Move corners along normal by depth and shrink them about their centroid.
+
+    The shrink removes gap from the average diagonal of a quad (twice the
+    mean centroid distance otherwise), leaving room for mullions.
+
+    Args:
+        corners: list of (x, y, z) points.
+        normal:  (x, y, z) unit offset direction.
+    Returns:
+        The moved points, or None if the panel is too small for the gap.
+    """
+    nx, ny, nz = normal[0] * depth, normal[1] * depth, normal[2] * depth
+    pts = [(x + nx, y + ny, z + nz) for x, y, z in corners]
+    if gap <= 0:
+        return pts
+    n = len(pts)
+    cx = sum(p[0] for p in pts) / n
+    cy = sum(p[1] for p in pts) / n
+    cz = sum(p[2] for p in pts) / n
+    if n == 4:
+        avg_diag = (_dist(pts[0], pts[2]) + _dist(pts[1], pts[3])) / 2.0
+    else:
+        avg_diag = 2.0 * sum(_dist(p, (cx, cy, cz)) for p in pts) / n
+    if avg_diag <= gap:
+        return None
+    s = (avg_diag - gap) / avg_diag
+    return [(cx + (x - cx) * s, cy + (y - cy) * s, cz + (z - cz) * s) for x, y, z in pts]
+
+
+def _dist(a, b):
+    return math.sqrt((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2)
+
+
+class MeshBuffer(object):
+    """Flat vertex / face buffer. Triangles are stored as quads with d == c.
+
+    colors optionally holds one ARGB integer per vertex; it is only used by
+    the backend when every vertex has one.
+    """
+
+    __slots__ = ("coords", "faces", "colors")
+
+    def __init__(self):
+        self.coords = array('d')
+        self.faces = array('i')
+        self.colors = array('i')
+
+    @property
+    def vertex_count(self):
+        return len(self.coords) // 3
+
+    @property
+    def face_count(self):
+        return len(self.faces) // 4
+
+    def add_vertices(self, pts):
+        """Append (x, y, z) points and return the index of the first one."""
+        start = self.vertex_count
+        for x, y, z in pts:
+            self.coords.append(x)
+            self.coords.append(y)
+            self.coords.append(z)
+        return start
+
+    def add_face(self, a, b, c, d=None):
+        self.faces.extend((a, b, c, c if d is None else d))
+
+    def add_prism(self, bottom, top, tris):
+        """Append a closed prism.
+
+        Args:
+            bottom, top: rings of (x, y, z) points of equal length, ordered
+                         counter-clockwise when seen from the top side.
+            tris:        cap triangulation as index triples into the ring.
+        """
+        n = len(bottom)
+        b0 = self.add_vertices(bottom)
+        t0 = self.add_vertices(top)
+        for k in range(n):
+            k1 = (k + 1) % n
+            self.add_face(b0 + k, b0 + k1, t0 + k1, t0 + k)
+        for i, j, k in tris:
+            self.add_face(t0 + i, t0 + j, t0 + k)
+            self.add_face(b0 + k, b0 + j, b0 + i)
+
+    def add_tubes(self, nodes, edges, radius, sides=6, ups=None):
+        """Append an N-gon tube for every edge of a point lattice.
+
+        Each node gets one shared centre vertex that all tube end caps at
+        that joint fan into, so the lattice comes out as a single welded
+        mesh with two rings per edge.
+
+        Args:
+            nodes:  list of (x, y, z) joint positions.
+            edges:  list of (i, j) node index pairs.
+            radius: tube radius.
+            sides:  polygon sides of the tube section.
+            ups:    optional per-node (x, y, z) reference directions used to
+                    orient the sections (e.g. surface normals).
+        """
+        centres = self.add_vertices(nodes)
+        angles = [2.0 * math.pi * k / sides for k in range(sides)]
+        cs = [(math.cos(a) * radius, math.sin(a) * radius) for a in angles]
+        for i, j in edges:
+            a = nodes[i]
+            b = nodes[j]
+            d = _unit((b[0] - a[0], b[1] - a[1], b[2] - a[2]))
+            if d is None:
+                continue
+            up = ups[i] if ups else (0.0, 0.0, 1.0)
+            side = _unit(_vcross(up, d))
+            if side is None:
+                side = _unit(_vcross((1.0, 0.0, 0.0), d)) or _unit(_vcross((0.0, 1.0, 0.0), d))
+            up2 = _vcross(d, side)
+            ring = []
+            for p in (a, b):
+                for c, s in cs:
+                    ring.append((p[0] + c * side[0] + s * up2[0],
+                                 p[1] + c * side[1] + s * up2[1],
+                                 p[2] + c * side[2] + s * up2[2]))
+            r0 = self.add_vertices(ring)
+            r1 = r0 + sides
+            for k in range(sides):
+                k1 = (k + 1) % sides
+                self.add_face(r0 + k, r0 + k1, r1 + k1, r1 + k)
+                self.add_face(centres + i, r0 + k1, r0 + k)
+                self.add_face(centres + j, r1 + k, r1 + k1)
+
+    def add_panels(self, points, normals, rings, depths, gap=0.0, colors=None):
+        """Append offset, shrunk panels sampled on a shared node lattice.
+
+        Every panel gets its own vertices (panels do not touch once shrunk),
+        so a per-panel colour comes out as a flat per-face colour.
+
+        Args:
+            points, normals: flat (x, y, z, x, y, z, ...) sequences, one
+                             entry per node.
+            rings:   one list of node indices per panel (3 or 4 nodes;
+                     longer rings are fanned).
+            depths:  offset along the averaged node normal, per panel.
+            gap:     shrink distance, see offset_panel.
+            colors:  optional ARGB integer per panel.
+        Returns:
+            Number of panels added.
+        """
+        added = 0
+        for p, ring in enumerate(rings):
+            if len(ring) < 3:
+                continue
+            corners = [(points[3 * i], points[3 * i + 1], points[3 * i + 2]) for i in ring]
+            normal = _unit((sum(normals[3 * i] for i in ring),
+                            sum(normals[3 * i + 1] for i in ring),
+                            sum(normals[3 * i + 2] for i in ring)))
+            pts = offset_panel(corners, normal or (0.0, 0.0, 1.0), depths[p], gap)
+            if not pts:
+                continue
+            start = self.add_vertices(pts)
+            if colors is not None:
+                self.colors.extend([colors[p]] * len(pts))
+            if len(pts) == 4:
+                self.add_face(start, start + 1, start + 2, start + 3)
+            else:
+                for k in range(1, len(pts) - 1):
+                    self.add_face(start, start + k, start + k + 1)
+            added += 1
+        return added
+
+    def extend(self, other):
+        offset = self.vertex_count
+        self.coords.extend(other.coords)
+        self.faces.extend(f + offset for f in other.faces)
+        self.colors.extend(other.colors)
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+"""
+fields - Distance laws for the VariableOffset command.
+
+A law maps sample positions (normalized curve length, or UV fractions of a
+surface) to offset distances for whole NumPy arrays at once, so dense
+sampling never falls back to per-sample Python code. Nothing here depends
+on Rhino except fields.raster, which reads images through .NET and is not
+imported here.
+
+    laws.py    Wave, noise, attractor and image laws
+    noise.py   Seeded value / Perlin / simplex lattices, cached per seed
+    raster.py  Image files -> grey-value grids (Rhino/.NET only)
+"""
+from fields.noise import NOISE_KINDS, NoiseLattice, noise_lattice
+from fields.laws import (distance_to_segments, bilinear, DistanceLaw, WaveLaw, NoiseLaw,
+                         AttractorLaw, ImageLaw)
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+laws.py - Array distance laws for VariableOffset.
+
+A law turns a batch of samples into weights in [0, 1]; the offset distance
+is then dist_start + weight * (dist_end - dist_start). Samples are given as
+    s, t:    normalized positions (curve length fraction and 0 for curves,
+             U and V fractions for surfaces), arrays of equal length
+    points:  (n, 3) sample positions in model space
+Every law works on the whole batch with NumPy, and anything expensive to
+set up (noise tables, attractor segments, images) is prepared once when the
+law is created.
+"""
+import numpy as np
+
+from fields.noise import NOISE_KINDS, noise_lattice
+
+
+class DistanceLaw(object):
+    """Base class: subclasses implement weights(s, t, points)."""
+
+    def weights(self, s, t, points):
+        raise NotImplementedError
+
+    def distances(self, s, t, points, dist_start, dist_end):
+        w = np.clip(self.weights(s, t, points), 0.0, 1.0)
+        return dist_start + w * (dist_end - dist_start)
+
+
+class WaveLaw(DistanceLaw):
+    """Linear gradient (num_waves <= 1) or sine waves along s."""
+
+    def __init__(self, num_waves):
+        self.num_waves = num_waves
+
+    def weights(self, s, t, points):
+        s = np.asarray(s, dtype=float)
+        if self.num_waves <= 1:
+            # Linear gradient from start to end
+            return s
+        # Sine wave between min and max
+        return 0.5 + 0.5 * np.sin(2.0 * np.pi * self.num_waves * s)
+
+
+class NoiseLaw(DistanceLaw):
+    """Seeded value / Perlin / simplex noise over (s, t).
+
+    Args:
+        kind:      one of NOISE_KINDS.
+        seed:      lattice seed; tables are shared by all laws with that seed.
+        frequency: noise cells across the unit range of s and t.
+        octaves:   fractal octaves (1 = plain noise).
+
+    Weights are stretched from the range the noise covers on the lattice
+    (NoiseLattice.fbm_range) to [0, 1], the same for every batch, so faces
+    and curves sampled at any density share one mapping.
+    """
+
+    def __init__(self, kind, seed, frequency=4.0, octaves=1):
+        if kind not in NOISE_KINDS:
+            raise ValueError("Unknown noise kind: {}".format(kind))
+        self.kind = kind
+        self.lattice = noise_lattice(seed)
+        self.frequency = frequency
+        self.octaves = octaves
+        self.low, self.high = self.lattice.fbm_range(kind, octaves)
+
+    def weights(self, s, t, points):
+        s = np.asarray(s, dtype=float)
+        t = np.zeros_like(s) if t is None else np.asarray(t, dtype=float)
+        w = self.lattice.fbm(self.kind, s * self.frequency, t * self.frequency, self.octaves)
+        return np.clip((w - self.low) / (self.high - self.low), 0.0, 1.0)
+
+
+def distance_to_segments(points, seg_a, seg_b, chunk=2048):
+    """Distance from every point to the nearest of a set of 3D segments.
+
+    Args:
+        points:       (n, 3) query points.
+        seg_a, seg_b: (m, 3) segment end points.
+        chunk:        points handled per batch, bounding memory to chunk x m.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 3)
+    a = np.asarray(seg_a, dtype=float).reshape(-1, 3)
+    d = np.asarray(seg_b, dtype=float).reshape(-1, 3) - a
+    dd = np.maximum(np.einsum('ij,ij->i', d, d), 1e-24)
+    out = np.empty(len(points))
+    for start in range(0, len(points), chunk):
+        p = points[start:start + chunk, None, :] - a[None, :, :]
+        t = np.clip(np.einsum('ijk,jk->ij', p, d) / dd, 0.0, 1.0)
+        diff = p - t[..., None] * d[None, :, :]
+        out[start:start + chunk] = np.sqrt(np.einsum('ijk,ijk->ij', diff, diff).min(1))
+    return out
+
+
+class AttractorLaw(DistanceLaw):
+    """Full weight on attractor curves, fading to zero at falloff distance.
+
+    Attractor curves are passed as polylines (lists of (n, 3) point arrays)
+    and flattened into one segment table up front.
+    """
+
+    def __init__(self, polylines, falloff):
+        a = []
+        b = []
+        for pts in polylines:
+            pts = np.asarray(pts, dtype=float).reshape(-1, 3)
+            if len(pts) >= 2:
+                a.append(pts[:-1])
+                b.append(pts[1:])
+        if not a:
+            raise ValueError("Attractor law needs at least one polyline")
+        self.seg_a = np.concatenate(a)
+        self.seg_b = np.concatenate(b)
+        self.falloff = max(falloff, 1e-12)
+
+    def weights(self, s, t, points):
+        dist = distance_to_segments(points, self.seg_a, self.seg_b)
+        return 1.0 - dist / self.falloff
+
+
+class ImageLaw(DistanceLaw):
+    """Grey values of an image mapped over (s, t), bilinearly interpolated.
+
+    Args:
+        image:  (rows, cols) array of grey values in [0, 1], first row at
+                the top of the picture.
+        invert: use 1 - grey (dark = far).
+    """
+
+    def __init__(self, image, invert=False):
+        image = np.asarray(image, dtype=float)
+        # Flip so t = 0 samples the bottom of the picture
+        self.image = 1.0 - image[::-1] if invert else image[::-1]
+
+    def weights(self, s, t, points):
+        s = np.asarray(s, dtype=float)
+        t = np.zeros_like(s) if t is None else np.asarray(t, dtype=float)
+        return bilinear(self.image, s, t)
+
+
+def bilinear(image, s, t):
+    """Sample a (rows, cols) array at normalized (s, t) with bilinear interpolation."""
+    rows, cols = image.shape
+    x = np.clip(s, 0.0, 1.0) * (cols - 1)
+    y = np.clip(t, 0.0, 1.0) * (rows - 1)
+    x0 = np.minimum(np.floor(x).astype(np.int64), max(cols - 2, 0))
+    y0 = np.minimum(np.floor(y).astype(np.int64), max(rows - 2, 0))
+    x1 = np.minimum(x0 + 1, cols - 1)
+    y1 = np.minimum(y0 + 1, rows - 1)
+    fx = x - x0
+    fy = y - y0
+    top = image[y0, x0] + fx * (image[y0, x1] - image[y0, x0])
+    bottom = image[y1, x0] + fx * (image[y1, x1] - image[y1, x0])
+    return top + fy * (bottom - top)
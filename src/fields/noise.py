@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+noise.py - Seeded 2D value, Perlin and simplex noise on NumPy arrays.
+
+All lattice data (permutation table, lattice values, gradients) is built
+once per seed by NoiseLattice and cached by noise_lattice(seed), so
+evaluating a law on a dense sample grid is a handful of array lookups and
+never re-seeds or loops per sample.
+"""
+import math
+
+import numpy as np
+
+NOISE_KINDS = ("value", "perlin", "simplex")
+
+# Simplex gradient directions (the x, y part of the classic grad3 table)
+_GRAD2 = np.array([(1, 1), (-1, 1), (1, -1), (-1, -1), (1, 0), (-1, 0),
+                   (1, 0), (-1, 0), (0, 1), (0, -1), (0, 1), (0, -1)], dtype=float)
+
+# Fixed grid fbm_range calibrates on (points per side, spacing in lattice
+# cells, off the lattice lines) and the share of values clipped at each end
+CALIBRATION_SIZE = 256
+CALIBRATION_STEP = 0.371
+CALIBRATION_TAIL = 0.005
+
+_F2 = 0.5 * (math.sqrt(3.0) - 1.0)
+_G2 = (3.0 - math.sqrt(3.0)) / 6.0
+
+
+def _fade(t):
+    return t * t * t * (t * (t * 6.0 - 15.0) + 10.0)
+
+
+class NoiseLattice(object):
+    """Permutation, value and gradient tables for one seed."""
+
+    __slots__ = ("seed", "perm", "values", "gradients", "_ranges")
+
+    def __init__(self, seed):
+        rng = np.random.default_rng(seed)
+        p = rng.permutation(256)
+        self.seed = seed
+        self.perm = np.concatenate([p, p])
+        self.values = rng.random(256)
+        angles = rng.uniform(0.0, 2.0 * math.pi, 256)
+        self.gradients = np.stack([np.cos(angles), np.sin(angles)], -1)
+        self._ranges = {}
+
+    def _hash(self, ix, iy):
+        return self.perm[self.perm[ix & 255] + (iy & 255)]
+
+    def value(self, x, y):
+        """Smoothly interpolated lattice values, in [0, 1]."""
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        x0 = np.floor(x)
+        y0 = np.floor(y)
+        fx = _fade(x - x0)
+        fy = _fade(y - y0)
+        ix = x0.astype(np.int64)
+        iy = y0.astype(np.int64)
+        v = self.values
+        a = v[self._hash(ix, iy)]
+        b = v[self._hash(ix + 1, iy)]
+        c = v[self._hash(ix, iy + 1)]
+        d = v[self._hash(ix + 1, iy + 1)]
+        lo = a + fx * (b - a)
+        hi = c + fx * (d - c)
+        return lo + fy * (hi - lo)
+
+    def perlin(self, x, y):
+        """Gradient noise, rescaled to [0, 1]."""
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        x0 = np.floor(x)
+        y0 = np.floor(y)
+        dx = x - x0
+        dy = y - y0
+        ix = x0.astype(np.int64)
+        iy = y0.astype(np.int64)
+        g = self.gradients
+
+        def corner(cx, cy, ox, oy):
+            grad = g[self._hash(ix + cx, iy + cy)]
+            return grad[..., 0] * (dx - ox) + grad[..., 1] * (dy - oy)
+
+        fx = _fade(dx)
+        fy = _fade(dy)
+        n0 = corner(0, 0, 0.0, 0.0)
+        n1 = corner(1, 0, 1.0, 0.0)
+        n2 = corner(0, 1, 0.0, 1.0)
+        n3 = corner(1, 1, 1.0, 1.0)
+        lo = n0 + fx * (n1 - n0)
+        hi = n2 + fx * (n3 - n2)
+        n = lo + fy * (hi - lo)
+        # 2D Perlin noise stays within +-sqrt(0.5)
+        return np.clip(0.5 + n / (2.0 * math.sqrt(0.5)), 0.0, 1.0)
+
+    def simplex(self, x, y):
+        """2D simplex noise, rescaled to [0, 1]."""
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        s = (x + y) * _F2
+        i = np.floor(x + s)
+        j = np.floor(y + s)
+        t = (i + j) * _G2
+        x0 = x - (i - t)
+        y0 = y - (j - t)
+        i1 = (x0 > y0).astype(float)
+        j1 = 1.0 - i1
+        x1 = x0 - i1 + _G2
+        y1 = y0 - j1 + _G2
+        x2 = x0 - 1.0 + 2.0 * _G2
+        y2 = y0 - 1.0 + 2.0 * _G2
+        ii = i.astype(np.int64)
+        jj = j.astype(np.int64)
+
+        total = np.zeros_like(x0)
+        for ox, oy, cx, cy in ((x0, y0, 0, 0), (x1, y1, i1, j1), (x2, y2, 1, 1)):
+            gi = self._hash(ii + np.asarray(cx, dtype=np.int64), jj + np.asarray(cy, dtype=np.int64)) % 12
+            falloff = 0.5 - ox * ox - oy * oy
+            contrib = falloff ** 4 * (_GRAD2[gi, 0] * ox + _GRAD2[gi, 1] * oy)
+            total += np.where(falloff > 0, contrib, 0.0)
+        return np.clip(0.5 + 35.0 * total, 0.0, 1.0)
+
+    def fbm(self, kind, x, y, octaves=1, lacunarity=2.0, gain=0.5):
+        """Fractal sum of octaves of one noise kind, normalized to [0, 1]."""
+        fn = getattr(self, kind)
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        total = np.zeros(np.broadcast(x, y).shape)
+        amp = 1.0
+        freq = 1.0
+        norm = 0.0
+        for _ in range(max(1, octaves)):
+            total += amp * fn(x * freq, y * freq)
+            norm += amp
+            amp *= gain
+            freq *= lacunarity
+        return total / norm
+
+    def fbm_range(self, kind, octaves=1):
+        """(lo, hi) that fbm(kind, ..., octaves) actually covers on this lattice.
+
+        Fractal noise clusters around 0.5 and rarely gets near 0 or 1, so the
+        range is measured once per kind and octave count on a fixed grid of
+        CALIBRATION_SIZE^2 points (CALIBRATION_TAIL of the values clipped at
+        each end) and cached; it does not depend on where noise is sampled.
+        """
+        key = (kind, max(1, octaves))
+        rng = self._ranges.get(key)
+        if rng is None:
+            coords = (np.arange(CALIBRATION_SIZE) + 0.5) * CALIBRATION_STEP
+            x, y = np.meshgrid(coords, coords + 0.5 * CALIBRATION_STEP)
+            w = self.fbm(kind, x, y, octaves)
+            lo, hi = np.quantile(w, [CALIBRATION_TAIL, 1.0 - CALIBRATION_TAIL]).tolist()
+            rng = self._ranges[key] = (lo, max(hi, lo + 1e-12))
+        return rng
+
+
+_LATTICES = {}
+
+
+def noise_lattice(seed):
+    """Cached NoiseLattice for seed."""
+    lattice = _LATTICES.get(seed)
+    if lattice is None:
+        lattice = _LATTICES[seed] = NoiseLattice(seed)
+    return lattice
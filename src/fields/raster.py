@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+raster.py - Read images into NumPy grey-value grids.
+
+Uses System.Drawing, so it only runs inside Rhino (or another .NET host);
+the .NET imports are deferred to the call so the rest of the package stays
+importable anywhere. Grids come out with the first row at the top of the
+picture, as the laws and height modes expect.
+"""
+import numpy as np
+
+
+def load_grayscale(path):
+    """Read an image file into a (rows, cols) array of grey values in [0, 1].
+
+    The locked pixel block (LockBits) is copied straight into a NumPy buffer
+    in one memmove, instead of GetPixel per pixel or element-wise reads of a
+    .NET array, both far too slow for photos.
+    """
+    import ctypes
+    import System.Drawing as sd
+
+    bmp = sd.Bitmap(path)
+    try:
+        w, h = bmp.Width, bmp.Height
+        rect = sd.Rectangle(0, 0, w, h)
+        data = bmp.LockBits(rect, sd.Imaging.ImageLockMode.ReadOnly,
+                            sd.Imaging.PixelFormat.Format32bppArgb)
+        try:
+            stride = abs(data.Stride)
+            raw = np.empty((h, stride), dtype=np.uint8)
+            # A negative stride means bottom-up rows: copy from the last
+            # row's address and flip back below
+            start = data.Scan0.ToInt64() + (min(data.Stride, 0) * (h - 1))
+            ctypes.memmove(raw.ctypes.data, start, stride * h)
+        finally:
+            bmp.UnlockBits(data)
+    finally:
+        bmp.Dispose()
+    if data.Stride < 0:
+        raw = raw[::-1]
+    bgra = raw[:, :w * 4].reshape(h, w, 4).astype(float)
+    return (0.114 * bgra[..., 0] + 0.587 * bgra[..., 1] + 0.299 * bgra[..., 2]) / 255.0
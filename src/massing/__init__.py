@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""
+massing - Array kernels for the RandomExtrusion city generator.
+
+Footprints are handled as NumPy arrays (centroids, areas, corner arrays)
+so height assignment and massing meshes for tens of thousands of parcels
+are a few vectorized passes. Nothing here depends on Rhino.
+
+    kdtree.py       Static KD-tree for batched nearest-point distances
+    heights.py      Random / attractor / area / raster height modes
+    prisms.py       Footprint prisms written into one pre-sized mesh buffer
+
+Caps are triangulated with meshing.polygon, the ear clipper the facade
+commands use.
+"""
+from massing.kdtree import KDTree
+from massing.heights import (HEIGHT_MODES, random_heights, attractor_heights, area_heights,
+                             raster_heights, normalize_grid, load_csv_grid)
+from massing.prisms import clean_polygon, plan_frame, prepare_footprints, prism_buffers
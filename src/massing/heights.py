@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+heights.py - Vectorized building-height assignment over footprint arrays.
+
+Every mode takes per-footprint arrays (centroids, areas) and returns one
+height per footprint in [h_min, h_max], so tens of thousands of parcels are
+handled with a few array operations before any geometry is built.
+"""
+import numpy as np
+
+from fields.laws import bilinear
+from massing.kdtree import KDTree
+
+HEIGHT_MODES = ("random", "attractor", "area", "raster")
+
+
+def _scale(weights, h_min, h_max):
+    return h_min + np.clip(weights, 0.0, 1.0) * (h_max - h_min)
+
+
+def random_heights(count, h_min, h_max, rng):
+    """Uniform random height per footprint."""
+    return rng.uniform(h_min, h_max, count)
+
+
+def attractor_heights(centroids, attractors, h_min, h_max, falloff):
+    """h_max at the attractor points, fading linearly to h_min at falloff distance.
+
+    Distances are taken in plan (XY) to the nearest attractor through a
+    KD-tree built once over the attractors.
+    """
+    centroids = np.asarray(centroids, dtype=float).reshape(-1, 3)
+    tree = KDTree(np.asarray(attractors, dtype=float).reshape(-1, 3)[:, :2])
+    dist = tree.query(centroids[:, :2])
+    return _scale(1.0 - dist / max(falloff, 1e-12), h_min, h_max)
+
+
+def area_heights(areas, h_min, h_max, invert=False):
+    """Height from footprint area: largest footprint h_max, smallest h_min.
+
+    With invert the small parcels become the towers.
+    """
+    areas = np.asarray(areas, dtype=float)
+    span = areas.max() - areas.min() if len(areas) else 0.0
+    if span < 1e-12:
+        w = np.full(len(areas), 0.5)
+    else:
+        w = (areas - areas.min()) / span
+    return _scale(1.0 - w if invert else w, h_min, h_max)
+
+
+def raster_heights(centroids, grid, bounds, h_min, h_max):
+    """Height from a heightmap grid stretched over a plan rectangle.
+
+    Args:
+        centroids: (n, 3) footprint centroids.
+        grid:      (rows, cols) values in [0, 1], first row at the top (north).
+        bounds:    (x0, y0, x1, y1) rectangle the grid covers.
+    """
+    centroids = np.asarray(centroids, dtype=float).reshape(-1, 3)
+    x0, y0, x1, y1 = bounds
+    s = (centroids[:, 0] - x0) / max(x1 - x0, 1e-12)
+    t = (centroids[:, 1] - y0) / max(y1 - y0, 1e-12)
+    # bilinear samples t = 0 at row 0, so flip the grid to put north on top
+    return _scale(bilinear(np.asarray(grid, dtype=float)[::-1], s, t), h_min, h_max)
+
+
+def normalize_grid(grid):
+    """Rescale a raw heightmap (e.g. from a CSV of heights) to [0, 1]."""
+    grid = np.asarray(grid, dtype=float)
+    span = np.nanmax(grid) - np.nanmin(grid)
+    if span < 1e-12:
+        return np.zeros_like(grid)
+    return np.nan_to_num((grid - np.nanmin(grid)) / span)
+
+
+def load_csv_grid(path):
+    """Read a comma or whitespace separated grid of numbers, normalized to [0, 1]."""
+    with open(path) as f:
+        sample = f.read(4096)
+    delimiter = "," if "," in sample else None
+    return normalize_grid(np.loadtxt(path, delimiter=delimiter, ndmin=2))
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+kdtree.py - Static KD-tree for nearest-neighbour distances on NumPy arrays.
+
+Built once over a point set (e.g. attractor points) and queried with a whole
+batch of points at a time: queries first descend to their own leaf to get a
+tight starting radius, then the tree is walked node by node with the subset
+of queries whose best distance can still improve inside that node's box.
+All distance work happens on arrays, so the Python overhead scales with
+the number of tree nodes visited, not with the number of queries.
+"""
+import numpy as np
+
+
+class KDTree(object):
+    """KD-tree over an (n, k) point array.
+
+    Args:
+        points:    (n, k) coordinates.
+        leaf_size: points per leaf; leaves are brute-forced in one batch.
+    """
+
+    __slots__ = ("points", "leaf_size", "lo", "hi", "left", "right", "start", "stop",
+                 "axis", "split")
+
+    def __init__(self, points, leaf_size=16):
+        points = np.asarray(points, dtype=float)
+        if points.ndim != 2 or not len(points):
+            raise ValueError("KDTree needs a non-empty (n, k) point array")
+        self.leaf_size = max(1, int(leaf_size))
+        order = np.arange(len(points))
+        lo, hi, left, right, start, stop, axis, split = [], [], [], [], [], [], [], []
+
+        # Iterative build; each node owns the slice order[s:e]
+        pending = [(0, len(points), -1, False)]
+        while pending:
+            s, e, parent, is_right = pending.pop()
+            node = len(lo)
+            if parent >= 0:
+                (right if is_right else left)[parent] = node
+            block = points[order[s:e]]
+            lo.append(block.min(0))
+            hi.append(block.max(0))
+            left.append(-1)
+            right.append(-1)
+            start.append(s)
+            stop.append(e)
+            if e - s <= self.leaf_size:
+                axis.append(-1)
+                split.append(0.0)
+                continue
+            ax = int(np.argmax(hi[node] - lo[node]))
+            mid = (s + e) // 2
+            part = np.argpartition(block[:, ax], mid - s)
+            order[s:e] = order[s:e][part]
+            axis.append(ax)
+            split.append(points[order[mid], ax])
+            pending.append((mid, e, node, True))
+            pending.append((s, mid, node, False))
+
+        self.points = points[order]
+        self.lo = np.array(lo)
+        self.hi = np.array(hi)
+        self.left = np.array(left)
+        self.right = np.array(right)
+        self.start = np.array(start)
+        self.stop = np.array(stop)
+        self.axis = np.array(axis)
+        self.split = np.array(split)
+
+    def _leaf_dist(self, node, queries):
+        block = self.points[self.start[node]:self.stop[node]]
+        d = queries[:, None, :] - block[None, :, :]
+        return np.einsum('ijk,ijk->ij', d, d).min(1)
+
+    def query(self, queries):
+        """Distance from every query point to its nearest tree point.
+
+        Args:
+            queries: (m, k) array.
+        Returns:
+            (m,) array of distances.
+        """
+        queries = np.asarray(queries, dtype=float).reshape(-1, self.points.shape[1])
+        m = len(queries)
+        best = np.full(m, np.inf)
+        if not m:
+            return best
+
+        # Descend to each query's home leaf for a starting radius
+        node = np.zeros(m, dtype=np.int64)
+        while True:
+            inner = self.axis[node] >= 0
+            if not inner.any():
+                break
+            idx = np.nonzero(inner)[0]
+            n = node[idx]
+            go_right = queries[idx, self.axis[n]] >= self.split[n]
+            node[idx] = np.where(go_right, self.right[n], self.left[n])
+        for leaf in np.unique(node).tolist():
+            sel = np.nonzero(node == leaf)[0]
+            best[sel] = self._leaf_dist(leaf, queries[sel])
+
+        # Walk the tree with the queries that can still improve per node
+        stack = [(0, np.arange(m))]
+        while stack:
+            n, sel = stack.pop()
+            gap = np.maximum(self.lo[n] - queries[sel], 0.0) + np.maximum(queries[sel] - self.hi[n], 0.0)
+            sel = sel[np.einsum('ij,ij->i', gap, gap) < best[sel]]
+            if not len(sel):
+                continue
+            if self.axis[n] < 0:
+                best[sel] = np.minimum(best[sel], self._leaf_dist(n, queries[sel]))
+                continue
+            stack.append((self.right[n], sel))
+            stack.append((self.left[n], sel))
+        return np.sqrt(best)
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+prisms.py - Build many footprint prisms into one vertex / face buffer.
+
+Each footprint is cleaned and triangulated once in plan (with the shared
+ear clipper in meshing.polygon), then its bottom cap, top cap
+and walls are written into arrays sized up front from the total corner
+count. Walls get their own four vertices each so the massing shades flat.
+Faces are (F, 4) index rows; triangles repeat their last index, which is
+how Rhino meshes store triangles.
+"""
+import numpy as np
+
+from meshing.polygon import signed_area, triangulate
+
+
+def clean_polygon(poly, tol=1e-9):
+    """Indices of the corners of an (n, 2) polygon worth keeping.
+
+    Drops the closing point, repeated points and collinear corners.
+    """
+    poly = np.asarray(poly, dtype=float).reshape(-1, 2)
+    idx = np.arange(len(poly))
+    if len(poly) > 1 and np.allclose(poly[0], poly[-1], atol=tol):
+        idx = idx[:-1]
+    pts = poly[idx]
+    idx = idx[np.linalg.norm(pts - np.roll(pts, 1, 0), axis=1) > tol]
+    if len(idx) < 3:
+        return idx
+    pts = poly[idx]
+    prev = pts - np.roll(pts, 1, 0)
+    nxt = np.roll(pts, -1, 0) - pts
+    cross = prev[:, 0] * nxt[:, 1] - prev[:, 1] * nxt[:, 0]
+    scale = np.linalg.norm(prev, axis=1) * np.linalg.norm(nxt, axis=1)
+    return idx[np.abs(cross) > tol * np.maximum(scale, tol)]
+
+
+def plan_frame(direction):
+    """Orthonormal (x_axis, y_axis, z_axis) with z along the extrusion direction."""
+    z = np.asarray(direction, dtype=float)
+    z = z / np.linalg.norm(z)
+    helper = np.array([1.0, 0.0, 0.0]) if abs(z[0]) < 0.9 else np.array([0.0, 1.0, 0.0])
+    x = np.cross(helper, z)
+    x /= np.linalg.norm(x)
+    return x, np.cross(z, x), z
+
+
+def prepare_footprints(footprints, direction):
+    """Clean, orient and triangulate footprints.
+
+    Args:
+        footprints: list of (n, 3) corner arrays (closed planar outlines).
+        direction:  extrusion direction; footprints are read in the plane
+                    normal to it.
+    Returns:
+        List of (index, corners (n, 3), triangles (n - 2, 3)) for every
+        usable footprint, corners counter-clockwise seen from direction.
+    """
+    x, y, _ = plan_frame(direction)
+    out = []
+    for i, pts in enumerate(footprints):
+        pts = np.asarray(pts, dtype=float).reshape(-1, 3)
+        plan = np.stack([pts @ x, pts @ y], -1)
+        keep = clean_polygon(plan)
+        if len(keep) < 3:
+            continue
+        cleaned = plan[keep].tolist()
+        corners = pts[keep]
+        if signed_area(cleaned) < 0:
+            cleaned.reverse()
+            corners = corners[::-1]
+        tris = np.array(triangulate(cleaned), dtype=np.int64).reshape(-1, 3)
+        out.append((i, corners, tris))
+    return out
+
+
+def prism_buffers(prepared, heights, direction):
+    """Vertex and face arrays for all prepared footprints.
+
+    Args:
+        prepared:  output of prepare_footprints.
+        heights:   per-footprint heights, indexed by the original footprint index.
+        direction: extrusion direction (normalized here).
+    Returns:
+        (vertices (V, 3), faces (F, 4)).
+    """
+    z = np.asarray(direction, dtype=float)
+    z = z / np.linalg.norm(z)
+    heights = np.asarray(heights, dtype=float)
+
+    # Sizes: per footprint 2n cap vertices + 4n wall vertices, 2(n - 2) cap
+    # triangles + n wall quads
+    n_vert = sum(6 * len(c) for _, c, _ in prepared)
+    n_face = sum(2 * len(t) + len(c) for _, c, t in prepared)
+    vertices = np.empty((n_vert, 3))
+    faces = np.empty((n_face, 4), dtype=np.int64)
+
+    v = 0
+    f = 0
+    for i, corners, tris in prepared:
+        n = len(corners)
+        top = corners + z * heights[i]
+
+        # Caps: bottom faces down (reversed), top faces up
+        vertices[v:v + n] = corners
+        vertices[v + n:v + 2 * n] = top
+        t = len(tris)
+        faces[f:f + t, 0] = v + tris[:, 0]
+        faces[f:f + t, 1] = v + tris[:, 2]
+        faces[f:f + t, 2] = v + tris[:, 1]
+        faces[f:f + t, 3] = v + tris[:, 1]
+        faces[f + t:f + 2 * t, :3] = v + n + tris
+        faces[f + t:f + 2 * t, 3] = v + n + tris[:, 2]
+        v += 2 * n
+        f += 2 * t
+
+        # Walls: quad (b_k, b_k+1, t_k+1, t_k) faces outward for a CCW outline
+        nxt = np.roll(np.arange(n), -1)
+        quad = np.stack([corners, corners[nxt], top[nxt], top], 1).reshape(-1, 3)
+        vertices[v:v + 4 * n] = quad
+        faces[f:f + n] = v + np.arange(4 * n).reshape(-1, 4)
+        v += 4 * n
+        f += n
+
+    return vertices, faces
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""
+meshing - Polygon triangulation and mesh construction shared by the commands.
+
+    polygon.py  Signed area and ear clipping of 2D polygons (pure Python)
+    bake.py     Vertex / face buffers -> Rhino mesh (Rhino only)
+
+meshing.bake is not imported here so the polygon helpers stay importable
+outside Rhino.
+"""
+from meshing.polygon import signed_area, triangulate
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+bake.py - Build Rhino meshes from flat vertex / face buffers.
+
+The one mesh builder behind the facade, subdivision, massing and offset
+commands: they all collect their geometry into buffers first (array.array
+or NumPy) and turn it into a single Rhino mesh here.
+"""
+import Rhino.Geometry as rg
+import System
+
+
+def _flat(values):
+    """Flat Python list from an array.array, list or NumPy array of any shape."""
+    if hasattr(values, "ravel"):
+        return values.ravel().tolist()
+    return list(values)
+
+
+def mesh_from_arrays(coords, faces, colors=None):
+    """Build a Rhino mesh in one pass.
+
+    Args:
+        coords: vertex coordinates, flat (x, y, z, ...) or (V, 3).
+        faces:  face indices, flat (a, b, c, d, ...) or (F, 4); triangles
+                repeat their last index.
+        colors: optional ARGB int per vertex.
+    Closed meshes are flipped if they come out inside-out.
+    """
+    mesh = rg.Mesh()
+    c = _flat(coords)
+    mesh.Vertices.Capacity = len(c) // 3
+    for k in range(0, len(c), 3):
+        mesh.Vertices.Add(c[k], c[k + 1], c[k + 2])
+    f = _flat(faces)
+    mesh.Faces.Capacity = len(f) // 4
+    for k in range(0, len(f), 4):
+        mesh.Faces.AddFace(f[k], f[k + 1], f[k + 2], f[k + 3])
+    if colors is not None and len(colors) == len(c) // 3:
+        mesh.VertexColors.Capacity = len(colors)
+        for argb in _flat(colors):
+            mesh.VertexColors.Add(System.Drawing.Color.FromArgb(argb))
+    mesh.Normals.ComputeNormals()
+    mesh.Compact()
+    if mesh.IsClosed and mesh.Volume() < 0:
+        mesh.Flip(True, True, True)
+    return mesh
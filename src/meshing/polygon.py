@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+polygon.py - Signed area and ear-clipping triangulation of 2D polygons.
+
+Pure Python (no NumPy, no Rhino) so every layout kernel can use it; NumPy
+callers pass arrays of (x, y) rows, which index the same way as lists of
+tuples. Convex outlines, the common case for panels and parcels, are
+fanned without ear searching.
+"""
+
+
+def signed_area(pts):
+    """Signed area of a 2D polygon (positive when counter-clockwise)."""
+    a = 0.0
+    n = len(pts)
+    for k in range(n):
+        x0, y0 = pts[k]
+        x1, y1 = pts[(k + 1) % n]
+        a += x0 * y1 - x1 * y0
+    return a / 2.0
+
+
+def triangulate(pts):
+    """Ear-clip a simple 2D polygon.
+
+    Args:
+        pts: list of (x, y) without a closing duplicate, either orientation.
+    Returns:
+        List of (i, j, k) index triples into pts, counter-clockwise.
+    """
+    n = len(pts)
+    if n < 3:
+        return []
+    idx = list(range(n))
+    if signed_area(pts) < 0:
+        idx.reverse()
+    if n == 3:
+        return [tuple(idx)]
+    if all(_cross(pts[idx[k - 1]], pts[idx[k]], pts[idx[(k + 1) % n]]) > 0 for k in range(n)):
+        # Convex: fan from the first corner, no ear search needed
+        return [(idx[0], idx[k], idx[k + 1]) for k in range(1, n - 1)]
+
+    tris = []
+    guard = 0
+    while len(idx) > 3 and guard < n * n:
+        guard += 1
+        m = len(idx)
+        for k in range(m):
+            i0, i1, i2 = idx[k - 1], idx[k], idx[(k + 1) % m]
+            a, b, c = pts[i0], pts[i1], pts[i2]
+            if _cross(a, b, c) <= 0:
+                continue
+            if any(_in_triangle(pts[j], a, b, c) for j in idx if j not in (i0, i1, i2)):
+                continue
+            tris.append((i0, i1, i2))
+            del idx[k]
+            break
+        else:
+            # Degenerate input; fall back to a fan over what is left
+            break
+    for k in range(1, len(idx) - 1):
+        tris.append((idx[0], idx[k], idx[k + 1]))
+    return tris
+
+
+def _cross(a, b, c):
+    return (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+
+
+def _in_triangle(p, a, b, c):
+    return _cross(a, b, p) >= 0 and _cross(b, c, p) >= 0 and _cross(c, a, p) >= 0
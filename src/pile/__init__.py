@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+"""
+pile - Shared body catalogue and pile state for the brick and stick pile commands.
+
+pile.catalogue holds the unit-aware brick/stick sizes and the keys the
+asset cache uses. pile.world and pile.hulls (the pile state, body shapes,
+drop and settling; need numpy) and the Rhino backends pile.assets,
+pile.hull_assets (numpy), pile.document and pile.bake are not imported
+here, so the catalogue stays importable outside Rhino and without numpy.
+"""
+from pile.catalogue import (BRICK, STICK, BRICK_PRESETS, DEFAULT_BRICK, DEFAULT_STICK_MM,
+                            brick_dims, stick_dims, body_key, half_extents)
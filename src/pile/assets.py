@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+assets.py - Rhino-side cache of pile body assets.
+
+A BodyAsset holds everything the pile commands derive from a body size:
+the base collision/display mesh, its OBB half-extents and the index of a
+block definition holding the body. Assets are cached per body key for the
+session and the block definition lives in the document under a name
+derived from the key, so rerunning a command with the same size reuses
+both instead of rebuilding them. Hull assets of user geometry, which need
+numpy, live in pile.hull_assets and share the cache.
+"""
+import Rhino
+import Rhino.Geometry as rg
+import rhinoscriptsyntax as rs
+import scriptcontext as sc
+
+from pile.catalogue import BRICK_PRESETS, DEFAULT_BRICK, brick_dims, body_key, half_extents
+
+
+class BodyAsset(object):
+    """Base geometry and collision data for one body size."""
+
+    __slots__ = ("key", "name", "dims", "half_extents", "mesh", "_block_index")
+
+    def __init__(self, key, name, dims, density):
+        self.key = key
+        self.name = name
+        self.dims = dims
+        self.half_extents = half_extents(dims)
+        hx, hy, hz = self.half_extents
+        box = rg.Box(rg.Plane.WorldXY, rg.Interval(-hx, hx), rg.Interval(-hy, hy),
+                     rg.Interval(-hz, hz))
+        self.mesh = rg.Mesh.CreateFromBox(box, density, density, density)
+        self._block_index = -1
+
+    def block_index(self):
+        """Index of the block definition holding the body, created on first use."""
+        table = sc.doc.InstanceDefinitions
+        idef = table.Find(self.name)
+        if idef is not None and not idef.IsDeleted:
+            self._block_index = idef.Index
+            return self._block_index
+        l, w, h = self.dims
+        self._block_index = table.Add(self.name, "{} {:g} x {:g} x {:g}".format(self.key[0], l, w, h),
+                                      rg.Point3d.Origin, [self.mesh.DuplicateMesh()])
+        return self._block_index
+
+    def placed_mesh(self, xform):
+        """Copy of the base mesh moved by xform."""
+        m = self.mesh.DuplicateMesh()
+        m.Transform(xform)
+        return m
+
+
+# Assets of this session by key (shared with pile.hull_assets)
+_ASSETS = {}
+
+
+def unit_scale_from_mm():
+    """Millimetres -> document units."""
+    return Rhino.RhinoMath.UnitScale(Rhino.UnitSystem.Millimeters, sc.doc.ModelUnitSystem)
+
+
+def body_asset(kind, dims, density=1):
+    """Cached BodyAsset for a body of dims (document units) in the current units."""
+    key = body_key(kind, dims, sc.doc.ModelUnitSystem, density)
+    asset = _ASSETS.get(key)
+    if asset is None:
+        name = "Pile_{}_{}_{:g}x{:g}x{:g}_d{}".format(kind, key[2], key[1][0], key[1][1],
+                                                    key[1][2], key[3])
+        asset = _ASSETS[key] = BodyAsset(key, name, key[1], max(1, int(density)))
+    return asset
+
+
+def world_transform(world, i):
+    """Transform placing body i of a PileWorld (world XY -> body frame)."""
+    m = world.transform(i)
+    plane = rg.Plane(rg.Point3d(m[0, 3], m[1, 3], m[2, 3]),
+                     rg.Vector3d(m[0, 0], m[1, 0], m[2, 0]),
+                     rg.Vector3d(m[0, 1], m[1, 1], m[2, 1]))
+    return rg.Transform.PlaneToPlane(rg.Plane.WorldXY, plane)
+
+
+def get_brick_dims():
+    """Prompt for a brick preset (or custom size). Returns (l, w, h) in document units or None."""
+    scale = unit_scale_from_mm()
+    names = sorted(BRICK_PRESETS) + ["Custom"]
+    choice = rs.GetString("Brick size", DEFAULT_BRICK, names)
+    if choice is None:
+        return None
+    match = [n for n in names if n.lower() == choice.lower()]
+    if not match:
+        return None
+    if match[0] != "Custom":
+        return brick_dims(match[0], scale)
+    l, w, h = brick_dims(DEFAULT_BRICK, scale)
+    dims = []
+    for label, default in (("length", l), ("width", w), ("height", h)):
+        value = rs.GetReal("Brick {}".format(label), round(default, 4), 1e-6)
+        if value is None:
+            return None
+        dims.append(value)
+    return tuple(dims)
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+bake.py - Streaming bake of PileWorld bodies into the Rhino document.
+
+Long pile runs are flushed while they simulate instead of all at the end:
+every `chunk` new bodies are baked, either merged into one mesh object or
+as block references, so a cancelled or failed run keeps everything placed
+so far and the viewport shows the pile growing. Bodies that settling
+moves after their chunk was baked are picked up from PileWorld.take_moved:
+their chunk mesh is rebuilt in place, or their block reference is moved.
+"""
+import rhinoscriptsyntax as rs
+import Rhino.Geometry as rg
+import scriptcontext as sc
+import System
+
+from pile.assets import world_transform
+
+# Bodies per baked mesh / redraw
+BAKE_CHUNK = 100
+
+
+class StreamingBake(object):
+    """Bake the bodies of a PileWorld from index `first` on, in chunks.
+
+    Args:
+        world:  the PileWorld being filled.
+        assets: BodyAsset/HullAsset placed for every body, or a dict of
+                world shape id -> asset when bodies differ.
+        first:  index of the first body to bake (earlier ones are already
+                in the document, e.g. when continuing a pile).
+        chunk:  bodies per flush.
+        blocks: bake block references (one object per body) instead of
+                one merged mesh per chunk.
+    """
+
+    def __init__(self, world, assets, first=0, chunk=BAKE_CHUNK, blocks=False):
+        self.world = world
+        self.assets = assets
+        self.first = first
+        self.chunk = max(1, int(chunk))
+        self.blocks = blocks
+        self.baked = first
+        self.chunks = []    # (start, stop, object id) per merged mesh
+        self.instances = {}  # body index -> block reference id
+        world.take_moved()
+
+    def _asset(self, i):
+        if isinstance(self.assets, dict):
+            return self.assets[int(self.world.shape_ids[i])]
+        return self.assets
+
+    def _mesh(self, start, stop):
+        merged = rg.Mesh()
+        merged.Append([self._asset(i).placed_mesh(world_transform(self.world, i))
+                       for i in range(start, stop)])
+        merged.Normals.ComputeNormals()
+        merged.Compact()
+        return merged
+
+    def _refresh_moved(self):
+        """Update baked geometry of bodies moved since they were baked."""
+        moved = self.world.take_moved()
+        if self.blocks:
+            for i in moved:
+                obj_id = self.instances.get(i)
+                rhobj = sc.doc.Objects.FindId(obj_id) if obj_id is not None else None
+                if rhobj is None:
+                    continue
+                ok, back = rhobj.InstanceXform.TryGetInverse()
+                if ok:
+                    sc.doc.Objects.Transform(obj_id, world_transform(self.world, i) * back, True)
+            return
+        for start, stop, obj_id in self.chunks:
+            if any(start <= i < stop for i in moved):
+                sc.doc.Objects.Replace(obj_id, self._mesh(start, stop))
+
+    def _bake(self, stop):
+        created = []
+        if self.blocks:
+            for i in range(self.baked, stop):
+                obj_id = sc.doc.Objects.AddInstanceObject(self._asset(i).block_index(),
+                                                          world_transform(self.world, i))
+                if obj_id != System.Guid.Empty:
+                    self.instances[i] = obj_id
+                    created.append(obj_id)
+        else:
+            obj_id = sc.doc.Objects.AddMesh(self._mesh(self.baked, stop))
+            if obj_id != System.Guid.Empty:
+                self.chunks.append((self.baked, stop, obj_id))
+                created.append(obj_id)
+        self.baked = stop
+        return created
+
+    def flush(self, final=False):
+        """Bake every complete pending chunk (and the partial last one if
+        final), refresh moved bodies and redraw. Returns the new object ids."""
+        created = []
+        self._refresh_moved()
+        while self.world.count - self.baked >= self.chunk:
+            created += self._bake(self.baked + self.chunk)
+        if final and self.world.count > self.baked:
+            created += self._bake(self.world.count)
+        if created or final:
+            rs.EnableRedraw(True)
+            sc.doc.Views.Redraw()
+            rs.EnableRedraw(False)
+        return created
+
+    def pending(self):
+        """True when a complete chunk is waiting to be baked."""
+        return self.world.count - self.baked >= self.chunk
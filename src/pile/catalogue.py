@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+catalogue.py - Brick and stick sizes for the pile commands.
+
+Presets are stored in millimetres and converted to document units by the
+caller, so a pile built in a metre or inch model gets real-size bricks
+instead of the same raw numbers. Body keys identify a converted size; the
+Rhino-side asset cache (pile.assets) is keyed by them.
+"""
+BRICK = "brick"
+STICK = "stick"
+
+# Name -> (length, width, height) in millimetres
+BRICK_PRESETS = {
+    "Standard": (215.0, 102.5, 65.0),   # UK / EU
+    "Modular": (194.0, 92.0, 57.0),     # US modular
+    "Jumbo": (290.0, 90.0, 90.0),
+}
+DEFAULT_BRICK = "Standard"
+
+# Default stick: length, square cross-section side, in millimetres
+DEFAULT_STICK_MM = (600.0, 30.0)
+
+
+def brick_dims(preset, scale):
+    """(length, width, height) of a preset scaled from millimetres to document units."""
+    l, w, h = BRICK_PRESETS[preset]
+    return (l * scale, w * scale, h * scale)
+
+
+def stick_dims(length, thickness):
+    """(length, width, height) of a square stick lying along X."""
+    return (length, thickness, thickness)
+
+
+def body_key(kind, dims, units, density=1):
+    """Hashable key for one body size.
+
+    Dimensions are rounded (to 1e-9 relative) so sizes that only differ by
+    float noise, e.g. after a units round-trip, share the same assets.
+    """
+    rounded = tuple(float("{:.9g}".format(d)) for d in dims)
+    return (kind, rounded, str(units), int(density))
+
+
+def half_extents(dims):
+    """OBB half-extents (x, y, z) of a body centred on the origin."""
+    return tuple(d / 2.0 for d in dims)
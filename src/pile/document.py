@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+document.py - Store pile simulation state in the Rhino document.
+
+A pile has a name. Its PileWorld state (see PileWorld.to_json) is kept in
+the document string table under PILE_SECTION, so it is saved with the
+.3dm, and the objects baked for the pile are grouped under the same name
+and tagged with it as user text. "Continue pile" picks any of those
+objects, reloads the state and only drops the new bodies.
+
+The state describes the pile as it was simulated: bodies moved or deleted
+by hand afterwards are not picked up.
+"""
+import rhinoscriptsyntax as rs
+import scriptcontext as sc
+
+from pile.world import PileWorld
+
+PILE_SECTION = "PileState"
+PILE_KEY = "pile"
+
+
+def save_pile(name, world):
+    """Write the state of world to the document under name."""
+    sc.doc.Strings.SetString(PILE_SECTION, name, world.to_json())
+
+
+def load_pile(name):
+    """PileWorld stored under name, or None if there is none (or it is unreadable)."""
+    text = sc.doc.Strings.GetValue(PILE_SECTION, name)
+    if not text:
+        return None
+    try:
+        return PileWorld.from_json(text)
+    except ValueError as e:
+        print("Could not read pile '{}': {}".format(name, e))
+        return None
+
+
+def new_pile_name(prefix="Pile"):
+    """First prefix_N name not used by a stored pile or a group."""
+    n = 1
+    while True:
+        name = "{}_{:03d}".format(prefix, n)
+        if not sc.doc.Strings.GetValue(PILE_SECTION, name) and not rs.IsGroup(name):
+            return name
+        n += 1
+
+
+def tag_pile_objects(ids, name):
+    """Add ids to the pile's group (created if needed) and tag them with its name."""
+    ids = list(ids)
+    if not ids:
+        return
+    if not rs.IsGroup(name):
+        rs.AddGroup(name)
+    rs.AddObjectsToGroup(ids, name)
+    for obj_id in ids:
+        rs.SetUserText(obj_id, PILE_KEY, name)
+
+
+def get_pile(prefix="Pile"):
+    """Prompt for a new pile or one to continue.
+
+    Returns:
+        (name, world): world is the reloaded PileWorld when continuing and
+        None for a new pile; None if cancelled. The bodies of a reloaded
+        pile are already baked, so they are frozen: new bodies rest on them
+        but cannot tip them.
+    """
+    mode = rs.GetString("Pile", "New", ["New", "Continue"])
+    if mode is None:
+        return None
+    if mode.capitalize() != "Continue":
+        return new_pile_name(prefix), None
+    obj_id = rs.GetObject("Select an object of the pile to continue", preselect=True)
+    if obj_id is None:
+        return None
+    name = rs.GetUserText(obj_id, PILE_KEY)
+    if not name:
+        print("That object is not part of a stored pile.")
+        return None
+    world = load_pile(name)
+    if world is None:
+        print("No simulation state found for pile '{}'.".format(name))
+        return None
+    world.freeze()
+    return name, world
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+hull_assets.py - Rhino-side cache of hull assets for user-picked geometry.
+
+A HullAsset is the BodyAsset of a user-picked mesh or Brep: its compound
+26-DOP hull (pile.hulls) is computed once per object and the block holds
+the original geometry, moved so its centre of mass sits on the origin.
+Kept apart from pile.assets because the hull needs numpy, which the box
+pile commands do not load.
+
+Block definitions are named after the object and a hash of its meshed
+geometry, so an edited object gets a new definition instead of rewriting
+the one earlier piles still reference.
+"""
+import hashlib
+
+import numpy as np
+import Rhino.Geometry as rg
+import scriptcontext as sc
+
+from pile.assets import _ASSETS
+from pile.hulls import hull_shape
+
+
+class HullAsset(object):
+    """Hull, display mesh and block definition of one picked object."""
+
+    __slots__ = ("key", "name", "shape", "half_extents", "mesh", "geometry", "_block_index")
+
+    def __init__(self, key, name, geometry, mesh, shape):
+        self.key = key
+        self.name = name
+        self.geometry = geometry
+        self.mesh = mesh
+        self.shape = shape
+        self.half_extents = tuple(shape.half.tolist())
+        self._block_index = -1
+
+    def block_index(self):
+        """Index of the block definition holding the geometry, created on
+        first use. The name carries a content hash, so a definition found
+        under it already holds this geometry."""
+        table = sc.doc.InstanceDefinitions
+        idef = table.Find(self.name)
+        if idef is not None and not idef.IsDeleted:
+            self._block_index = idef.Index
+            return self._block_index
+        self._block_index = table.Add(self.name, "Pile debris", rg.Point3d.Origin,
+                                      [self.geometry.Duplicate()])
+        return self._block_index
+
+    def placed_mesh(self, xform):
+        """Copy of the display mesh moved by xform."""
+        m = self.mesh.DuplicateMesh()
+        m.Transform(xform)
+        return m
+
+
+def _collision_mesh(geometry):
+    """Single mesh of a mesh, Brep or extrusion, or None."""
+    if isinstance(geometry, rg.Mesh):
+        return geometry.DuplicateMesh()
+    if isinstance(geometry, rg.Extrusion):
+        geometry = geometry.ToBrep()
+    if isinstance(geometry, rg.Brep):
+        parts = rg.Mesh.CreateFromBrep(geometry, rg.MeshingParameters.FastRenderMesh)
+        if parts:
+            mesh = rg.Mesh()
+            mesh.Append(parts)
+            return mesh
+    return None
+
+
+def _centre_of_mass(geometry, mesh):
+    """Volume centroid of closed geometry, else area centroid, else bbox centre."""
+    closed = mesh.IsClosed if isinstance(geometry, rg.Mesh) else getattr(geometry, "IsSolid", False)
+    props = rg.VolumeMassProperties.Compute(geometry) if closed else None
+    if props is None:
+        props = rg.AreaMassProperties.Compute(mesh)
+    if props is not None:
+        return props.Centroid
+    return mesh.GetBoundingBox(True).Center
+
+
+def hull_asset(obj_id, pieces=1):
+    """Cached HullAsset for a mesh/Brep object, or None if it cannot be meshed.
+
+    The cache key includes the object's runtime serial number, so editing
+    the object rebuilds its hull on the next run.
+    """
+    rhobj = sc.doc.Objects.FindId(obj_id)
+    if rhobj is None:
+        return None
+    key = ("hull", str(rhobj.Id), rhobj.RuntimeSerialNumber, int(pieces))
+    asset = _ASSETS.get(key)
+    if asset is not None:
+        return asset
+    geometry = rhobj.Geometry.Duplicate()
+    if isinstance(geometry, rg.Extrusion):
+        geometry = geometry.ToBrep()
+    mesh = _collision_mesh(geometry)
+    if mesh is None or mesh.Vertices.Count < 4:
+        return None
+    com = _centre_of_mass(geometry, mesh)
+    to_origin = rg.Transform.Translation(-com.X, -com.Y, -com.Z)
+    geometry.Transform(to_origin)
+    mesh.Transform(to_origin)
+
+    # Hull from the mesh topology: welded vertices and their edges
+    top = mesh.TopologyVertices
+    vertices = np.array([(p.X, p.Y, p.Z) for p in (top[k] for k in range(top.Count))])
+    edges = mesh.TopologyEdges
+    pairs = np.array([(e.I, e.J) for e in (edges.GetTopologyVertices(k) for k in range(edges.Count))],
+                     dtype=np.int64).reshape(-1, 2)
+    shape = hull_shape(vertices, pairs, pieces)
+
+    digest = hashlib.sha1((np.round(vertices, 9) + 0.0).tobytes()).hexdigest()[:10]
+    name = "Pile_debris_{}_{}".format(str(rhobj.Id)[:8], digest)
+    asset = _ASSETS[key] = HullAsset(key, name, geometry, mesh, shape)
+    return asset
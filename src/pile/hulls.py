@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+hulls.py - Convex body shapes for the pile solver.
+
+A BodyShape is what PileWorld collides: one or more convex pieces in the
+body's local frame (origin at its centre of mass). Boxes are a single
+piece kept as half-extents so they use the cheap slab test. Arbitrary
+geometry is approximated by 26-DOPs: convex polytopes bounded by planes
+facing the 26 directions of a cube's corners, edges and faces, each
+pushed out to touch the geometry. A 26-DOP hugs a shape far better than
+its bounding box, costs one max per plane to build, and shares the same
+plane set with every other piece so hits against many pieces batch into
+one array operation. Long or bent geometry can be split into a few slabs
+along its longest axis, one piece each, for a tighter compound hull.
+"""
+import itertools
+
+import numpy as np
+
+# Corners, edge midpoints and face centres of the [-1, 1] cube
+CUBE_POINTS = np.array([p for p in itertools.product((-1.0, 0.0, 1.0), repeat=3) if any(p)])
+
+# Plane normals of a 26-DOP (unit length): 6 faces, 12 edges, 8 corners
+DOP_NORMALS = CUBE_POINTS / np.linalg.norm(CUBE_POINTS, axis=1, keepdims=True)
+
+# Most pieces a compound hull is split into
+MAX_PIECES = 8
+
+# Points per edge (ends included) used by the overlap check
+EDGE_POINTS = 5
+
+
+class BodyShape(object):
+    """Collision shape of a body in its local frame.
+
+    Attributes:
+        half:    (3,) half-size of a box about the origin that holds the
+                 whole shape (the broadphase extent).
+        samples: (S, 3) points cast against other bodies.
+        box:     True for a plain box (half is then exact).
+        offsets: (N, 26) plane offsets of the N convex pieces; the piece
+                 is {x : DOP_NORMALS @ x <= offsets}. Empty for boxes.
+    """
+
+    __slots__ = ("half", "samples", "box", "offsets", "_edges")
+
+    def __init__(self, half, samples, box, offsets):
+        self.half = np.asarray(half, dtype=float)
+        self.samples = np.asarray(samples, dtype=float)
+        self.box = bool(box)
+        self.offsets = np.asarray(offsets, dtype=float).reshape(-1, len(DOP_NORMALS))
+        self._edges = None
+
+    def edge_points(self):
+        """(E, 3) points along every edge of every piece (built on first use)."""
+        if self._edges is None:
+            if self.box:
+                pieces = [(CUBE_POINTS[np.all(CUBE_POINTS != 0, axis=1)] * self.half, None)]
+            else:
+                pieces = [(dop_vertices(o), o) for o in self.offsets]
+            self._edges = np.vstack([_edge_points(v, o) for v, o in pieces])
+        return self._edges
+
+    def depth(self, points):
+        """(M,) how deep local points lie inside the shape (<= 0 outside)."""
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        if self.box:
+            return (self.half - np.abs(points)).min(1)
+        room = self.offsets[None, :, :] - (points @ DOP_NORMALS.T)[:, None, :]
+        return room.min(2).max(1)
+
+    def to_dict(self):
+        return {"half": self.half.tolist(), "samples": self.samples.tolist(),
+                "box": self.box, "offsets": self.offsets.tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["half"], data["samples"], data["box"], data["offsets"])
+
+
+def box_shape(half):
+    """BodyShape of a box with the given half-extents, centred on the origin."""
+    half = np.asarray(half, dtype=float)
+    return BodyShape(half, CUBE_POINTS * half, True, np.zeros((0, len(DOP_NORMALS))))
+
+
+def dop_offsets(points):
+    """(26,) 26-DOP plane offsets of (n, 3) points."""
+    return (np.asarray(points, dtype=float) @ DOP_NORMALS.T).max(0)
+
+
+def dop_vertices(offsets, tol=1e-9):
+    """Corner points of the 26-DOP with the given offsets."""
+    scale = max(1.0, float(np.max(np.abs(offsets))))
+    triples = np.array(list(itertools.combinations(range(len(DOP_NORMALS)), 3)))
+    a = DOP_NORMALS[triples]
+    det = np.linalg.det(a)
+    keep = np.abs(det) > 1e-9
+    a, triples = a[keep], triples[keep]
+    pts = np.linalg.solve(a, offsets[triples][..., None])[..., 0]
+    inside = np.all(pts @ DOP_NORMALS.T <= offsets + tol * scale, axis=1)
+    pts = pts[inside]
+    _, first = np.unique(np.round(pts / (tol * scale * 1e3), 0), axis=0, return_index=True)
+    return pts[np.sort(first)]
+
+
+def _edge_points(verts, offsets=None):
+    """Points along the edges of a convex piece given its corners.
+
+    Two corners span an edge when they share two faces: for a box (offsets
+    None) when they differ in one coordinate, for a 26-DOP when both lie on
+    two of its non-parallel planes.
+    """
+    if offsets is None:
+        on_plane = np.hstack([verts == verts.max(0), verts == verts.min(0)])
+    else:
+        scale = max(1.0, float(np.max(np.abs(offsets))))
+        on_plane = np.abs(verts @ DOP_NORMALS.T - offsets) <= 1e-6 * scale
+    shared = on_plane.astype(int) @ on_plane.T.astype(int)
+    i, j = np.nonzero(np.triu(shared >= 2, 1))
+    t = np.linspace(0.0, 1.0, EDGE_POINTS)[None, :, None]
+    pts = verts[i][:, None, :] + t * (verts[j] - verts[i])[:, None, :]
+    return np.vstack([verts, pts.reshape(-1, 3)])
+
+
+def dop_samples(offsets, tol=1e-9):
+    """Sample points of a 26-DOP piece: its corners and the centre of each face."""
+    verts = dop_vertices(offsets, tol)
+    scale = max(1.0, float(np.max(np.abs(offsets))))
+    on_plane = np.abs(verts @ DOP_NORMALS.T - offsets) <= 1e-6 * scale
+    faces = [verts[on_plane[:, f]].mean(0) for f in range(len(DOP_NORMALS))
+             if on_plane[:, f].sum() >= 3]
+    return np.vstack([verts] + [np.array(faces)] if faces else [verts])
+
+
+def slab_points(vertices, edges, axis, pieces):
+    """Split a mesh into slabs along one axis.
+
+    Args:
+        vertices: (V, 3) mesh vertices.
+        edges:    (E, 2) vertex index pairs.
+        axis:     0, 1 or 2.
+        pieces:   number of equal slabs.
+    Returns:
+        List of (n, 3) point sets, one per non-empty slab: the vertices in
+        the slab plus the points where edges cross its two cut planes, so
+        the hull of each set covers that part of the surface.
+    """
+    vertices = np.asarray(vertices, dtype=float)
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    x = vertices[:, axis]
+    cuts = np.linspace(x.min(), x.max(), pieces + 1)
+    a, b = vertices[edges[:, 0]], vertices[edges[:, 1]]
+    xa, xb = a[:, axis], b[:, axis]
+    sets = []
+    for k in range(pieces):
+        lo, hi = cuts[k], cuts[k + 1]
+        pts = [vertices[(x >= lo) & (x <= hi)]]
+        for c in (lo, hi):
+            cross = (np.minimum(xa, xb) < c) & (np.maximum(xa, xb) > c)
+            t = (c - xa[cross]) / (xb[cross] - xa[cross])
+            pts.append(a[cross] + t[:, None] * (b[cross] - a[cross]))
+        pts = np.vstack(pts)
+        if len(pts):
+            sets.append(pts)
+    return sets
+
+
+def hull_shape(vertices, edges=(), pieces=1, origin=(0.0, 0.0, 0.0)):
+    """Compound 26-DOP BodyShape of a mesh.
+
+    Args:
+        vertices: (V, 3) mesh vertices (world or definition coordinates).
+        edges:    (E, 2) vertex index pairs, used to cut slabs when pieces > 1.
+        pieces:   slabs along the longest bounding-box axis (1 = one hull).
+        origin:   centre of mass; becomes the shape's local origin.
+    """
+    vertices = np.asarray(vertices, dtype=float) - np.asarray(origin, dtype=float)
+    pieces = max(1, min(int(pieces), MAX_PIECES))
+    if pieces > 1 and len(edges):
+        axis = int(np.argmax(vertices.max(0) - vertices.min(0)))
+        sets = slab_points(vertices, edges, axis, pieces)
+    else:
+        sets = [vertices]
+    offsets = np.array([dop_offsets(pts) for pts in sets])
+    samples = np.vstack([dop_samples(o) for o in offsets])
+    half = np.abs(samples).max(0)
+    return BodyShape(half, samples, False, offsets)
+
+
+def dop_hits(points_xy, centers, rots, offsets):
+    """Intersect vertical lines with 26-DOP pieces, one line per piece.
+
+    Args:
+        points_xy: (M, 2) line positions.
+        centers, rots: (M, 3), (M, 3, 3) poses of the pieces' bodies.
+        offsets: (M, 26) piece plane offsets (local frame).
+    Returns:
+        (bottom, top): (M,) world Z where each line enters and leaves its
+        piece, NaN where it misses.
+    """
+    p = np.zeros((len(points_xy), 3))
+    p[:, :2] = points_xy
+    # Line p + t * Z in the body frame: origin o, direction d (row 2 of R)
+    o = np.einsum('mji,mj->mi', rots, p - centers)
+    room = offsets - o @ DOP_NORMALS.T
+    nd = rots[:, 2, :] @ DOP_NORMALS.T
+    down = nd < -1e-12
+    up = nd > 1e-12
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = room / np.where(down | up, nd, 1.0)
+    t_in = np.where(down, t, -np.inf).max(1)
+    t_out = np.where(up, t, np.inf).min(1)
+    # Planes parallel to the line: outside one means a miss
+    hit = (t_in <= t_out) & ~np.any(~(down | up) & (room < 0), axis=1)
+    return np.where(hit, t_in, np.nan), np.where(hit, t_out, np.nan)
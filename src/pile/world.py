@@ -0,0 +1,786 @@
+# -*- coding: utf-8 -*-
+"""
+world.py - OBB pile state, vertical drop and settling for the pile commands.
+
+Bodies are stored as flat arrays (centres, rotations, broadphase
+half-extents, world AABB half-sizes) plus a shape id each, with an XY
+spatial hash as broadphase. The hash returns the whole column under a
+footprint, so its bodies are then culled by height: they are visited from
+the highest top down, in batches, and the visit stops at the first body
+whose top lies more than the falling body's depth below the rest height
+found so far. Shapes (pile.hulls.BodyShape) are boxes or compound 26-DOP
+hulls of user geometry. Contact is found with vertical rays against the
+shapes (the same idea as the old mesh ray casts, done analytically and in
+batches, one batch per shape):
+    - sample points of the falling body cast down onto the bodies below,
+    - sample points of those bodies cast up into the falling body,
+and the highest requirement is where the body comes to rest. Rays only
+see the sample points, so every pose is also checked for overlap with its
+neighbours (a separating-axis test between boxes, edge points against the
+pieces of hulls); a drop that overlaps is lifted clear and tip or slide
+steps that would overlap are rejected.
+
+Settling is geometric, not a physics solver: a resting body whose centre
+of mass lies outside the convex hull of its contact points tips over the
+nearest hull edge in small steps (or slides off it when tipping is
+blocked) and is dropped again, until it is stable or its iteration budget
+is spent. Balance alone lets bricks stack into spires, so a body also
+respects an angle of repose: where the pile surface around it (sampled
+with a ring of rays) falls away more steeply, it slides down the flank.
+Stable bodies sleep; only the bodies a new one lands on (and, if those
+move, the bodies resting on them) wake to be re-checked, and every body
+has a fixed lifetime budget of tip steps and each drop a fixed number of
+rest-height probes, so the cost stays close to linear in the number of
+bodies.
+"""
+import base64
+import json
+import math
+
+import numpy as np
+
+from pile.hulls import BodyShape, box_shape, dop_hits
+
+# Default settling controls
+SETTLE_ITERATIONS = 12
+TILT_STEP = math.radians(12.0)
+WAKE_LIMIT = 32
+BISECT_STEPS = 6
+# Rest-height probes one drop may spend on settling (its own and re-checks)
+PROBE_LIMIT = 64
+# Neighbours tested per batch, highest first
+NEIGHBOUR_BATCH = 16
+# Steepest pile surface a balanced body stays on (angle of repose): where
+# the surface around it falls away faster it slides downhill
+REPOSE_ANGLE = math.radians(35.0)
+# Rays on a ring around a body that sample the surface, and the ring
+# radius in multiples of the body's longest half-extent
+SLOPE_RAYS = 8
+SLOPE_REACH = 2.0
+# Slide distances tried down a steep flank, in multiples of that radius
+SLIDE_STEPS = (1.0, 0.5, 1.5, 2.0)
+# Overlap allowed between resting bodies, as a fraction of the smaller
+# half-extent of the body being placed
+OVERLAP_TOL = 1e-2
+
+# Serialized state layout version (bumped when PileWorld.to_json changes)
+STATE_VERSION = 1
+
+
+def rotation(axis, angle):
+    """3x3 rotation matrix about a unit axis (Rodrigues)."""
+    x, y, z = axis
+    c = math.cos(angle)
+    s = math.sin(angle)
+    t = 1.0 - c
+    return np.array([[t * x * x + c, t * x * y - s * z, t * x * z + s * y],
+                     [t * x * y + s * z, t * y * y + c, t * y * z - s * x],
+                     [t * x * z - s * y, t * y * z + s * x, t * z * z + c]])
+
+
+def yaw(angle):
+    """Rotation about world Z."""
+    return rotation((0.0, 0.0, 1.0), angle)
+
+
+def box_extent(rot, half):
+    """World AABB half-size of an oriented box."""
+    return np.abs(rot) @ half
+
+
+def vertical_hits(points_xy, centers, rots, halves):
+    """Intersect vertical lines with oriented boxes.
+
+    Args:
+        points_xy: (P, 2) line positions.
+        centers, rots, halves: (K, 3), (K, 3, 3), (K, 3) boxes.
+    Returns:
+        (bottom, top): (P, K) world Z where each line enters and leaves each
+        box, NaN where it misses.
+    """
+    p = np.zeros((len(points_xy), 3))
+    p[:, :2] = points_xy
+    # Line p + t * Z in each box frame: origin o, direction d (row 2 of R^T)
+    o = np.einsum('kji,pkj->pki', rots, p[:, None, :] - centers[None, :, :])
+    d = rots[:, 2, :][None, :, :]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t1 = (-halves[None] - o) / d
+        t2 = (halves[None] - o) / d
+    flat = np.abs(d) < 1e-12
+    inside = np.abs(o) <= halves[None]
+    lo = np.where(flat, np.where(inside, -np.inf, np.inf), np.minimum(t1, t2))
+    hi = np.where(flat, np.where(inside, np.inf, -np.inf), np.maximum(t1, t2))
+    t_in = lo.max(-1)
+    t_out = hi.min(-1)
+    hit = t_in <= t_out
+    return np.where(hit, t_in, np.nan), np.where(hit, t_out, np.nan)
+
+
+def box_penetration(center, rot, half, centers, rots, halves):
+    """Separating-axis test of one oriented box against K others.
+
+    Args:
+        center, rot, half: (3,), (3, 3), (3,) the box.
+        centers, rots, halves: (K, 3), (K, 3, 3), (K, 3) the others.
+    Returns:
+        (K,) overlap along the axis that separates best: how far each pair
+        would have to move apart to just touch (<= 0 when apart).
+    """
+    k = len(centers)
+    a = rot.T
+    b = np.transpose(rots, (0, 2, 1))
+    # Face axes of both boxes and the 9 edge-edge cross products
+    cross = np.cross(a[None, :, None, :], b[:, None, :, :]).reshape(k, 9, 3)
+    axes = np.concatenate([np.repeat(a[None], k, 0), b, cross], 1)
+    length = np.linalg.norm(axes, axis=2, keepdims=True)
+    # Parallel edges give no axis; reuse the first face axis instead
+    axes = np.where(length > 1e-9, axes / np.maximum(length, 1e-300), a[0])
+    ra = np.abs(axes @ rot) @ half
+    rb = (np.abs(np.einsum('kaj,kji->kai', axes, rots)) * halves[:, None, :]).sum(2)
+    dist = np.abs(np.einsum('kaj,kj->ka', axes, centers - center))
+    return (ra + rb - dist).min(1)
+
+
+def shape_hits(shape, points_xy, centers, rots):
+    """Intersect vertical lines with bodies that share one BodyShape.
+
+    Returns (bottom, top) as vertical_hits; for a compound shape the lowest
+    entry and highest exit over its pieces. Hulls are only tested where a
+    line falls inside the body's XY extent.
+    """
+    k = len(centers)
+    if shape.box:
+        return vertical_hits(points_xy, centers, rots, np.repeat(shape.half[None], k, 0))
+    points_xy = np.asarray(points_xy, dtype=float)
+    bottom = np.full((len(points_xy), k), np.nan)
+    top = np.full((len(points_xy), k), np.nan)
+    ext = (np.abs(rots) @ shape.half)[:, :2]
+    near = np.all(np.abs(points_xy[:, None, :] - centers[None, :, :2]) <= ext[None], axis=2)
+    pi, ki = np.nonzero(near)
+    if not len(pi):
+        return bottom, top
+    n = len(shape.offsets)
+    b, t = dop_hits(np.repeat(points_xy[pi], n, 0), np.repeat(centers[ki], n, 0),
+                    np.repeat(rots[ki], n, 0), np.tile(shape.offsets, (len(pi), 1)))
+    bottom[pi, ki] = np.fmin.reduce(b.reshape(-1, n), axis=1)
+    top[pi, ki] = np.fmax.reduce(t.reshape(-1, n), axis=1)
+    return bottom, top
+
+
+def convex_hull(points):
+    """Indices of the convex hull of (n, 2) points, counter-clockwise (monotone chain)."""
+    pts = np.round(np.asarray(points, dtype=float), 12)
+    order = sorted(range(len(pts)), key=lambda k: (pts[k, 0], pts[k, 1]))
+    uniq = []
+    for k in order:
+        if not uniq or not np.array_equal(pts[uniq[-1]], pts[k]):
+            uniq.append(k)
+    if len(uniq) <= 2:
+        return uniq
+
+    def cross(o, a, b):
+        return ((pts[a, 0] - pts[o, 0]) * (pts[b, 1] - pts[o, 1]) -
+                (pts[a, 1] - pts[o, 1]) * (pts[b, 0] - pts[o, 0]))
+
+    lower = []
+    for k in uniq:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], k) <= 0:
+            lower.pop()
+        lower.append(k)
+    upper = []
+    for k in reversed(uniq):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], k) <= 0:
+            upper.pop()
+        upper.append(k)
+    return lower[:-1] + upper[:-1]
+
+
+def support_pivot(com_xy, contacts, tol):
+    """Where a body resting on contacts tips, or None if it is stable.
+
+    Args:
+        com_xy:   (2,) centre of mass in plan.
+        contacts: (m, 3) contact points.
+    Returns:
+        The (3,) point on the contact hull boundary closest to the centre of
+        mass (height interpolated along the hull edge) when the centre lies
+        outside the hull, or further than tol from a point/segment hull.
+    """
+    hull = contacts[convex_hull(contacts[:, :2])]
+    if len(hull) >= 3:
+        edges = np.roll(hull, -1, 0)[:, :2] - hull[:, :2]
+        rel = com_xy[None, :] - hull[:, :2]
+        if np.all(edges[:, 0] * rel[:, 1] - edges[:, 1] * rel[:, 0] >= -tol * np.linalg.norm(edges, axis=1)):
+            return None
+        segs = zip(hull, np.roll(hull, -1, 0))
+    elif len(hull) == 2:
+        segs = [(hull[0], hull[1])]
+    else:
+        segs = [(hull[0], hull[0])]
+    best = None
+    for a, b in segs:
+        ab = b[:2] - a[:2]
+        denom = float(ab @ ab)
+        t = 0.0 if denom < 1e-24 else min(1.0, max(0.0, float((com_xy - a[:2]) @ ab) / denom))
+        q = a + t * (b - a)
+        d = float(np.linalg.norm(com_xy - q[:2]))
+        if best is None or d < best[0]:
+            best = (d, q)
+    if best[0] <= tol:
+        return None
+    return best[1]
+
+
+class SpatialHash(object):
+    """Uniform XY grid mapping cells to body ids."""
+
+    __slots__ = ("cell", "cells", "members")
+
+    def __init__(self, cell):
+        self.cell = max(float(cell), 1e-9)
+        self.cells = {}
+        self.members = {}
+
+    def _keys(self, lo, hi):
+        x0, y0 = (np.floor(np.asarray(lo[:2]) / self.cell)).astype(int).tolist()
+        x1, y1 = (np.floor(np.asarray(hi[:2]) / self.cell)).astype(int).tolist()
+        return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+    def insert(self, body, lo, hi):
+        keys = self._keys(lo, hi)
+        self.members[body] = keys
+        for k in keys:
+            self.cells.setdefault(k, []).append(body)
+
+    def remove(self, body):
+        for k in self.members.pop(body, ()):
+            bucket = self.cells.get(k)
+            if bucket:
+                bucket.remove(body)
+
+    def query(self, lo, hi):
+        found = set()
+        for k in self._keys(lo, hi):
+            found.update(self.cells.get(k, ()))
+        return np.array(sorted(found), dtype=np.int64)
+
+
+class PileWorld(object):
+    """Growing set of oriented bodies resting on a ground plane.
+
+    Besides the pose arrays every body keeps a settling budget (tip steps it
+    may still take) and the ids of the bodies it rests on, so when a body
+    moves only the bodies resting on it are woken.
+
+    Args:
+        ground_z: height of the ground plane.
+        cell:     spatial hash cell size (about one body length).
+    """
+
+    def __init__(self, ground_z, cell, capacity=256):
+        self.ground_z = float(ground_z)
+        self.count = 0
+        self.centers = np.zeros((capacity, 3))
+        self.rots = np.zeros((capacity, 3, 3))
+        self.halves = np.zeros((capacity, 3))
+        self.extents = np.zeros((capacity, 3))
+        self.asleep = np.zeros(capacity, dtype=bool)
+        self.budget = np.zeros(capacity, dtype=np.int64)
+        self.shape_ids = np.zeros(capacity, dtype=np.int64)
+        self.shapes = []
+        self._shape_index = {}
+        self.supports = {}
+        self.carried = {}
+        self.moved = set()
+        self.grid = SpatialHash(cell)
+        self.probes = 0
+
+    # -- storage ------------------------------------------------------------
+
+    def _grow(self):
+        cap = len(self.centers) * 2
+        for name in ("centers", "rots", "halves", "extents", "asleep", "budget", "shape_ids"):
+            old = getattr(self, name)
+            new = np.zeros((cap,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def _index(self, i):
+        ext = self.extents[i] = box_extent(self.rots[i], self.halves[i])
+        self.grid.insert(i, self.centers[i] - ext, self.centers[i] + ext)
+
+    def _store(self, i, center, rot):
+        self.grid.remove(i)
+        self.centers[i] = center
+        self.rots[i] = rot
+        self._index(i)
+        self.moved.add(i)
+
+    def _set_supports(self, i, ids):
+        for s in self.supports.get(i, ()):
+            self.carried.get(s, set()).discard(i)
+        self.supports[i] = set(ids)
+        for s in self.supports[i]:
+            self.carried.setdefault(s, set()).add(i)
+
+    def shape(self, shape):
+        """(id, BodyShape) for a BodyShape or box half-extents, adding it to
+        the shape table on first use. Boxes of equal size share one entry."""
+        if isinstance(shape, BodyShape):
+            key = id(shape)
+        else:
+            shape = np.asarray(shape, dtype=float)
+            key = ("box",) + tuple(shape.tolist())
+        sid = self._shape_index.get(key)
+        if sid is None:
+            if not isinstance(shape, BodyShape):
+                shape = box_shape(shape)
+            sid = self._shape_index[key] = len(self.shapes)
+            self.shapes.append(shape)
+        return sid, self.shapes[sid]
+
+    def body_shape(self, i):
+        """BodyShape of body i."""
+        return self.shapes[self.shape_ids[i]]
+
+    def pose(self, i):
+        """(center, rotation) of body i."""
+        return self.centers[i].copy(), self.rots[i].copy()
+
+    # -- contact ------------------------------------------------------------
+
+    def rest_height(self, xy, rot, shape, exclude=-1, below=np.inf, contact_tol=None):
+        """Lowest centre height of a body of the given BodyShape at xy with
+        rotation rot that clears the ground and the bodies under it.
+
+        Only bodies whose lowest point is under `below` are considered as
+        supports, so re-checking a resting body ignores the ones on top of it.
+
+        Returns:
+            (z, contacts, contact_ids): centre height, (m, 3) points within
+            contact_tol of touching at that height, and the ids of the
+            bodies touched there (-1 for the ground).
+        """
+        xy = np.asarray(xy, dtype=float)
+        half = shape.half
+        offsets = shape.samples @ rot.T
+        tol = contact_tol if contact_tol is not None else 1e-6 * max(1.0, float(np.max(half)))
+
+        need = [self.ground_z - offsets[:, 2]]
+        where = [np.column_stack([xy + offsets[:, :2], np.full(len(offsets), self.ground_z)])]
+        owner = [np.full(len(offsets), -1)]
+
+        ext = box_extent(rot, half)
+        lo = np.array([xy[0] - ext[0], xy[1] - ext[1], 0.0])
+        hi = np.array([xy[0] + ext[0], xy[1] + ext[1], 0.0])
+        nbrs = self.grid.query(lo, hi)
+        if len(nbrs):
+            nbrs = nbrs[nbrs != exclude]
+        if len(nbrs):
+            nbrs = nbrs[(self.centers[nbrs, 2] - self.extents[nbrs, 2]) < below]
+        # Highest tops first: once a top is more than the body's depth below
+        # the rest height found so far, neither it nor anything after it can
+        # hold the body up
+        tops = self.centers[nbrs, 2] + self.extents[nbrs, 2]
+        order = np.argsort(-tops, kind="stable")
+        nbrs, tops = nbrs[order], tops[order]
+        z = float(need[0].max())
+        for start in range(0, len(nbrs), NEIGHBOUR_BATCH):
+            batch = nbrs[start:start + NEIGHBOUR_BATCH]
+            reach = tops[start:start + NEIGHBOUR_BATCH] + ext[2] >= z - tol
+            batch = batch[reach]
+            # One batch per neighbour shape (all bricks of a size share one)
+            sids = self.shape_ids[batch]
+            for sid in np.unique(sids).tolist():
+                group = batch[sids == sid]
+                other = self.shapes[sid]
+                c = self.centers[group]
+                r = self.rots[group]
+                # Falling body's samples cast down onto the neighbours' tops
+                _, top = shape_hits(other, xy + offsets[:, :2], c, r)
+                top = np.where(np.isnan(top), -np.inf, top)
+                k = top.argmax(1)
+                top = top[np.arange(len(k)), k]
+                need.append(top - offsets[:, 2])
+                where.append(np.column_stack([xy + offsets[:, :2], top]))
+                owner.append(group[k])
+                # Neighbours' samples cast up into the falling body (at z = 0)
+                q = (c[:, None, :] + np.einsum('kij,sj->ksi', r, other.samples)).reshape(-1, 3)
+                bottom, _ = shape_hits(shape, q[:, :2], np.array([[xy[0], xy[1], 0.0]]), rot[None])
+                need.append(np.where(np.isnan(bottom[:, 0]), -np.inf, q[:, 2] - bottom[:, 0]))
+                where.append(q)
+                owner.append(np.repeat(group, len(other.samples)))
+                z = max(z, float(need[-2].max()), float(need[-1].max()))
+            if not reach.all():
+                break
+
+        need = np.concatenate(need)
+        z = float(need.max())
+        touching = need >= z - tol
+        return z, np.concatenate(where)[touching], np.unique(np.concatenate(owner)[touching])
+
+    def penetration(self, center, rot, shape, exclude=-1):
+        """Deepest overlap of a body posed at center / rot with the bodies
+        around it (<= 0 when it is clear of them all).
+
+        Box pairs use box_penetration. A pair involving a hull compares the
+        edge points of each shape against the pieces of the other.
+        """
+        center = np.asarray(center, dtype=float)
+        ext = box_extent(rot, shape.half)
+        nbrs = self.grid.query(center - ext, center + ext)
+        if len(nbrs):
+            nbrs = nbrs[nbrs != exclude]
+        if len(nbrs):
+            near = np.all(np.abs(self.centers[nbrs] - center) <= self.extents[nbrs] + ext, axis=1)
+            nbrs = nbrs[near]
+        depth = -np.inf
+        sids = self.shape_ids[nbrs]
+        for sid in np.unique(sids).tolist():
+            group = nbrs[sids == sid]
+            other = self.shapes[sid]
+            c = self.centers[group]
+            r = self.rots[group]
+            if shape.box and other.box:
+                d = box_penetration(center, rot, shape.half, c, r, np.repeat(other.half[None], len(group), 0))
+            else:
+                # This body's edge points in each neighbour's frame, and theirs in ours
+                mine = shape.edge_points() @ rot.T + center
+                local = np.einsum('kji,ksj->ksi', r, mine[None] - c[:, None])
+                d = other.depth(local.reshape(-1, 3)).reshape(len(group), -1).max(1)
+                theirs = c[:, None] + np.einsum('kij,sj->ksi', r, other.edge_points())
+                local = (theirs - center) @ rot
+                d = np.maximum(d, shape.depth(local.reshape(-1, 3)).reshape(len(group), -1).max(1))
+            depth = max(depth, float(d.max()))
+        return depth
+
+    def downhill(self, xy, support_z, reach, exclude=-1, below=np.inf, repose=REPOSE_ANGLE):
+        """Plan direction a body resting at support_z slides in, or None.
+
+        The pile surface is sampled with SLOPE_RAYS vertical rays on a ring
+        of radius reach around xy (the ground where they miss). A body whose
+        support lies more than reach * tan(repose) above the lowest of them
+        is on a flank steeper than the angle of repose, or on top of a
+        spire, and slides towards it. Bodies not below `below` are ignored,
+        as in rest_height.
+        """
+        xy = np.asarray(xy, dtype=float)
+        angles = np.arange(SLOPE_RAYS) * (2.0 * math.pi / SLOPE_RAYS)
+        dirs = np.column_stack([np.cos(angles), np.sin(angles)])
+        ring = xy + reach * dirs
+        heights = np.full(SLOPE_RAYS, self.ground_z)
+        lo = np.array([xy[0] - reach, xy[1] - reach, 0.0])
+        hi = np.array([xy[0] + reach, xy[1] + reach, 0.0])
+        nbrs = self.grid.query(lo, hi)
+        if len(nbrs):
+            nbrs = nbrs[nbrs != exclude]
+        if len(nbrs):
+            nbrs = nbrs[(self.centers[nbrs, 2] - self.extents[nbrs, 2]) < below]
+        sids = self.shape_ids[nbrs]
+        for sid in np.unique(sids).tolist():
+            group = nbrs[sids == sid]
+            _, top = shape_hits(self.shapes[sid], ring, self.centers[group], self.rots[group])
+            heights = np.fmax(heights, np.nanmax(np.where(np.isnan(top), -np.inf, top), axis=1))
+        k = int(heights.argmin())
+        if support_z - heights[k] <= reach * math.tan(repose):
+            return None
+        return dirs[k]
+
+    def _probe(self, xy, rot, shape, exclude, below, ctol, limit):
+        """Rest pose of a body at xy / rot if it comes to rest no higher
+        than limit without overlapping anything, else None.
+
+        Returns (center, contacts, contact ids).
+        """
+        self.probes += 1
+        z, contacts, ids = self.rest_height(xy, rot, shape, exclude, below, ctol)
+        if z > limit:
+            return None
+        center = np.array([xy[0], xy[1], z])
+        if self.penetration(center, rot, shape, exclude) > ctol:
+            return None
+        return center, contacts, ids
+
+    def _place(self, xy, rot, shape, exclude, below, ctol):
+        """Rest pose of a body at xy / rot, lifted clear of any overlap.
+
+        The rays can miss an edge that cuts into a neighbour between sample
+        points; the body is then bisected up towards a height where it is
+        clear (above every top in its column, or `below` for a re-check,
+        which is where it rests already). Returns (center, contacts, ids).
+        """
+        self.probes += 1
+        z, contacts, ids = self.rest_height(xy, rot, shape, exclude, below, ctol)
+        center = np.array([xy[0], xy[1], z])
+        if self.penetration(center, rot, shape, exclude) <= ctol:
+            return center, contacts, ids
+        ext = box_extent(rot, shape.half)
+        nbrs = self.grid.query(center - ext, center + ext)
+        nbrs = nbrs[nbrs != exclude]
+        high = z + 2.0 * ext[2]
+        if len(nbrs):
+            high = max(high, float((self.centers[nbrs, 2] + self.extents[nbrs, 2]).max()) + ext[2])
+        high = min(high, below)
+        low = z
+        for _ in range(BISECT_STEPS):
+            mid = 0.5 * (low + high)
+            center[2] = mid
+            if self.penetration(center, rot, shape, exclude) > ctol:
+                low = mid
+            else:
+                high = mid
+        center[2] = high
+        return center, contacts, ids
+
+    # -- bodies -------------------------------------------------------------
+
+    def drop(self, xy, rot, shape, iterations=SETTLE_ITERATIONS, tilt_step=TILT_STEP):
+        """Drop a new body at xy, settle it and add it. Returns its index.
+
+        shape is a BodyShape or the half-extents of a box.
+
+        The body gets `iterations` tip steps in total; whatever it does not
+        use now is kept for later re-checks. Afterwards the bodies it landed
+        on are woken, if they still have budget. Settling the new body and
+        re-checking the woken ones share PROBE_LIMIT rest-height probes.
+        """
+        sid, shape = self.shape(shape)
+        self.probes = 0
+        center, rot, stable, used, support = self._settle(
+            np.asarray(xy, dtype=float), rot, shape, -1, np.inf, iterations, tilt_step)
+        if self.count == len(self.centers):
+            self._grow()
+        i = self.count
+        self.count += 1
+        self.centers[i] = center
+        self.rots[i] = rot
+        self.halves[i] = shape.half
+        self.shape_ids[i] = sid
+        self.budget[i] = iterations - used
+        self.asleep[i] = stable or self.budget[i] <= 0
+        self._set_supports(i, support[support >= 0].tolist())
+        self._index(i)
+        self.settle_awake(self.wake(sorted(self.supports[i])), tilt_step)
+        return i
+
+    def _settle(self, xy, rot, shape, exclude, below, iterations, tilt_step):
+        """Drop and tip a body until it is stable or the budget is spent.
+
+        Each tip rotates the body about the contact-hull point nearest its
+        centre of mass. If the full step would push it into something, the
+        angle is bisected to where it just touches, so the new contact joins
+        the support set instead of the body jumping over it. When the tip is
+        cut short, sliding off the pivot is tried as well and the move that
+        brings the body lowest wins, so a body rolling over an edge does not
+        creep round it in ever smaller steps. Settling stops early once the
+        drop's probes are spent. A body that is balanced, or wedged where
+        it can neither tip nor slide off its pivot, still slides down a
+        flank steeper than REPOSE_ANGLE (by SLIDE_STEPS multiples of the
+        slope test's reach, the first that brings it lower).
+
+        Returns (center, rotation, stable, steps used, support ids).
+        """
+        half = shape.half
+        tol = 1e-3 * float(np.max(half))
+        ctol = OVERLAP_TOL * float(np.min(half))
+        reach = SLOPE_REACH * float(np.max(half))
+
+        def downhill(center, contacts):
+            return self.downhill(center[:2], float(contacts[:, 2].mean()), reach, exclude, below)
+
+        def slide_down(center, rot, slide):
+            # Slide down the flank, if that brings the body lower
+            for f in SLIDE_STEPS:
+                res = self._probe(center[:2] + slide * (f * reach), rot, shape, exclude, below, ctol,
+                                  center[2] - tol)
+                if res is not None:
+                    return res
+            return None
+
+        center, contacts, ids = self._place(xy, rot, shape, exclude, below, ctol)
+        for used in range(iterations):
+            pivot = support_pivot(center[:2], contacts, tol)
+            slide = downhill(center, contacts) if pivot is None else None
+            if pivot is None and slide is None:
+                return center, rot, True, used, ids
+            if self.probes >= PROBE_LIMIT:
+                return center, rot, False, used, ids
+            if pivot is None:
+                # Balanced, but on a flank steeper than the angle of repose
+                res = slide_down(center, rot, slide)
+                if res is None:
+                    return center, rot, True, used + 1, ids
+                center, contacts, ids = res
+                continue
+            # Tip about a horizontal axis perpendicular to pivot -> centre
+            u = center[:2] - pivot[:2]
+            u /= np.linalg.norm(u)
+            axis = (-u[1], u[0], 0.0)
+
+            best = None
+            lo, hi = 0.0, tilt_step
+            angle = tilt_step
+            for _ in range(BISECT_STEPS):
+                step = rotation(axis, angle)
+                moved = pivot + step @ (center - pivot)
+                r = step @ rot
+                res = self._probe(moved[:2], r, shape, exclude, below, ctol, moved[2] + tol)
+                if res is not None:
+                    best = (r,) + res
+                    lo = angle
+                    if angle == tilt_step:
+                        break
+                else:
+                    hi = angle
+                angle = (lo + hi) / 2.0
+            if lo < tilt_step:
+                # Blocked or cut short: slide off the pivot instead, if that
+                # brings the body lower
+                slid = center[:2] + u * float(np.min(half))
+                res = self._probe(slid, rot, shape, exclude, below, ctol, center[2] - tol)
+                if res is not None and (best is None or res[0][2] < best[1][2]):
+                    best = (rot,) + res
+            if best is None:
+                # Wedged against a neighbour: it only moves if it is on a
+                # flank steeper than the angle of repose
+                slide = downhill(center, contacts)
+                res = slide_down(center, rot, slide) if slide is not None else None
+                if res is None:
+                    return center, rot, True, used + 1, ids
+                best = (rot,) + res
+            rot, center, contacts, ids = best
+        stable = support_pivot(center[:2], contacts, tol) is None and downhill(center, contacts) is None
+        return center, rot, stable, iterations, ids
+
+    def take_moved(self):
+        """Sorted ids of existing bodies moved by re-checks since the last
+        call, e.g. to refresh geometry that was already baked."""
+        ids = sorted(self.moved)
+        self.moved.clear()
+        return ids
+
+    def wake(self, ids):
+        """Wake the given bodies that still have settling budget. Returns them."""
+        ids = [i for i in ids if self.budget[i] > 0]
+        self.asleep[ids] = False
+        return ids
+
+    def settle_awake(self, candidates=None, tilt_step=TILT_STEP, limit=WAKE_LIMIT):
+        """Re-check awake bodies, starting from candidates (default: all awake).
+
+        A body only moves if its new rest pose is not higher than where it is
+        now, so it never gets pushed up into the bodies resting on it. When a
+        body moves, the bodies resting on it are woken in turn, up to limit
+        re-checks per call (and while the current drop has probes left).
+        Returns the number of bodies that moved.
+        """
+        if candidates is None:
+            candidates = np.nonzero(~self.asleep[:self.count])[0].tolist()
+        queue = [i for i in candidates if not self.asleep[i]]
+        moved = 0
+        checks = 0
+        while queue and checks < limit and self.probes < PROBE_LIMIT:
+            i = queue.pop(0)
+            if self.asleep[i]:
+                continue
+            checks += 1
+            center, rot = self.pose(i)
+            new_c, new_r, stable, used, support = self._settle(
+                center[:2], rot, self.body_shape(i), i, center[2], int(self.budget[i]), tilt_step)
+            self.budget[i] -= used
+            if new_c[2] > center[2] + 1e-6 * max(1.0, float(np.max(self.halves[i]))):
+                # Held in place by something this check does not see; leave it
+                self.asleep[i] = True
+                continue
+            self.asleep[i] = stable or self.budget[i] <= 0
+            if not np.allclose(new_c, center):
+                self._store(i, new_c, new_r)
+                self._set_supports(i, support[support >= 0].tolist())
+                moved += 1
+                queue.extend(self.wake(sorted(self.carried.get(i, ()))))
+        return moved
+
+    def freeze(self):
+        """Put every current body to sleep for good (budget 0), e.g. once
+        they are baked, so later drops can rest on them but not move them."""
+        self.budget[:self.count] = 0
+        self.asleep[:self.count] = True
+
+    def transform(self, i):
+        """Row-major 4x4 placement matrix of body i (rotation + translation)."""
+        m = np.eye(4)
+        m[:3, :3] = self.rots[i]
+        m[:3, 3] = self.centers[i]
+        return m
+
+    # -- persistence ----------------------------------------------------------
+
+    def to_json(self):
+        """Serialize the pile to a JSON string.
+
+        Pose arrays are stored as base64 float64/int64 buffers so a reload
+        is bit-exact; the spatial hash is not stored, only its cell size,
+        and is rebuilt from the poses on load. The shape table is stored
+        once, bodies only keep their shape id.
+        """
+        n = self.count
+
+        def pack(a):
+            return base64.b64encode(np.ascontiguousarray(a[:n]).tobytes()).decode("ascii")
+
+        return json.dumps({
+            "version": STATE_VERSION,
+            "ground_z": self.ground_z,
+            "cell": self.grid.cell,
+            "count": n,
+            "centers": pack(self.centers.astype(np.float64)),
+            "rots": pack(self.rots.astype(np.float64)),
+            "halves": pack(self.halves.astype(np.float64)),
+            "asleep": pack(self.asleep.astype(np.uint8)),
+            "budget": pack(self.budget.astype(np.int64)),
+            "shape_ids": pack(self.shape_ids.astype(np.int64)),
+            "shapes": [shape.to_dict() for shape in self.shapes],
+            "supports": [sorted(self.supports.get(i, ())) for i in range(n)],
+        }, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, text):
+        """Rebuild a PileWorld saved with to_json. Raises ValueError if the
+        text is not a pile state this version can read."""
+        try:
+            data = json.loads(text)
+            version = data.get("version")
+            if version != STATE_VERSION:
+                raise ValueError("unsupported pile state version {!r}".format(version))
+            n = int(data["count"])
+
+            def unpack(key, dtype, shape):
+                raw = base64.b64decode(data[key])
+                return np.frombuffer(raw, dtype=dtype).reshape((n,) + shape)
+
+            centers = unpack("centers", np.float64, (3,))
+            rots = unpack("rots", np.float64, (3, 3))
+            halves = unpack("halves", np.float64, (3,))
+            asleep = unpack("asleep", np.uint8, ()).astype(bool)
+            budget = unpack("budget", np.int64, ())
+            supports = data["supports"]
+            world = cls(data["ground_z"], data["cell"], capacity=max(n, 256))
+            shape_ids = unpack("shape_ids", np.int64, ())
+            for k, shape in enumerate(data["shapes"]):
+                shape = BodyShape.from_dict(shape)
+                world._shape_index[("box",) + tuple(shape.half.tolist()) if shape.box
+                                   else id(shape)] = k
+                world.shapes.append(shape)
+        except (KeyError, TypeError) as e:
+            raise ValueError("malformed pile state: {}".format(e))
+        world.count = n
+        world.centers[:n] = centers
+        world.rots[:n] = rots
+        world.halves[:n] = halves
+        world.asleep[:n] = asleep
+        world.budget[:n] = budget
+        world.shape_ids[:n] = shape_ids
+        for i in range(n):
+            world._set_supports(i, supports[i])
+            world._index(i)
+        return world
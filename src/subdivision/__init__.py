@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""
+subdivision - UV subdivision engine for the SurfaceSubdivider command.
+
+The algorithms work on flat NumPy arrays (panels as (N, 4) UV rectangles,
+cuts as (M, 2, 2) UV segments) and have no Rhino dependency, so they can
+be run and benchmarked outside Rhino. subdivision.outline builds the shared
+edge network used to stitch panel outlines; subdivision.bake, the Rhino
+backend, is not imported here.
+"""
+from subdivision.engine import (mondrian_subdivide, attractor_grid_subdivide,
+                                staggered_strips_subdivide, quadtree_subdivide,
+                                fracture_subdivide, density_spacing)
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+bake.py - Rhino backend for subdivision results.
+
+Turns the UV arrays produced by subdivision.engine into document geometry:
+outline polylines, cut polylines and extruded panel solids.
+Surface evaluation is batched: all UV samples of a stage are gathered into
+one array and evaluated in a single sweep before any object is created.
+"""
+import numpy as np
+import Rhino.Geometry as rg
+import scriptcontext as sc
+import System
+
+from meshing.bake import mesh_from_arrays
+from subdivision.outline import (PROBE_T, edge_network, segment_counts, interior_params,
+                                 outline_indices)
+from subdivision.solids import panel_corners_uv, panel_centres_uv, box_mesh
+
+
+def evaluate(surface, uv):
+    """Evaluate an (S, 2) UV array on surface into an (S, 3) point array."""
+    uv = np.asarray(uv, dtype=float).reshape(-1, 2)
+    out = np.empty((len(uv), 3))
+    point_at = surface.PointAt
+    for k, (u, v) in enumerate(uv.tolist()):
+        p = point_at(u, v)
+        out[k] = (p.X, p.Y, p.Z)
+    return out
+
+
+def evaluate_normals(surface, uv):
+    """Evaluate an (S, 2) UV array on surface into an (S, 3) unit normal array."""
+    uv = np.asarray(uv, dtype=float).reshape(-1, 2)
+    out = np.empty((len(uv), 3))
+    normal_at = surface.NormalAt
+    for k, (u, v) in enumerate(uv.tolist()):
+        n = normal_at(u, v)
+        out[k] = (n.X, n.Y, n.Z)
+    length = np.linalg.norm(out, axis=1, keepdims=True)
+    return out / np.where(length > 1e-12, length, 1.0)
+
+
+def sample_edges(surface, uv_a, uv_b, pts_a, pts_b, tol, max_segments=64):
+    """Adaptively sample the interior of UV segments.
+
+    Args:
+        uv_a, uv_b:   (E, 2) segment end parameters.
+        pts_a, pts_b: (E, 3) already evaluated end points.
+    Returns:
+        (counts, offsets, samples): segments per edge, per-edge start into
+        samples, and the (S, 3) interior sample points.
+    """
+    d = uv_b - uv_a
+    probes = evaluate(surface, uv_a[:, None, :] + PROBE_T[None, :, None] * d[:, None, :])
+    counts = segment_counts(pts_a, probes.reshape(-1, len(PROBE_T), 3), pts_b, tol, max_segments)
+    edge_ids, t, offsets = interior_params(counts)
+    samples = evaluate(surface, uv_a[edge_ids] + t[:, None] * d[edge_ids])
+    return counts, offsets, samples
+
+
+def panel_polylines(surface, panels, tol, max_segments=64):
+    """Closed outlines of an (N, 4) panel array as lists of Point3d.
+
+    Edges shared by neighbouring panels are sampled once and stitched into
+    each outline by index, so adjacent outlines match exactly.
+    """
+    net = edge_network(panels)
+    if not len(net.edges):
+        return []
+    node_pts = evaluate(surface, net.nodes)
+    a, b = net.edges[:, 0], net.edges[:, 1]
+    counts, offsets, samples = sample_edges(surface, net.nodes[a], net.nodes[b],
+                                            node_pts[a], node_pts[b], tol, max_segments)
+    table = np.vstack([node_pts, samples]).tolist()
+    return [[rg.Point3d(*table[i]) for i in idx.tolist()]
+            for idx in outline_indices(net, counts, offsets) if len(idx)]
+
+
+def cut_polylines(surface, cuts, tol, max_segments=64):
+    """Open polylines for an (M, 2, 2) cut array as lists of Point3d."""
+    cuts = np.asarray(cuts, dtype=float).reshape(-1, 2, 2)
+    if not len(cuts):
+        return []
+    ends = evaluate(surface, cuts.reshape(-1, 2)).reshape(-1, 2, 3)
+    counts, offsets, samples = sample_edges(surface, cuts[:, 0], cuts[:, 1],
+                                            ends[:, 0], ends[:, 1], tol, max_segments)
+    out = []
+    for k in range(len(cuts)):
+        inner = samples[offsets[k]:offsets[k + 1]]
+        pts = np.vstack([ends[k, :1], inner, ends[k, 1:]]).tolist()
+        out.append([rg.Point3d(*p) for p in pts])
+    return out
+
+
+def _attributes(layer_path):
+    attr = sc.doc.CreateDefaultAttributes()
+    layer_index = sc.doc.Layers.FindByFullPath(layer_path, -1)
+    if layer_index >= 0:
+        attr.LayerIndex = layer_index
+    return attr
+
+
+def add_polylines(polylines, layer_path):
+    """Add point lists as polylines on layer_path. Returns the new object ids."""
+    attr = _attributes(layer_path)
+    created = []
+    for pts in polylines:
+        if len(pts) < 2:
+            continue
+        obj_id = sc.doc.Objects.AddPolyline(rg.Polyline(pts), attr)
+        if obj_id != System.Guid.Empty:
+            created.append(obj_id)
+    return created
+
+
+# ---------------------------------------------------------------------------
+# Panel solids
+# ---------------------------------------------------------------------------
+
+def panel_frames(surface, panels):
+    """Evaluate panel corners (N, 4, 3) and centre normals (N, 3) in one sweep."""
+    corners = evaluate(surface, panel_corners_uv(panels)).reshape(-1, 4, 3)
+    normals = evaluate_normals(surface, panel_centres_uv(panels))
+    return corners, normals
+
+
+def add_box_mesh(corners, normals, depths, offset, layer_path):
+    """Add all panel boxes as one mesh on layer_path. Returns the new object ids."""
+    keep = depths > 0
+    if not keep.any():
+        return []
+    vertices, faces = box_mesh(corners[keep], normals[keep], depths[keep], offset)
+    obj_id = sc.doc.Objects.AddMesh(mesh_from_arrays(vertices, faces), _attributes(layer_path))
+    return [obj_id] if obj_id != System.Guid.Empty else []
+
+
+def add_extrusions(corners, normals, depths, offset, layer_path):
+    """Add every panel as a capped Extrusion. Returns the new object ids.
+
+    The corners are projected onto the plane through their centroid normal
+    to the panel, so each profile is planar even on doubly curved surfaces.
+    """
+    attr = _attributes(layer_path)
+    created = []
+    for quad, n, h in zip(corners.tolist(), normals.tolist(), depths.tolist()):
+        if h <= 0:
+            continue
+        normal = rg.Vector3d(*n)
+        centre = rg.Point3d(sum(p[0] for p in quad) / 4.0, sum(p[1] for p in quad) / 4.0,
+                            sum(p[2] for p in quad) / 4.0) + normal * offset
+        plane = rg.Plane(centre, normal)
+        pts = [plane.ClosestPoint(rg.Point3d(*p)) for p in quad]
+        profile = rg.PolylineCurve(pts + [pts[0]])
+        rc, crv_plane = profile.TryGetPlane()
+        if not rc:
+            continue
+        # Extrusion.Create extrudes along the curve plane's normal, whose sign
+        # follows the profile orientation
+        height = h if crv_plane.ZAxis * normal > 0 else -h
+        ext = rg.Extrusion.Create(profile, height, True)
+        if ext:
+            obj_id = sc.doc.Objects.AddExtrusion(ext, attr)
+            if obj_id != System.Guid.Empty:
+                created.append(obj_id)
+    return created
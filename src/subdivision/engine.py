@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+"""
+engine.py - NumPy subdivision algorithms for SurfaceSubdivider.
+
+Every algorithm works in a surface's UV domain and returns a dict with
+    'cuts':   (M, 2, 2) array of cut segments [[u0, v0], [u1, v1]]
+    'panels': (N, 4) array of UV rectangles [u0, u1, v0, v1]
+Recursive splits run as an iterative, level-by-level frontier: each level
+is one batch of array operations over all cells still being split, so
+depth only costs one pass per level and never touches the recursion limit.
+
+Randomness comes from a numpy Generator (rng), defaulting to a fresh
+np.random.default_rng() so callers can seed runs reproducibly.
+"""
+import numpy as np
+
+# Samples used for the attractor density / CDF along each axis
+DENSITY_SAMPLES = 500
+
+
+def _rng(rng):
+    return rng if rng is not None else np.random.default_rng()
+
+
+def _result(cuts, panels):
+    cuts = np.concatenate(cuts) if cuts else np.empty((0, 2, 2))
+    panels = np.concatenate(panels) if panels else np.empty((0, 4))
+    return {'cuts': cuts.reshape(-1, 2, 2), 'panels': panels.reshape(-1, 4)}
+
+
+def _u_cuts(s, v0, v1):
+    """Cut segments at u = s running from v0 to v1 (all arrays)."""
+    return np.stack([np.stack([s, v0], -1), np.stack([s, v1], -1)], 1)
+
+
+def _v_cuts(s, u0, u1):
+    """Cut segments at v = s running from u0 to u1 (all arrays)."""
+    return np.stack([np.stack([u0, s], -1), np.stack([u1, s], -1)], 1)
+
+
+def mondrian_subdivide(u_dom, v_dom, max_depth, min_ratio, split_min, split_max, rng=None):
+    """Mondrian-style subdivision, split level by level.
+
+    A cell stops splitting when the depth limit is reached, when both sides
+    are below min_ratio of the domain, at random (probability 0.12 * depth
+    past depth 1), or when neither side can be split into two cells above
+    min_ratio. Splits run along a random allowed direction at a ratio drawn
+    from [split_min, split_max].
+    """
+    rng = _rng(rng)
+    u_total = u_dom[1] - u_dom[0]
+    v_total = v_dom[1] - v_dom[0]
+    frontier = np.array([[u_dom[0], u_dom[1], v_dom[0], v_dom[1]]], dtype=float)
+    cuts = []
+    panels = []
+
+    for depth in range(max_depth):
+        if not len(frontier):
+            break
+        u0, u1, v0, v1 = frontier.T
+        u_frac = (u1 - u0) / u_total if u_total > 0 else np.zeros(len(frontier))
+        v_frac = (v1 - v0) / v_total if v_total > 0 else np.zeros(len(frontier))
+        can_u = u_frac >= min_ratio * 2
+        can_v = v_frac >= min_ratio * 2
+
+        stop = (u_frac < min_ratio) & (v_frac < min_ratio)
+        if depth > 1:
+            stop |= rng.random(len(frontier)) < 0.12 * depth
+        stop |= ~can_u & ~can_v
+        panels.append(frontier[stop])
+
+        split = frontier[~stop]
+        can_u = can_u[~stop]
+        can_v = can_v[~stop]
+        n = len(split)
+        if not n:
+            frontier = split
+            break
+        along_u = np.where(can_u & can_v, rng.random(n) < 0.5, can_u)
+        r = rng.uniform(split_min, split_max, n)
+
+        su, sv = split[along_u], split[~along_u]
+        s = su[:, 0] + r[along_u] * (su[:, 1] - su[:, 0])
+        t = sv[:, 2] + r[~along_u] * (sv[:, 3] - sv[:, 2])
+        cuts.append(_u_cuts(s, su[:, 2], su[:, 3]))
+        cuts.append(_v_cuts(t, sv[:, 0], sv[:, 1]))
+
+        left, right = su.copy(), su.copy()
+        left[:, 1] = s
+        right[:, 0] = s
+        low, high = sv.copy(), sv.copy()
+        low[:, 3] = t
+        high[:, 2] = t
+        frontier = np.concatenate([left, right, low, high])
+
+    panels.append(frontier)
+    return _result(cuts, panels)
+
+
+def density_spacing(dom, count, attr_p, contrast, samples=DENSITY_SAMPLES):
+    """Return count + 1 grid positions over dom, denser around attr_p.
+
+    The density 1 + c * (1 / (d + 0.1) - 1) (clamped to [0.2, 50]) is
+    sampled along the axis, integrated with cumsum into a CDF and inverted
+    for all targets at once with searchsorted.
+    """
+    d_min, d_max = dom
+    d_range = d_max - d_min
+    if d_range < 1e-12:
+        return np.array([d_min, d_max], dtype=float)
+
+    t = np.linspace(d_min, d_max, samples)
+    dist = np.abs(t - attr_p) / d_range
+    density = np.clip(1.0 + contrast * (1.0 / (dist + 0.1) - 1.0), 0.2, 50.0)
+
+    cdf = np.empty(samples)
+    cdf[0] = 0.0
+    np.cumsum(density[1:] * d_range / (samples - 1), out=cdf[1:])
+    total = cdf[-1]
+    if total < 1e-12:
+        # Fallback to uniform
+        return np.linspace(d_min, d_max, count + 1)
+    cdf /= total
+
+    targets = np.arange(1, count) / float(count)
+    idx = np.searchsorted(cdf, targets, side='left')
+    return np.concatenate([[d_min], d_min + d_range * idx / (samples - 1.0), [d_max]])
+
+
+def attractor_grid_subdivide(u_dom, v_dom, attractor_uv, u_count, v_count, contrast):
+    """Non-uniform grid that densifies near an attractor point."""
+    u_vals = density_spacing(u_dom, u_count, attractor_uv[0], contrast)
+    v_vals = density_spacing(v_dom, v_count, attractor_uv[1], contrast)
+
+    inner_u = u_vals[1:-1]
+    inner_v = v_vals[1:-1]
+    cuts = [_u_cuts(inner_u, np.full_like(inner_u, v_dom[0]), np.full_like(inner_u, v_dom[1])),
+            _v_cuts(inner_v, np.full_like(inner_v, u_dom[0]), np.full_like(inner_v, u_dom[1]))]
+
+    # Cells in u-major order, matching the nested i / j loop of a grid
+    ui, vj = np.meshgrid(np.arange(len(u_vals) - 1), np.arange(len(v_vals) - 1), indexing='ij')
+    ui = ui.ravel()
+    vj = vj.ravel()
+    panels = np.stack([u_vals[ui], u_vals[ui + 1], v_vals[vj], v_vals[vj + 1]], -1)
+    return _result(cuts, [panels])
+
+
+def staggered_strips_subdivide(u_dom, v_dom, num_strips, min_cross, max_cross, stagger, use_v,
+                               rng=None):
+    """Variable-width strips with staggered cross-cuts (brick bond).
+
+    All cross-cut positions are drawn in one batch, tagged with their strip
+    index and sorted per strip with lexsort; panels are the gaps between
+    consecutive positions (plus the domain ends) within each strip.
+    """
+    rng = _rng(rng)
+    if use_v:
+        p_dom, s_dom = v_dom, u_dom
+    else:
+        p_dom, s_dom = u_dom, v_dom
+    p_range = p_dom[1] - p_dom[0]
+    s_range = s_dom[1] - s_dom[0]
+
+    weights = rng.uniform(0.6, 1.4, num_strips)
+    edges = np.empty(num_strips + 1)
+    edges[0] = p_dom[0]
+    edges[1:] = p_dom[0] + np.cumsum(weights) / weights.sum() * p_range
+    edges[-1] = p_dom[1]
+
+    n_cross = rng.integers(min_cross, max_cross + 1, num_strips)
+    strip = np.repeat(np.arange(num_strips), n_cross)
+    pos = rng.uniform(s_dom[0] + 0.04 * s_range, s_dom[1] - 0.04 * s_range, len(strip))
+
+    if stagger > 0:
+        # Shift every other strip by a fraction of its average spacing
+        shift = (strip % 2 == 1)
+        pos = pos + np.where(shift, stagger * s_range / (n_cross[strip] + 1), 0.0)
+        keep = ~shift | ((pos > s_dom[0] + 0.02 * s_range) & (pos < s_dom[1] - 0.02 * s_range))
+        pos, strip = pos[keep], strip[keep]
+
+    # Strip boundaries between strips run the full length
+    inner = edges[1:-1]
+    full_lo = np.full_like(inner, s_dom[0])
+    full_hi = np.full_like(inner, s_dom[1])
+    # Each strip runs from its domain start through its sorted cuts to the end
+    ends = np.arange(num_strips)
+    ids = np.concatenate([strip, ends, ends])
+    vals = np.concatenate([pos, np.full(num_strips, s_dom[0]), np.full(num_strips, s_dom[1])])
+    order = np.lexsort((vals, ids))
+    ids, vals = ids[order], vals[order]
+    same = ids[:-1] == ids[1:]
+    a, b, k = vals[:-1][same], vals[1:][same], ids[:-1][same]
+    p0, p1 = edges[k], edges[k + 1]
+
+    if use_v:
+        cuts = [_v_cuts(inner, full_lo, full_hi), _u_cuts(pos, edges[strip], edges[strip + 1])]
+        panels = np.stack([a, b, p0, p1], -1)
+    else:
+        cuts = [_u_cuts(inner, full_lo, full_hi), _v_cuts(pos, edges[strip], edges[strip + 1])]
+        panels = np.stack([p0, p1, a, b], -1)
+    return _result(cuts, [panels])
+
+
+def quadtree_subdivide(u_dom, v_dom, max_depth, probability, attractor_uv=None, rng=None):
+    """Quadtree with optional attractor-biased subdivision probability.
+
+    The root always splits; below it each cell splits with probability p,
+    raised near the attractor to min(1, p * 1.5 / (d + 0.3)) where d is the
+    normalized UV distance of the cell centre.
+    """
+    rng = _rng(rng)
+    u_range = max(u_dom[1] - u_dom[0], 1e-12)
+    v_range = max(v_dom[1] - v_dom[0], 1e-12)
+    frontier = np.array([[u_dom[0], u_dom[1], v_dom[0], v_dom[1]]], dtype=float)
+    cuts = []
+    panels = []
+
+    for depth in range(max_depth):
+        if not len(frontier):
+            break
+        u0, u1, v0, v1 = frontier.T
+        mu = (u0 + u1) / 2.0
+        mv = (v0 + v1) / 2.0
+        if depth > 0:
+            p = np.full(len(frontier), float(probability))
+            if attractor_uv:
+                dist = np.hypot((mu - attractor_uv[0]) / u_range, (mv - attractor_uv[1]) / v_range)
+                p = np.minimum(1.0, probability * (1.5 / (dist + 0.3)))
+            split = rng.random(len(frontier)) <= p
+            panels.append(frontier[~split])
+            frontier = frontier[split]
+            u0, u1, v0, v1 = frontier.T
+            mu, mv = mu[split], mv[split]
+
+        cuts.append(_u_cuts(mu, v0, v1))
+        cuts.append(_v_cuts(mv, u0, u1))
+        frontier = np.concatenate([
+            np.stack([u0, mu, v0, mv], -1),
+            np.stack([mu, u1, v0, mv], -1),
+            np.stack([u0, mu, mv, v1], -1),
+            np.stack([mu, u1, mv, v1], -1),
+        ])
+
+    panels.append(frontier)
+    return _result(cuts, panels)
+
+
+def fracture_subdivide(u_dom, v_dom, num_lines, angle_min, angle_max, rng=None):
+    """Random fracture lines across the UV domain (cracked glass).
+
+    All lines are intersected with the domain boundary in one batch; lines
+    that touch the domain in fewer than two points are dropped.
+    """
+    rng = _rng(rng)
+    u_range = u_dom[1] - u_dom[0]
+    v_range = v_dom[1] - v_dom[0]
+
+    rad = np.radians(rng.uniform(angle_min, angle_max, num_lines))
+    du = np.cos(rad)
+    dv = np.sin(rad)
+    ou = rng.uniform(u_dom[0], u_dom[1], num_lines)
+    ov = rng.uniform(v_dom[0], v_dom[1], num_lines)
+
+    # Line parameters where each line meets the four domain edges
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ok_u = np.abs(du) > 1e-10
+        ok_v = np.abs(dv) > 1e-10
+        t = np.stack([
+            np.where(ok_u, (u_dom[0] - ou) / du, np.nan),
+            np.where(ok_u, (u_dom[1] - ou) / du, np.nan),
+            np.where(ok_v, (v_dom[0] - ov) / dv, np.nan),
+            np.where(ok_v, (v_dom[1] - ov) / dv, np.nan),
+        ], -1)
+    eps = 1e-6 * max(u_range, v_range)
+    u_t = ou[:, None] + t * du[:, None]
+    v_t = ov[:, None] + t * dv[:, None]
+    valid = ((u_t >= u_dom[0] - eps) & (u_t <= u_dom[1] + eps) &
+             (v_t >= v_dom[0] - eps) & (v_t <= v_dom[1] + eps))
+
+    keep = valid.sum(1) >= 2
+    t_lo = np.where(valid, t, np.inf).min(1)[keep]
+    t_hi = np.where(valid, t, -np.inf).max(1)[keep]
+    ou, ov, du, dv = ou[keep], ov[keep], du[keep], dv[keep]
+
+    start = np.stack([np.clip(ou + t_lo * du, *u_dom), np.clip(ov + t_lo * dv, *v_dom)], -1)
+    end = np.stack([np.clip(ou + t_hi * du, *u_dom), np.clip(ov + t_hi * dv, *v_dom)], -1)
+    return _result([np.stack([start, end], 1)], [])
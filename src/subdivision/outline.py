@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+outline.py - Shared-edge outline network for subdivision panels.
+
+Panels of a subdivision touch along their sides, often with T-junctions
+(a large panel next to two small ones). edge_network splits every panel
+side at the corners lying on it, so neighbouring panels refer to the very
+same atomic edges. A backend can then sample each edge once and stitch
+closed outlines together by index.
+
+Sampling density is chosen per edge from its chord sag (see
+segment_counts), so flat regions get straight segments and curved regions
+get as many as needed to stay within tolerance.
+"""
+import numpy as np
+
+# Edge parameters probed to estimate how far an edge bends away from its chord
+PROBE_T = np.array([0.25, 0.5, 0.75])
+
+
+class EdgeNetwork(object):
+    """Atomic edges of a panel array and the loops that reference them.
+
+    Attributes:
+        nodes:        (K, 2) distinct UV corners.
+        edges:        (E, 2) node index pairs, each shared edge listed once.
+        loop_offsets: (N + 1,) start of each panel's loop in the flat arrays.
+        loop_nodes:   node index at the start of every loop step.
+        loop_edges:   edge index of every loop step.
+        loop_flip:    True where the step runs against the stored edge.
+    """
+
+    __slots__ = ("nodes", "edges", "loop_offsets", "loop_nodes", "loop_edges", "loop_flip")
+
+    def __init__(self, nodes, edges, loop_offsets, loop_nodes, loop_edges, loop_flip):
+        self.nodes = nodes
+        self.edges = edges
+        self.loop_offsets = loop_offsets
+        self.loop_nodes = loop_nodes
+        self.loop_edges = loop_edges
+        self.loop_flip = loop_flip
+
+
+def edge_network(panels):
+    """Build the shared edge network of an (N, 4) [u0, u1, v0, v1] panel array.
+
+    Corners are matched exactly, which holds for all engine algorithms since
+    children reuse their parent's split values. Loops run counter-clockwise
+    in UV: bottom, right, top, left.
+    """
+    panels = np.asarray(panels, dtype=float).reshape(-1, 4)
+    u0, u1, v0, v1 = panels.T
+    corners = np.stack([np.stack([u0, v0], -1), np.stack([u1, v0], -1),
+                        np.stack([u1, v1], -1), np.stack([u0, v1], -1)], 1)
+    nodes, inv = np.unique(corners.reshape(-1, 2), axis=0, return_inverse=True)
+    inv = inv.reshape(-1, 4)
+
+    # np.unique sorts by u then v, which walks the vertical lines in order;
+    # a (v, u) ordering walks the horizontal lines.
+    order_h = np.lexsort((nodes[:, 0], nodes[:, 1]))
+    rank_h = np.empty_like(order_h)
+    rank_h[order_h] = np.arange(len(order_h))
+
+    loops = []
+    for c0, c1, c2, c3 in inv.tolist():
+        if c0 == c1 or c1 == c2:
+            loops.append(np.empty(0, dtype=int))
+            continue
+        bottom = order_h[rank_h[c0]:rank_h[c1]]
+        right = np.arange(c1, c2)
+        top = order_h[rank_h[c3] + 1:rank_h[c2] + 1][::-1]
+        left = np.arange(c0 + 1, c3 + 1)[::-1]
+        loops.append(np.concatenate([bottom, right, top, left]))
+
+    lengths = np.array([len(loop) for loop in loops], dtype=int)
+    loop_offsets = np.concatenate([[0], np.cumsum(lengths)])
+    loop_nodes = np.concatenate(loops) if loops else np.empty(0, dtype=int)
+
+    # Step k of a loop runs to the next node of the same loop (wrapping)
+    nxt = np.arange(len(loop_nodes)) + 1
+    ends = loop_offsets[1:][lengths > 0] - 1
+    nxt[ends] = loop_offsets[:-1][lengths > 0]
+    loop_next = loop_nodes[nxt] if len(loop_nodes) else loop_nodes
+
+    pairs = np.sort(np.stack([loop_nodes, loop_next], -1), axis=1)
+    edges, loop_edges = np.unique(pairs, axis=0, return_inverse=True)
+    edges = edges.reshape(-1, 2)
+    loop_edges = loop_edges.ravel()
+    loop_flip = loop_nodes != edges[loop_edges, 0]
+    return EdgeNetwork(nodes, edges, loop_offsets, loop_nodes, loop_edges, loop_flip)
+
+
+def segment_counts(p0, probes, p1, tol, max_segments=64):
+    """Segments per edge so the polyline stays within tol of the surface.
+
+    Args:
+        p0, p1: (E, 3) edge end points.
+        probes: (E, 3, 3) surface points at PROBE_T along each edge.
+    Returns:
+        (E,) int array in [1, max_segments].
+
+    The sag of an edge against its chord shrinks with the square of the
+    number of segments, so n = ceil(sqrt(sag / tol)). Sag is estimated from
+    the middle probe and from both halves (scaled up by four), which also
+    catches S-shaped edges whose midpoint happens to lie on the chord.
+    """
+    p0 = np.asarray(p0, dtype=float)
+    p1 = np.asarray(p1, dtype=float)
+    q1, q2, q3 = probes[:, 0], probes[:, 1], probes[:, 2]
+    sag = np.linalg.norm(q2 - (p0 + p1) / 2.0, axis=1)
+    sag = np.maximum(sag, 4.0 * np.linalg.norm(q1 - (p0 + q2) / 2.0, axis=1))
+    sag = np.maximum(sag, 4.0 * np.linalg.norm(q3 - (q2 + p1) / 2.0, axis=1))
+    n = np.ceil(np.sqrt(sag / max(tol, 1e-12)))
+    return np.clip(n, 1, max_segments).astype(int)
+
+
+def interior_params(counts):
+    """Interior sample parameters of every edge.
+
+    Returns:
+        (edge_ids, t, offsets): sample k of edge e is at index
+        offsets[e] + k - 1 (k = 1 .. counts[e] - 1), with edge_ids / t
+        listing every sample's edge and parameter in that order.
+    """
+    inner = np.maximum(counts - 1, 0)
+    offsets = np.concatenate([[0], np.cumsum(inner)])
+    edge_ids = np.repeat(np.arange(len(counts)), inner)
+    k = np.arange(len(edge_ids)) - offsets[edge_ids] + 1
+    return edge_ids, k / counts[edge_ids].astype(float), offsets
+
+
+def outline_indices(net, counts, offsets):
+    """Stitch closed outlines by index.
+
+    Point indices below len(net.nodes) refer to nodes, the rest to interior
+    samples (shifted by the node count). Each outline repeats its first
+    index at the end.
+
+    Returns:
+        List of int arrays, one per panel (empty for degenerate panels).
+    """
+    node_count = len(net.nodes)
+    steps = counts[net.loop_edges]
+    start = np.concatenate([[0], np.cumsum(steps)])
+    within = np.arange(start[-1]) - np.repeat(start[:-1], steps)
+    e = np.repeat(net.loop_edges, steps)
+    flip = np.repeat(net.loop_flip, steps)
+    sample = np.where(flip, offsets[e] + counts[e] - 1 - within, offsets[e] + within - 1)
+    idx = np.where(within == 0, np.repeat(net.loop_nodes, steps), node_count + sample)
+
+    bounds = start[net.loop_offsets]
+    out = []
+    for a, b in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        out.append(np.append(idx[a:b], idx[a]) if b > a else idx[a:b])
+    return out
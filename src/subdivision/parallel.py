@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+parallel.py - Run the UV subdivision of many faces on a worker pool.
+
+The UV stage of every face is independent and Rhino-free, so faces can be
+subdivided concurrently while surface evaluation and baking stay on the
+main thread. Each face draws from its own random stream derived from a
+master seed and the face index, so the result of a face does not depend
+on which worker ran it or in which order faces finished.
+"""
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import os
+
+import numpy as np
+
+from subdivision.engine import (mondrian_subdivide, attractor_grid_subdivide,
+                                staggered_strips_subdivide, quadtree_subdivide,
+                                fracture_subdivide)
+
+# Method name -> (function, takes an rng)
+METHODS = {
+    'mondrian': (mondrian_subdivide, True),
+    'attractor_grid': (attractor_grid_subdivide, False),
+    'staggered_strips': (staggered_strips_subdivide, True),
+    'quadtree': (quadtree_subdivide, True),
+    'fracture': (fracture_subdivide, True),
+}
+
+
+def face_rng(seed, face_index, stream=0):
+    """Random generator for one face, fixed by (seed, face_index, stream).
+
+    Stream 0 drives the subdivision itself; later stages of the same face
+    (e.g. solid depths) use their own stream so they stay independent.
+    """
+    return np.random.default_rng([seed, face_index, stream])
+
+
+def run_face(job):
+    """Subdivide one face.
+
+    Args:
+        job: (face_index, method, u_dom, v_dom, args, seed), where args are
+             the method's arguments after the two domains.
+    Returns:
+        (face_index, result dict).
+    """
+    face_index, method, u_dom, v_dom, args, seed = job
+    fn, takes_rng = METHODS[method]
+    if takes_rng:
+        return face_index, fn(u_dom, v_dom, *args, rng=face_rng(seed, face_index))
+    return face_index, fn(u_dom, v_dom, *args)
+
+
+def subdivide_faces(jobs, seed, workers=None, processes=False):
+    """Subdivide many faces concurrently.
+
+    Args:
+        jobs:      list of (face_index, method, u_dom, v_dom, args).
+        seed:      master seed shared by all faces.
+        workers:   pool size (default: CPU count, capped by the job count).
+        processes: use a process pool instead of threads. Only useful where
+                   worker processes can be spawned (e.g. headless runs);
+                   inside Rhino the interpreter cannot fork itself, so the
+                   commands use threads.
+    Returns:
+        Dict of face_index -> result dict.
+    """
+    tasks = [tuple(job) + (seed,) for job in jobs]
+    if not tasks:
+        return {}
+    workers = workers or os.cpu_count() or 1
+    workers = max(1, min(workers, len(tasks)))
+    if workers == 1:
+        return dict(run_face(task) for task in tasks)
+    pool_cls = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with pool_cls(max_workers=workers) as pool:
+        return dict(pool.map(run_face, tasks))
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+solids.py - Turn subdivision panels into extruded boxes, as arrays.
+
+Works straight from the (N, 4) UV panel array: panels are inset in UV,
+given a depth (random or driven by an attractor) and, once a backend has
+evaluated their corners and normals, built into one box mesh with a fixed
+index template, so thousands of panels cost a handful of array operations.
+"""
+import numpy as np
+
+# Box faces over the 8 vertices of a panel: 0-3 bottom ring, 4-7 top ring,
+# both counter-clockwise seen from the extrusion direction.
+BOX_FACES = np.array([
+    [0, 3, 2, 1],
+    [4, 5, 6, 7],
+    [0, 1, 5, 4],
+    [1, 2, 6, 5],
+    [2, 3, 7, 6],
+    [3, 0, 4, 7],
+])
+
+
+def inset_panels(panels, inset):
+    """Shrink every [u0, u1, v0, v1] panel by inset (a fraction of its size) per side."""
+    panels = np.asarray(panels, dtype=float).reshape(-1, 4)
+    du = (panels[:, 1] - panels[:, 0]) * inset
+    dv = (panels[:, 3] - panels[:, 2]) * inset
+    return np.stack([panels[:, 0] + du, panels[:, 1] - du,
+                     panels[:, 2] + dv, panels[:, 3] - dv], -1)
+
+
+def panel_corners_uv(panels):
+    """(N, 4, 2) corner parameters, counter-clockwise in UV."""
+    u0, u1, v0, v1 = np.asarray(panels, dtype=float).reshape(-1, 4).T
+    return np.stack([np.stack([u0, v0], -1), np.stack([u1, v0], -1),
+                     np.stack([u1, v1], -1), np.stack([u0, v1], -1)], 1)
+
+
+def panel_centres_uv(panels):
+    """(N, 2) centre parameters of the panels."""
+    panels = np.asarray(panels, dtype=float).reshape(-1, 4)
+    return np.stack([(panels[:, 0] + panels[:, 1]) / 2.0,
+                     (panels[:, 2] + panels[:, 3]) / 2.0], -1)
+
+
+def random_depths(count, min_depth, max_depth, rng):
+    """Uniform random depth per panel."""
+    return rng.uniform(min_depth, max_depth, count)
+
+
+def attractor_depths(panels, u_dom, v_dom, attractor_uv, min_depth, max_depth, falloff=0.5):
+    """Depth per panel, max_depth at the attractor fading to min_depth.
+
+    The distance is measured between panel centres and the attractor in
+    normalized UV (the domain maps to the unit square); panels further than
+    falloff get min_depth.
+    """
+    c = panel_centres_uv(panels)
+    du = (c[:, 0] - attractor_uv[0]) / max(u_dom[1] - u_dom[0], 1e-12)
+    dv = (c[:, 1] - attractor_uv[1]) / max(v_dom[1] - v_dom[0], 1e-12)
+    w = np.clip(1.0 - np.hypot(du, dv) / max(falloff, 1e-12), 0.0, 1.0)
+    return min_depth + (max_depth - min_depth) * w
+
+
+def box_mesh(corners, normals, depths, offset=0.0):
+    """Build panel boxes as flat vertex / face arrays.
+
+    Args:
+        corners: (N, 4, 3) evaluated panel corners.
+        normals: (N, 3) unit extrusion direction per panel.
+        depths:  (N,) extrusion depth per panel.
+        offset:  distance the box base is lifted off the surface.
+    Returns:
+        (vertices (8N, 3), faces (6N, 4)) with faces indexing vertices.
+    """
+    corners = np.asarray(corners, dtype=float).reshape(-1, 4, 3)
+    normals = np.asarray(normals, dtype=float).reshape(-1, 1, 3)
+    depths = np.asarray(depths, dtype=float).reshape(-1, 1, 1)
+    bottom = corners + normals * offset
+    top = bottom + normals * depths
+    vertices = np.concatenate([bottom, top], 1).reshape(-1, 3)
+    faces = (BOX_FACES[None, :, :] + 8 * np.arange(len(corners))[:, None, None]).reshape(-1, 4)
+    return vertices, faces
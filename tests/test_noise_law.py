@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+test_noise_law.py - Headless checks of the noise distance law (no Rhino needed).
+
+Run from the repository root with `python -m pytest tests`.
+"""
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+_SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
+
+from fields import NOISE_KINDS, NoiseLaw
+
+
+@pytest.mark.parametrize("kind", NOISE_KINDS)
+def test_noise_weights_do_not_depend_on_the_batch(kind):
+    law = NoiseLaw(kind, 11, frequency=4.0, octaves=3)
+    rng = np.random.default_rng(2)
+    s = rng.random(2000)
+    t = rng.random(2000)
+    whole = law.weights(s, t, None)
+    # A few samples on their own, or a dense batch, map the same
+    assert law.weights(s[:3], t[:3], None) == pytest.approx(whole[:3])
+    assert law.weights(s[:500], t[:500], None) == pytest.approx(whole[:500])
+    assert whole.min() >= 0.0 and whole.max() <= 1.0
+    assert np.quantile(whole, 0.95) - np.quantile(whole, 0.05) > 0.5
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+test_pile_world.py - Headless checks of the pile solver (no Rhino needed).
+
+Run from the repository root with `python -m pytest tests`.
+"""
+import math
+import os
+import random
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+_SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
+
+from pile.hulls import hull_shape
+from pile.world import OVERLAP_TOL, REPOSE_ANGLE, PileWorld, box_penetration, rotation, yaw
+
+BRICK_HALF = np.array([0.215, 0.1025, 0.065]) / 2.0
+
+
+def test_box_penetration():
+    half = np.array([1.0, 0.5, 0.25])
+    centers = np.array([[1.9, 0.0, 0.0], [2.1, 0.0, 0.0], [0.0, 0.0, 0.4]])
+    rots = np.repeat(np.eye(3)[None], 3, 0)
+    pen = box_penetration(np.zeros(3), np.eye(3), half, centers, rots, np.repeat(half[None], 3, 0))
+    assert pen == pytest.approx([0.1, -0.1, 0.1])
+
+    # Corner of a box turned 45 degrees about Z, just clear of a face
+    reach = 0.5 * math.sqrt(2.0)
+    turned = yaw(math.radians(45.0))[None]
+    cube = np.full((1, 3), 0.5)
+    for gap, expected in ((0.01, -0.01), (-0.01, 0.01)):
+        c = np.array([[0.5 + reach + gap, 0.0, 0.0]])
+        pen = box_penetration(np.zeros(3), np.eye(3), np.full(3, 0.5), c, turned, cube)
+        assert pen[0] == pytest.approx(expected)
+
+
+def test_settled_bricks_do_not_overlap():
+    random.seed(3)
+    world = PileWorld(0.0, cell=2.0 * 0.215)
+    for _ in range(120):
+        angle = random.uniform(0, 2 * math.pi)
+        r = abs(random.gauss(0, 0.25))
+        world.drop([r * math.cos(angle), r * math.sin(angle)],
+                   yaw(random.uniform(0, 2 * math.pi)), BRICK_HALF)
+    n = world.count
+    tilted = np.abs(world.rots[:n, 2, 2]) < 0.99
+    assert tilted.any()
+    for i in range(n):
+        others = np.arange(i + 1, n)
+        pen = box_penetration(world.centers[i], world.rots[i], BRICK_HALF, world.centers[others],
+                              world.rots[others], np.repeat(BRICK_HALF[None], len(others), 0))
+        assert pen.max(initial=-np.inf) <= OVERLAP_TOL * BRICK_HALF.min() + 1e-9
+
+
+def test_bricks_dropped_on_one_spot_spread():
+    # Without the repose test every brick balanced on the one below and
+    # they stacked into a spire several metres tall
+    random.seed(5)
+    world = PileWorld(0.0, cell=2.0 * 0.215)
+    for _ in range(100):
+        world.drop([random.gauss(0, 0.02), random.gauss(0, 0.02)],
+                   yaw(random.uniform(0, 2 * math.pi)), BRICK_HALF)
+    n = world.count
+    top = world.centers[:n, 2].max()
+    spread = np.hypot(world.centers[:n, 0], world.centers[:n, 1]).max()
+    assert top < 1.0
+    assert top < math.tan(REPOSE_ANGLE) * spread
+
+
+def log_mesh(length=0.8, radius=0.12, rings=9, sides=8):
+    """Vertices and edges of a bent open cylinder, long enough to split."""
+    vertices = []
+    edges = []
+    for i in range(rings):
+        x = length * (i / float(rings - 1) - 0.5)
+        bend = 0.3 * (x / length) ** 2
+        for k in range(sides):
+            a = 2.0 * math.pi * k / sides
+            vertices.append((x, radius * math.cos(a), bend + radius * math.sin(a)))
+            edges.append((i * sides + k, i * sides + (k + 1) % sides))
+            if i:
+                edges.append(((i - 1) * sides + k, i * sides + k))
+    return np.array(vertices), np.array(edges)
+
+
+def test_settled_hulls_do_not_overlap():
+    rng = np.random.default_rng(0)
+    random.seed(0)
+    vertices, edges = log_mesh()
+    shapes = [hull_shape(rng.normal(size=(60, 3)) * [0.3, 0.2, 0.15]),
+              hull_shape(vertices, edges, pieces=3)]
+    assert len(shapes[1].offsets) == 3
+    world = PileWorld(0.0, cell=1.0)
+    for _ in range(50):
+        angle = random.uniform(0, 2 * math.pi)
+        r = abs(random.gauss(0, 0.8))
+        axis = rng.normal(size=3)
+        world.drop([r * math.cos(angle), r * math.sin(angle)],
+                   rotation(axis / np.linalg.norm(axis), random.uniform(0, math.pi)),
+                   random.choice(shapes), 24, math.radians(30.0))
+    assert len(set(world.shape_ids[:world.count].tolist())) == 2
+    tol = OVERLAP_TOL * max(shape.half.min() for shape in shapes) + 1e-9
+    for i in range(world.count):
+        assert world.penetration(world.centers[i], world.rots[i], world.body_shape(i), i) <= tol